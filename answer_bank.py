@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🏦 بنك الإجابات الجاهزة لأسئلة المنهج (من غير أي طلب LLM وقت الرد)
+- syllabus.jsonl: الأسئلة الأساسية للدروس + صيغ تانية لنفس السؤال (aliases)
+- الإجابات بتتولد مرة واحدة offline بنفس الشخصية والـ prompt، وبتتفحص قبل ما تتخدم،
+  وبتتخزن في SQLite مع فهرس FTS5 على كلمات السؤال بعد التوحيد
+- وقت الرد: FTS5 بيجيب أقرب كام سؤال، والـ n-grams بتتأكد إنه نفس السؤال مش بس نفس الموضوع
+- البناء incremental: كل إجابة معاها hash للـ prompt اللي اتولدت منه (الشخصية + أجزاء
+  ملف المعرفة المرتبطة + السؤال)، فلو جزء اتغير بس الأسئلة اللي بتعتمد عليه بتتولد تاني
+
+التشغيل:
+    python answer_bank.py build                  # الأسئلة الجديدة واللي مصدرها اتغير بس
+    python answer_bank.py build --force --only newton-1,newton-2
+    python answer_bank.py show --status rejected
+    python answer_bank.py lookup "اشرحلي قانون نيوتن الاول"
+كل سطر في syllabus.jsonl: {"id": "...", "lesson": "...", "question": "...", "aliases": [...], "answer": "..." (اختياري)}
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from answer_cache import char_ngrams
+from knowledge import tokenize
+
+logger = logging.getLogger(__name__)
+
+OK = 'ok'
+REJECTED = 'rejected'
+
+# الرد المتولد لازم يبقى في الحدود دي عشان يتخدم
+MIN_ANSWER_CHARS = 80
+MAX_ANSWER_CHARS = 3000
+
+
+def load_syllabus(path: str) -> list[dict]:
+    """أسئلة المنهج من JSONL (السطور الفاضية بتتساب)"""
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    ids = [entry['id'] for entry in entries]
+    if len(ids) != len(set(ids)):
+        raise ValueError(f"{path}: فيه id متكرر")
+    return entries
+
+
+def source_hash(question: str, system_prompt: str, answer: str | None = None) -> str:
+    """بصمة كل اللي الإجابة اتبنت منه (لو الإجابة مكتوبة بإيد بتدخل في البصمة بدل الـ prompt)"""
+    source = answer if answer is not None else system_prompt
+    return hashlib.sha256(f"{question}\n\n{source}".encode('utf-8')).hexdigest()[:16]
+
+
+def vet_answer(answer: str, forbidden: tuple[str, ...] = ()) -> str | None:
+    """فحص الرد المتولد قبل ما يتخدم من غير مراجعة - بيرجع سبب الرفض أو None"""
+    if len(answer) < MIN_ANSWER_CHARS:
+        return f"قصير ({len(answer)} حرف)"
+    if len(answer) > MAX_ANSWER_CHARS:
+        return f"طويل ({len(answer)} حرف)"
+    if not any('؀' <= ch <= 'ۿ' for ch in answer):
+        return "مش بالعربي"
+    for text in forbidden:
+        if text in answer:
+            return "رد خطأ"
+    return None
+
+
+def _terms(text: str) -> str:
+    return ' '.join(tokenize(text))
+
+
+def _similarity(a: frozenset, b: frozenset) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+class AnswerBank:
+    """الإجابات في SQLite: جدول entries + جدول FTS5 للأسئلة وصيغها"""
+
+    def __init__(self, db_path: str, threshold: float = 0.8, candidates: int = 5):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.candidates = candidates
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'id TEXT PRIMARY KEY, lesson TEXT NOT NULL, question TEXT NOT NULL, answer TEXT NOT NULL, '
+            'status TEXT NOT NULL, reason TEXT, source TEXT NOT NULL, built_at REAL NOT NULL)'
+        )
+        self.db.execute('CREATE VIRTUAL TABLE IF NOT EXISTS questions USING fts5(terms, entry_id UNINDEXED)')
+        self.db.commit()
+
+    def __len__(self) -> int:
+        """عدد الإجابات اللي بتتخدم"""
+        return self.db.execute('SELECT COUNT(*) FROM entries WHERE status = ?', (OK,)).fetchone()[0]
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    # ---------- وقت الرد ----------
+    def lookup(self, question: str) -> str | None:
+        """الإجابة لو السؤال هو نفس سؤال من المنهج (أو صيغة منه) - None لو مفيش"""
+        match = self.match(question)
+        if match is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return match[1]
+
+    def match(self, question: str) -> tuple[str, str, float] | None:
+        """(id, الإجابة, درجة التشابه) لأقرب سؤال فوق الـ threshold"""
+        terms = tokenize(question)
+        if not terms:
+            return None
+        query = ' OR '.join(f'"{term}"' for term in set(terms))
+        rows = self.db.execute(
+            'SELECT q.terms, e.id, e.answer FROM questions q JOIN entries e ON e.id = q.entry_id '
+            'WHERE questions MATCH ? AND e.status = ? ORDER BY rank LIMIT ?',
+            (query, OK, self.candidates),
+        ).fetchall()
+        grams = char_ngrams(' '.join(terms))
+        best = None
+        for candidate_terms, entry_id, answer in rows:
+            score = _similarity(grams, char_ngrams(candidate_terms))
+            if score >= self.threshold and (best is None or score > best[2]):
+                best = (entry_id, answer, score)
+        return best
+
+    # ---------- البناء ----------
+    def sources(self) -> dict[str, tuple[str, str]]:
+        """{id: (source, status)} للإجابات الموجودة"""
+        return {row[0]: (row[1], row[2]) for row in self.db.execute('SELECT id, source, status FROM entries')}
+
+    def store(self, entry: dict, answer: str, source: str, reason: str | None = None):
+        """حفظ إجابة (أو سبب رفضها) + فهرسة السؤال وصيغه من جديد"""
+        with self.db:
+            self.db.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (entry['id'], entry.get('lesson', ''), entry['question'], answer,
+                 REJECTED if reason else OK, reason, source, time.time()),
+            )
+            self._index(entry)
+
+    def _index(self, entry: dict):
+        self.db.execute('DELETE FROM questions WHERE entry_id = ?', (entry['id'],))
+        self.db.executemany('INSERT INTO questions (terms, entry_id) VALUES (?, ?)', [
+            (_terms(text), entry['id']) for text in (entry['question'], *entry.get('aliases', ()))
+        ])
+
+    def prune(self, keep_ids: set[str]) -> int:
+        """مسح الأسئلة اللي اتشالت من ملف المنهج"""
+        removed = [entry_id for entry_id in self.sources() if entry_id not in keep_ids]
+        with self.db:
+            for entry_id in removed:
+                self.db.execute('DELETE FROM entries WHERE id = ?', (entry_id,))
+                self.db.execute('DELETE FROM questions WHERE entry_id = ?', (entry_id,))
+        return len(removed)
+
+    async def refresh(self, syllabus: list[dict], prompt_for, generate, force: bool = False,
+                      only: set[str] | None = None, concurrency: int = 4, forbidden: tuple[str, ...] = ()) -> dict:
+        """توليد الإجابات الجديدة واللي مصدرها اتغير بس
+
+        prompt_for(question) -> system prompt | generate(system_prompt, question) -> الرد
+        الصيغ (aliases) بتتفهرس من جديد في كل مرة من غير توليد
+        """
+        existing = self.sources()
+        stats = {'generated': 0, 'rejected': 0, 'failed': 0, 'unchanged': 0,
+                 'removed': self.prune({entry['id'] for entry in syllabus})}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def build(entry: dict):
+            manual = entry.get('answer')
+            system_prompt = '' if manual else prompt_for(entry['question'])
+            source = source_hash(entry['question'], system_prompt, manual)
+            previous = existing.get(entry['id'])
+            selected = only is None or entry['id'] in only
+            if not selected or (not force and previous is not None and previous[0] == source):
+                if previous is not None:
+                    with self.db:
+                        self._index(entry)
+                stats['unchanged'] += 1
+                return
+            if manual:
+                self.store(entry, manual, source)
+                stats['generated'] += 1
+                return
+            async with semaphore:
+                started_at = time.perf_counter()
+                try:
+                    answer = (await generate(system_prompt, entry['question'])).strip()
+                except Exception as e:
+                    logger.warning(f"⚠️ {entry['id']}: فشل التوليد: {e}")
+                    stats['failed'] += 1
+                    return
+            reason = vet_answer(answer, forbidden)
+            self.store(entry, answer, source, reason)
+            stats['rejected' if reason else 'generated'] += 1
+            logger.info(f"🏦 {entry['id']}: {reason or 'اتولد'} في {time.perf_counter() - started_at:.1f}s")
+
+        await asyncio.gather(*(build(entry) for entry in syllabus))
+        return stats
+
+    def entries(self, status: str | None = None) -> list[tuple]:
+        """(id, lesson, question, status, reason, answer) للمراجعة"""
+        query = 'SELECT id, lesson, question, status, reason, answer FROM entries'
+        if status:
+            return self.db.execute(query + ' WHERE status = ? ORDER BY id', (status,)).fetchall()
+        return self.db.execute(query + ' ORDER BY id').fetchall()
+
+    def describe(self) -> str:
+        """ملخص لأمر /stats و /bank"""
+        counts = dict(self.db.execute('SELECT status, COUNT(*) FROM entries GROUP BY status').fetchall())
+        return (f"🏦 بنك الإجابات: {counts.get(OK, 0)} إجابة جاهزة | مرفوض {counts.get(REJECTED, 0)} "
+                f"| Hit {self.hits} / Miss {self.misses} ({self.hit_rate:.0%})")
+
+    def close(self):
+        self.db.close()
+
+
+async def _build_with_bot(args) -> dict:
+    """التوليد بنفس شخصية البوت ومزوديه (بيحتاج GEMINI_API_KEY و/أو GROQ_API_KEY)"""
+    import main
+
+    main.validate_config()
+    bank = AnswerBank(args.db)
+    try:
+        return await bank.refresh(
+            load_syllabus(args.syllabus),
+            main.build_system_prompt,
+            main.generate_bank_answer,
+            force=args.force,
+            only=set(args.only.split(',')) if args.only else None,
+            concurrency=args.concurrency,
+            forbidden=(main.AI_ERROR_REPLY,),
+        )
+    finally:
+        bank.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=os.getenv('ANSWER_BANK_PATH', os.path.join(base_dir, 'answer_bank.db')))
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="توليد الإجابات الجديدة واللي مصدرها اتغير")
+    build.add_argument('--syllabus', default=os.path.join(base_dir, 'syllabus.jsonl'))
+    build.add_argument('--force', action='store_true', help="توليد من جديد حتى لو المصدر متغيرش")
+    build.add_argument('--only', help="ids بفواصل")
+    build.add_argument('--concurrency', type=int, default=4)
+    show = sub.add_parser('show', help="عرض الإجابات للمراجعة")
+    show.add_argument('--status', choices=(OK, REJECTED))
+    lookup = sub.add_parser('lookup', help="تجربة سؤال على البنك")
+    lookup.add_argument('question')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if args.command == 'build':
+        started = time.perf_counter()
+        result = asyncio.run(_build_with_bot(args))
+        print(f"{result} in {time.perf_counter() - started:.1f}s -> {args.db}")
+    elif args.command == 'show':
+        bank = AnswerBank(args.db)
+        for entry_id, lesson, question, status, reason, answer in bank.entries(args.status):
+            print(f"[{entry_id}] {lesson} | {question} | {status}{f' ({reason})' if reason else ''}\n{answer}\n")
+        bank.close()
+    else:
+        bank = AnswerBank(args.db)
+        started = time.perf_counter()
+        match = bank.match(args.question)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"{match[0]} ({match[2]:.2f}) in {elapsed_ms:.2f} ms\n{match[1]}" if match
+              else f"no match ({elapsed_ms:.2f} ms)")
+        bank.close()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+💾 كاش الإجابات قدام get_ai_response
+1. تطابق تام على النص بعد التوحيد
+2. لو مفيش: بحث عن سؤال شبه مطابق بالـ character n-grams
+   (بس لو الأرقام والوحدات اللي فيه هي هي بالظبط - "كتلته 5 كجم" و "كتلته 8 كجم" مسألتين مختلفتين -
+    ونفس الكلمات بالظبط من غير الحشو: "الاول" و "الثاني" أو "بسرعة" و "بعجلة" أسئلة مختلفة)
+مع TTL + LRU + حد أقصى للحجم + حفظ اختياري على الديسك
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+
+from arabic_text import normalize_arabic
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZE = 3
+# الأرقام الهندية (٠-٩) زي العربية عشان "٥ كجم" و "5 كجم" يبقوا نفس الكمية
+_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹', '01234567890123456789')
+_HAS_DIGIT = re.compile(r'\d')
+# الأرقام المكتوبة بالحروف (بعد التوحيد: ة -> ه) - "خمسه كيلو" هي "5 كيلو"
+_NUMBER_WORDS = {
+    'صفر': '0', 'واحد': '1', 'واحده': '1', 'اتنين': '2', 'اثنين': '2', 'اثنان': '2',
+    'تلاته': '3', 'ثلاثه': '3', 'تلات': '3', 'ثلاث': '3', 'اربعه': '4', 'اربع': '4',
+    'خمسه': '5', 'خمس': '5', 'سته': '6', 'سبعه': '7', 'سبع': '7',
+    'تمانيه': '8', 'ثمانيه': '8', 'تمن': '8', 'ثماني': '8', 'تسعه': '9', 'تسع': '9',
+    'عشره': '10', 'عشر': '10', 'عشرين': '20', 'عشرون': '20', 'ميه': '100', 'مائه': '100',
+}
+# كلام مبيغيرش السؤال - الكلمات دي بس اللي مسموح تختلف بين سؤالين عشان يتحسبوا واحد
+# (من غير "مش" و "لا" و "غير": النفي بيقلب السؤال)
+_FILLER = frozenset({
+    'ممكن', 'لو', 'سمحت', 'سمحتي', 'فضلك', 'من', 'في', 'علي', 'عن', 'الي', 'مع', 'و',
+    'هو', 'هي', 'ده', 'دي', 'دا', 'بس', 'طيب', 'بقي', 'اي', 'ايه', 'ما', 'هل',
+    'عايز', 'عاوز', 'عايزه', 'عاوزه', 'محتاج', 'محتاجه',
+})
+
+
+def char_ngrams(text: str, n: int = NGRAM_SIZE) -> frozenset:
+    """مجموعة الـ character n-grams للنص (بعد التوحيد)"""
+    padded = f" {text} "
+    if len(padded) <= n:
+        return frozenset((padded,))
+    return frozenset(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+
+def cache_key(question: str) -> str:
+    """النص بعد التوحيد والأرقام كلها بالعربي (0-9) - المكتوبة بالحروف كمان"""
+    words = normalize_arabic(question).translate(_DIGITS).split()
+    return " ".join(_NUMBER_WORDS.get(word, word) for word in words)
+
+
+def content_words(key: str) -> frozenset:
+    """كلمات السؤال من غير الحشو والنداء ("يا نيوتن"، "يا مستر")"""
+    tokens = key.split()
+    words = set()
+    skip = False
+    for token in tokens:
+        if skip:
+            skip = False
+        elif token == 'يا':
+            skip = True
+        elif token not in _FILLER:
+            words.add(token)
+    return frozenset(words)
+
+
+def quantities(key: str) -> tuple:
+    """الأرقام اللي في المفتاح والوحدة اللي بعد كل رقم: "5 كجم بعجلة 2 م ث2" -> (5, كجم, 2, م, ث2)"""
+    tokens = key.split()
+    signature = []
+    for i, token in enumerate(tokens):
+        if not _HAS_DIGIT.search(token):
+            continue
+        signature.append(token)
+        if token.isdigit() and i + 1 < len(tokens) and not _HAS_DIGIT.search(tokens[i + 1]):
+            signature.append(tokens[i + 1])
+    return tuple(signature)
+
+
+class _Entry:
+    __slots__ = ('answer', 'expires_at', 'ngrams', 'quantities', 'words')
+
+    def __init__(self, answer: str, expires_at: float, ngrams: frozenset, quantities: tuple, words: frozenset):
+        self.answer = answer
+        self.expires_at = expires_at
+        self.ngrams = ngrams
+        self.quantities = quantities
+        self.words = words
+
+
+class AnswerCache:
+    """كاش LRU بـ TTL مع فهرس n-grams للأسئلة شبه المتطابقة"""
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        ttl: float = 6 * 3600,
+        similarity_threshold: float = 0.88,
+        min_similar_length: int = 12,
+        persist_path: str | None = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.min_similar_length = min_similar_length
+        self.persist_path = persist_path
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._index: dict[str, set[str]] = {}
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ---------- القراءة ----------
+    def get(self, question: str) -> str | None:
+        """يرجع الإجابة المتخزنة أو None"""
+        key = cache_key(question)
+        if not key:
+            self.misses += 1
+            return None
+        now = time.time()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry.answer
+            self._remove(key)
+
+        similar_key = self._find_similar(key, now)
+        if similar_key is not None:
+            self._entries.move_to_end(similar_key)
+            self.similar_hits += 1
+            return self._entries[similar_key].answer
+
+        self.misses += 1
+        return None
+
+    def _find_similar(self, key: str, now: float) -> str | None:
+        """أقرب سؤال متخزن بمعامل Dice على الـ n-grams (فوق الـ threshold) وبنفس الأرقام والوحدات والكلمات"""
+        if len(key) < self.min_similar_length:
+            return None
+        grams = char_ngrams(key)
+        numbers = quantities(key)
+        words = content_words(key)
+        overlap: dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._index.get(gram, ()):
+                overlap[candidate] = overlap.get(candidate, 0) + 1
+
+        best_key, best_score = None, self.similarity_threshold
+        for candidate, shared in overlap.items():
+            entry = self._entries[candidate]
+            if entry.quantities != numbers:
+                # رقم واحد مختلف = مسألة تانية وإجابة تانية مهما كان الكلام قريب
+                continue
+            if entry.words != words:
+                # كلمة واحدة مختلفة (الاول/الثاني، مع/من غير) ممكن تغير الإجابة كلها - miss أحسن من رد غلط
+                continue
+            score = 2 * shared / (len(grams) + len(entry.ngrams))
+            if score >= best_score and entry.expires_at > now:
+                best_key, best_score = candidate, score
+        return best_key
+
+    # ---------- الكتابة ----------
+    def put(self, question: str, answer: str, expires_at: float | None = None):
+        """يخزن الإجابة ويطرد الأقدم استخداماً لو الكاش اتملى"""
+        key = cache_key(question)
+        if not key:
+            return
+        if key in self._entries:
+            self._remove(key)
+        grams = char_ngrams(key)
+        self._entries[key] = _Entry(
+            answer, expires_at or time.time() + self.ttl, grams, quantities(key), content_words(key)
+        )
+        for gram in grams:
+            self._index.setdefault(gram, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        for gram in entry.ngrams:
+            keys = self._index.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[gram]
+
+    # ---------- الحفظ على الديسك ----------
+    def save(self):
+        """يكتب الكاش على الديسك (كتابة ذرية عن طريق ملف مؤقت)"""
+        if not self.persist_path:
+            return
+        now = time.time()
+        data = [
+            [key, entry.answer, entry.expires_at]
+            for key, entry in self._entries.items()
+            if entry.expires_at > now
+        ]
+        tmp_path = f"{self.persist_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.persist_path)
+        logger.info(f"💾 تم حفظ {len(data)} إجابة في الكاش")
+
+    def load(self):
+        """يقرا الكاش من الديسك لو موجود - عشان الـ redeploy يبدأ دافي (بيتنادى في post_init)"""
+        if not self.persist_path:
+            return
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ ملف الكاش بايظ، هنبدأ من الصفر: {e}")
+            return
+        now = time.time()
+        for key, answer, expires_at in data:
+            if expires_at > now:
+                self.put(key, answer, expires_at=expires_at)
+        logger.info(f"✅ تم تحميل {len(self._entries)} إجابة من الكاش")
+
+    # ---------- الإحصائيات ----------
+    @property
+    def hit_rate(self) -> float:
+        total = self.exact_hits + self.similar_hits + self.misses
+        return (self.exact_hits + self.similar_hits) / total if total else 0.0
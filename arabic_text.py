@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔤 توحيد النص العربي
+عشان "اشرحلي قانون نيوتن الأول" و "اشرحلى قانون نيوتن الاول" يبقوا نفس السؤال
+"""
+
+import re
+
+# التشكيل (فتحة، ضمة، كسرة، تنوين، شدة، سكون) + الألف الخنجرية
+_DIACRITICS = re.compile(r'[\u064B-\u0652\u0670]')
+_TATWEEL = '\u0640'
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+
+_LETTER_MAP = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي',
+    'ة': 'ه',
+})
+
+
+def normalize_arabic(text: str) -> str:
+    """يشيل التشكيل والتطويل وعلامات الترقيم ويوحد الألف والياء والتاء المربوطة"""
+    text = text.lower()
+    text = _DIACRITICS.sub('', text).replace(_TATWEEL, '')
+    text = text.translate(_LETTER_MAP)
+    text = _PUNCTUATION.sub(' ', text)
+    return _WHITESPACE.sub(' ', text).strip()
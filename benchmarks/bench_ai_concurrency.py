@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+⏱️ Load test لطبقة المزودين مع Groq/Gemini وهميين
+بيقارن الاستدعاء المتزامن القديم (بيوقف الـ event loop) بالطبقة الـ async الجديدة
+
+التشغيل:
+    python benchmarks/bench_ai_concurrency.py --requests 64 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from providers import GeminiProvider, GroqProvider  # noqa: E402
+
+
+class StubGroqCompletions:
+    """بديل لـ AsyncGroq().chat.completions بزمن استجابة ثابت"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def create(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        message = SimpleNamespace(content="رد Groq تجريبي")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+class StubGeminiModel:
+    """بديل لـ GenerativeModel بزمن استجابة ثابت"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def generate_content_async(self, contents, **kwargs):
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(text="رد Gemini تجريبي")
+
+    def generate_content(self, contents, **kwargs):
+        time.sleep(self.latency)
+        return SimpleNamespace(text="رد Gemini تجريبي")
+
+
+async def run_blocking(model, total: int, concurrency: int) -> float:
+    """الطريقة القديمة: استدعاء متزامن جوه handler async"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            model.generate_content("prompt")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return time.perf_counter() - start
+
+
+async def run_async(provider, total: int, concurrency: int) -> float:
+    """الطبقة الجديدة: await على المزود من غير ما نوقف الـ loop"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await provider.generate("system", "سؤال")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--levels", default="1,4,16,64")
+    args = parser.parse_args()
+
+    levels = [int(x) for x in args.levels.split(",")]
+    gemini_stub = StubGeminiModel(args.latency)
+    gemini = GeminiProvider(gemini_stub, max_concurrency=max(levels), timeout=30)
+    groq = GroqProvider(
+        SimpleNamespace(chat=SimpleNamespace(completions=StubGroqCompletions(args.latency))),
+        max_concurrency=max(levels),
+        timeout=30,
+    )
+
+    print(f"requests={args.requests} latency={args.latency}s\n")
+    print(f"{'concurrency':>11} | {'blocking req/s':>14} | {'gemini req/s':>12} | {'groq req/s':>10}")
+    print("-" * 58)
+    for level in levels:
+        blocking = await run_blocking(gemini_stub, args.requests, level)
+        gemini_elapsed = await run_async(gemini, args.requests, level)
+        groq_elapsed = await run_async(groq, args.requests, level)
+        print(
+            f"{level:>11} | {args.requests / blocking:>14.1f} | "
+            f"{args.requests / gemini_elapsed:>12.1f} | {args.requests / groq_elapsed:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🏦 بنك الإجابات: زمن البحث ودقته على أسئلة متعلّم عليها
+بنك مؤقت من syllabus.jsonl بإجابات وهمية (البحث مش بيبص على نص الإجابة)
+- positives: كل سؤال وصيغه بعد تعديلات بسيطة (همزة، علامة استفهام، كلمة زيادة في الأول أو الآخر)
+- near misses: مسائل وأسئلة عن نفس الموضوع بس مش نفس السؤال (أي hit هنا غلط)
+- routing.jsonl: رسايل متنوعة - الـ hits بتتطبع عشان تتراجع بالعين
+
+التشغيل:
+    python benchmarks/bench_answer_bank.py --threshold 0.8 --repeat 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+from answer_bank import AnswerBank, load_syllabus  # noqa: E402
+
+# أسئلة عن نفس الدروس بس محتاجة رد مخصوص (مسائل، مقارنات، تطبيق)
+NEAR_MISSES = [
+    "جسم كتلته 5 كجم اثرت عليه قوة 10 نيوتن احسب العجلة",
+    "حل المسالة دي قانون نيوتن التاني كتلة 3 كيلو",
+    "ايه العلاقة بين قانون نيوتن الاول والتاني",
+    "ازاي اطبق قانون بويل في مسالة",
+    "غاز حجمه 2 لتر عند ضغط 1 ضغط جوي احسب حجمه عند 2 ضغط جوي",
+    "ليه الزاوية الحرجة للالماس صغيرة",
+    "احسب معامل الانكسار لو سرعة الضوء في الزجاج 2 في 10 اس 8",
+    "موجة ترددها 50 هرتز وطولها الموجي 2 متر احسب سرعتها",
+    "قارن بين قاعدة باسكال وقاعدة ارشميدس",
+    "مكبس هيدروليكي مساحة مكبسه الصغير 10 سم مربع احسب القوة",
+]
+
+
+def variants(text: str) -> list[str]:
+    """نفس السؤال بكتابة مختلفة زي ما الطلاب بيكتبوه"""
+    return [
+        text,
+        text + '؟',
+        text.replace('ا', 'أ', 1),
+        'ممكن ' + text,
+        text + ' يا نيوتن',
+    ]
+
+
+def routing_texts(path: str) -> list[str]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line)['text'] for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--syllabus', default=os.path.join(ROOT, 'syllabus.jsonl'))
+    parser.add_argument('--corpus', default=os.path.join(BENCH_DIR, 'data', 'routing.jsonl'))
+    parser.add_argument('--threshold', type=float, default=0.8)
+    parser.add_argument('--repeat', type=int, default=20, help="تكرار كل سؤال لقياس الزمن")
+    args = parser.parse_args()
+
+    syllabus = load_syllabus(args.syllabus)
+    with tempfile.TemporaryDirectory() as tmp:
+        bank = AnswerBank(os.path.join(tmp, 'bank.db'), threshold=args.threshold)
+        started = time.perf_counter()
+        for entry in syllabus:
+            bank.store(entry, f"إجابة {entry['id']}", 'bench')
+        print(f"{len(bank)} entries indexed in {(time.perf_counter() - started) * 1000:.0f} ms "
+              f"({os.path.getsize(os.path.join(tmp, 'bank.db')) / 1024:.0f} KiB), threshold {args.threshold}")
+
+        positives = [(text, entry['id']) for entry in syllabus
+                     for question in (entry['question'], *entry.get('aliases', ()))
+                     for text in variants(question)]
+        corpus = routing_texts(args.corpus)
+
+        correct = wrong = missed = 0
+        timings = []
+        for text, expected in positives:
+            match = bank.match(text)
+            if match is None:
+                missed += 1
+            elif match[0] == expected:
+                correct += 1
+            else:
+                wrong += 1
+        false_hits = [text for text in NEAR_MISSES if bank.match(text) is not None]
+        corpus_hits = [(text, match) for text in corpus if (match := bank.match(text)) is not None]
+
+        for text in [t for t, _ in positives] + NEAR_MISSES + corpus:
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                bank.match(text)
+                timings.append(time.perf_counter() - started)
+        bank.close()
+
+    timings.sort()
+    print(f"  positives: {len(positives)} | correct {correct} ({correct / len(positives):.0%}) "
+          f"| wrong entry {wrong} | missed {missed}")
+    print(f"  near misses: {len(NEAR_MISSES)} | false hits {len(false_hits)}")
+    for text in false_hits:
+        print(f"    {text}")
+    print(f"  routing corpus: {len(corpus)} messages | hits {len(corpus_hits)}")
+    for text, (entry_id, _, score) in corpus_hits:
+        print(f"    {score:.2f} {entry_id:<20} {text}")
+    print(f"  lookup:    p50 {statistics.median(timings) * 1e6:6.0f} µs | "
+          f"p99 {timings[int(0.99 * len(timings))] * 1e6:6.0f} µs | max {timings[-1] * 1e6:6.0f} µs "
+          f"({len(timings):,} lookups)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+💾 كاش الإجابات: الأسئلة شبه المطابقة والمسائل اللي رقم واحد فيها اتغير
+- positives: نفس المسألة بكتابة مختلفة (همزة، علامة استفهام، كلمة زيادة، أرقام هندية) - المفروض hit
+- number changes: نفس المسألة بالظبط بس رقم أو وحدة اتغيرت (بالأرقام أو بالحروف) - أي hit هنا إجابة غلط للطالب
+- word changes: سؤال طويل اتغيرت فيه كلمة واحدة بتفرق (الاول/الثاني، بسرعة/بعجلة، مع/من غير) - نفس الكلام
+  (السكريبت بيخرج بـ exit code 1 لو حصل أي واحد منهم - regression check)
+- وبعدها زمن get() على كاش مليان
+
+التشغيل:
+    python benchmarks/bench_answer_cache.py --entries 5000 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+from answer_cache import AnswerCache  # noqa: E402
+
+# (المسألة, نسخ بأرقام أو وحدات مختلفة)
+PROBLEMS = [
+    ("جسم كتلته 5 كجم يتحرك بعجلة 2 م/ث2 احسب القوة المؤثرة عليه", [
+        "جسم كتلته 8 كجم يتحرك بعجلة 2 م/ث2 احسب القوة المؤثرة عليه",
+        "جسم كتلته 50 كجم يتحرك بعجلة 2 م/ث2 احسب القوة المؤثرة عليه",
+        "جسم كتلته 5 كجم يتحرك بعجلة 3 م/ث2 احسب القوة المؤثرة عليه",
+        "جسم كتلته 5 جم يتحرك بعجلة 2 م/ث2 احسب القوة المؤثرة عليه",
+        "جسم كتلته 2 كجم يتحرك بعجلة 5 م/ث2 احسب القوة المؤثرة عليه",
+        "جسم كتلته 5.5 كجم يتحرك بعجلة 2 م/ث2 احسب القوة المؤثرة عليه",
+    ]),
+    ("غاز حجمه 2 لتر عند ضغط 1 ضغط جوي احسب حجمه عند 2 ضغط جوي", [
+        "غاز حجمه 3 لتر عند ضغط 1 ضغط جوي احسب حجمه عند 2 ضغط جوي",
+        "غاز حجمه 2 لتر عند ضغط 1 ضغط جوي احسب حجمه عند 4 ضغط جوي",
+        "غاز حجمه 2 مل عند ضغط 1 ضغط جوي احسب حجمه عند 2 ضغط جوي",
+    ]),
+    ("موجة ترددها 50 هرتز وطولها الموجي 2 متر احسب سرعتها", [
+        "موجة ترددها 60 هرتز وطولها الموجي 2 متر احسب سرعتها",
+        "موجة ترددها 50 هرتز وطولها الموجي 2 سم احسب سرعتها",
+        "موجة ترددها 500 هرتز وطولها الموجي 2 متر احسب سرعتها",
+    ]),
+    ("مكبس هيدروليكي مساحة مكبسه الصغير 10 سم2 والكبير 200 سم2 احسب القوة", [
+        "مكبس هيدروليكي مساحة مكبسه الصغير 20 سم2 والكبير 200 سم2 احسب القوة",
+        "مكبس هيدروليكي مساحة مكبسه الصغير 10 سم2 والكبير 100 سم2 احسب القوة",
+    ]),
+    ("جسم كتلته خمسة كيلو جرام موضوع على سطح افقي احسب وزنه", [
+        "جسم كتلته سبعة كيلو جرام موضوع على سطح افقي احسب وزنه",
+        "جسم كتلته خمسة جرام موضوع على سطح افقي احسب وزنه",
+        "جسم كتلته 7 كيلو جرام موضوع على سطح افقي احسب وزنه",
+    ]),
+]
+
+# (المتخزن, سؤال تاني بكلمة واحدة مختلفة) - الكلام شبه متطابق بس الإجابة مختلفة
+WORD_CHANGES = [
+    ("اشرحلي قانون نيوتن الاول بالتفصيل مع امثلة من الحياة اليومية",
+     "اشرحلي قانون نيوتن الثاني بالتفصيل مع امثلة من الحياة اليومية"),
+    ("سيارة تتحرك بسرعة ثابتة على طريق مستقيم احسب المسافة المقطوعة بعد 10 ثواني",
+     "سيارة تتحرك بعجلة ثابتة على طريق مستقيم احسب المسافة المقطوعة بعد 10 ثواني"),
+    ("اشرحلي ظاهرة الانكسار الكلي للضوء مع امثلة",
+     "اشرحلي ظاهرة الانكسار الكلي للضوء من غير امثلة"),
+    ("ايه الفرق بين الكتلة والوزن بالتفصيل",
+     "ايه الفرق بين الكتلة والحجم بالتفصيل"),
+]
+
+ARABIC_DIGITS = str.maketrans('0123456789', '٠١٢٣٤٥٦٧٨٩')
+
+
+def variants(text: str) -> list[str]:
+    """نفس المسألة بكتابة مختلفة زي ما الطلاب بيكتبوها"""
+    return [
+        text + '؟',
+        text.replace('ا', 'أ', 1),
+        'ممكن ' + text,
+        text + ' يا نيوتن',
+        text.translate(ARABIC_DIGITS),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=5000, help="أسئلة تانية في الكاش (عشان الزمن)")
+    parser.add_argument('--threshold', type=float, default=0.88)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    cache = AnswerCache(max_entries=args.entries + len(PROBLEMS), similarity_threshold=args.threshold)
+    rng = random.Random(args.seed)
+    for i in range(args.entries):
+        words = rng.sample(["قانون", "نيوتن", "الاول", "التاني", "العجلة", "السرعة", "الضغط", "الحجم",
+                            "الطاقة", "الشغل", "القدرة", "الموجة", "التردد", "الانكسار", "اشرح", "ليه"], 5)
+        cache.put(" ".join(words) + f" {i}", f"إجابة {i}")
+    for index, (problem, _) in enumerate(PROBLEMS):
+        cache.put(problem, f"problem-{index}")
+    for index, (stored, _) in enumerate(WORD_CHANGES):
+        cache.put(stored, f"word-{index}")
+
+    hits = missed = wrong = 0
+    for index, (problem, _) in enumerate(PROBLEMS):
+        for text in variants(problem):
+            answer = cache.get(text)
+            if answer == f"problem-{index}":
+                hits += 1
+            elif answer is None:
+                missed += 1
+            else:
+                wrong += 1
+    positives = hits + missed + wrong
+
+    false_hits = []
+    for index, (problem, changed) in enumerate(PROBLEMS):
+        for text in changed:
+            for variant in [text, *variants(text)]:
+                answer = cache.get(variant)
+                if answer is not None:
+                    false_hits.append((variant, answer))
+    checked = sum(len(changed) * 6 for _, changed in PROBLEMS)
+
+    word_hits = []
+    for _, changed in WORD_CHANGES:
+        for variant in [changed, *variants(changed)]:
+            answer = cache.get(variant)
+            if answer is not None:
+                word_hits.append((variant, answer))
+    word_checked = len(WORD_CHANGES) * 6
+
+    timings = []
+    queries = [text for problem, changed in PROBLEMS for text in [*variants(problem), *changed]]
+    for _ in range(args.repeat):
+        for text in queries:
+            started = time.perf_counter()
+            cache.get(text)
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+
+    print(f"{len(cache)} entries, threshold {args.threshold}")
+    print(f"  positives:      {positives} | hit {hits} | missed {missed} | wrong answer {wrong}")
+    print(f"  number changes: {checked} | hits {len(false_hits)} (لازم 0)")
+    for text, answer in false_hits:
+        print(f"    {answer:<12} {text}")
+    print(f"  word changes:   {word_checked} | hits {len(word_hits)} (لازم 0)")
+    for text, answer in word_hits:
+        print(f"    {answer:<12} {text}")
+    print(f"  get():          p50 {statistics.median(timings) * 1e6:6.0f} µs | "
+          f"p99 {timings[int(0.99 * len(timings))] * 1e6:6.0f} µs ({len(timings):,} lookups)")
+    if false_hits or word_hits or wrong:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📣 إذاعة لعدد كبير من الشاتات على Bot API وهمي
+بيقيس السرعة الفعلية مقابل الحد المضبوط، وزمن رد رسالة "عادية" بتتبعت في نفس الوقت
+(عشان نتأكد إن الإذاعة مش بتجوّع ردود الطلاب)، ولو --interrupt بيقطع الإذاعة
+في النص ويكملها بـ Broadcaster جديد زي الـ restart
+
+التشغيل:
+    python benchmarks/bench_broadcast.py --chats 100000 --rate 1000 --flood-every 5000
+    python benchmarks/bench_broadcast.py --chats 2000 --rate 25 --interrupt 20
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Bot  # noqa: E402
+from telegram.request import HTTPXRequest  # noqa: E402
+
+from broadcast import Broadcaster, ChatRegistry  # noqa: E402
+from fake_telegram import FakeTelegramServer  # noqa: E402
+
+ADMIN_CHAT = 1
+PROBE_CHAT = 2
+
+
+async def probe(bot: Bot, stop: asyncio.Event, latencies: list[float], interval: float = 0.1):
+    """رسايل "تفاعلية" بتتبعت بالتوازي مع الإذاعة على نفس الـ bot"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await bot.send_message(PROBE_CHAT, "رد تجريبي 🍎")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+
+
+def make_broadcaster(bot, registry, args) -> Broadcaster:
+    return Broadcaster(bot, registry, rate=args.rate, workers=args.workers,
+                       chunk_size=args.chunk_size, progress_interval=3600)
+
+
+async def run(args):
+    telegram = FakeTelegramServer(latency=args.latency, flood_every=args.flood_every)
+    await telegram.start()
+    bot = Bot('123:bench', base_url=telegram.base_url,
+              request=HTTPXRequest(connection_pool_size=args.workers + 8))
+    await bot.initialize()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = ChatRegistry(os.path.join(tmp, 'chats.db'))
+        start = time.perf_counter()
+        for chat_id in range(1000, 1000 + args.chats):
+            registry.add(chat_id)
+        registry.flush()
+        print(f"registry: {len(registry):,} chats in {time.perf_counter() - start:.2f}s, "
+              f"{os.path.getsize(os.path.join(tmp, 'chats.db')) / 2**20:.1f} MiB on disk")
+
+        latencies: list[float] = []
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(bot, stop, latencies))
+
+        broadcaster = make_broadcaster(bot, registry, args)
+        start = time.perf_counter()
+        task = broadcaster.start("كورس الشهر الجديد نزل 🍎", ADMIN_CHAT)
+        if args.interrupt:
+            await asyncio.sleep(args.interrupt)
+            # زي الـ restart: الـ task بيتلغي والحالة فاضلة running في SQLite
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            print(f"interrupted after {args.interrupt}s: {broadcaster.describe()}")
+            broadcaster = make_broadcaster(bot, registry, args)
+            task = broadcaster.resume()
+        await task
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        await prober
+        registry.close()
+
+    delivered = telegram.calls.get('sendMessage', 0) - telegram.flooded - len(latencies)
+    print(broadcaster.describe())
+    print(f"elapsed:    {elapsed:.1f}s ({args.chats / elapsed:.0f} msg/s, limit {args.rate:g}/s)")
+    print(f"delivered:  {delivered:,} (duplicates after resume: {delivered - args.chats:,}), "
+          f"429s: {telegram.flooded}")
+    if latencies:
+        ordered = sorted(latencies)
+        print(f"interactive send latency: p50 {statistics.median(ordered) * 1000:.1f} ms, "
+              f"p99 {ordered[int(0.99 * (len(ordered) - 1))] * 1000:.1f} ms over {len(ordered)} sends")
+
+    await bot.shutdown()
+    await telegram.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chats', type=int, default=20_000)
+    parser.add_argument('--rate', type=float, default=1000, help="الحد العام (رسالة/ثانية)")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--chunk-size', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.02, help="زمن رد الـ Bot API الوهمي")
+    parser.add_argument('--flood-every', type=int, default=0, help="429 كل كام رسالة")
+    parser.add_argument('--interrupt', type=float, default=0, help="قطع الإذاعة بعد كام ثانية واستكمالها")
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+💰 ميزانية الـ tokens: يوم كامل من الأسئلة على TokenLedger بساعة وهمية (من غير نت ولا مزودين)
+- الحمل بيزيد بالليل (ذروة المذاكرة من 8 لـ 12 بالليل) وفيه spike قبل الامتحان (--spike الساعة اللي بيتضاعف فيها)
+- كل سؤال: Groq للبسيط و Gemini للمعقد، طول الرد الطبيعي عشوائي ومقطوع عند max_tokens × output_scale،
+  و hedge (طلب مكرر للمزود التاني) بنسبة --hedge-rate طول ما المستوى بيسمح
+- adaptive: السياسة الحقيقية (ردود أقصر، من غير hedging، أرخص مزود، وبعدين وقف)
+  static: نفس الحمل من غير تكيف - الـ AI شغال عادي لحد ما الميزانية تخلص
+
+بيطبع لكل ساعة: الأسئلة والتكلفة والمستوى، والساعة اللي الـ AI وقف فيها، والأسئلة اللي اترد عليها؛
+وبعدها زمن record() و policy() والذاكرة لكل طالب في حد الطالب
+
+التشغيل:
+    python benchmarks/bench_budget.py --budget 2 --questions 20000 --spike 22
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+from budget import NORMAL, TokenLedger, Spend  # noqa: E402
+
+# نسبة أسئلة اليوم في كل ساعة (بتوقيت القاهرة)
+HOURLY_SHARE = [
+    1, 0.5, 0.3, 0.2, 0.2, 0.3, 0.8, 1.5, 2, 2.5, 3, 3, 3, 3.5, 4, 4.5,
+    5, 5.5, 6, 7, 9, 10, 9, 5,
+]
+MAX_TOKENS = {'gemini': 800, 'groq': 600}
+
+
+class FakeProvider:
+    """بيكفي cheapest_first (بيبص على الاسم بس)"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+def day_questions(args, rng: random.Random) -> list[tuple[float, int, bool]]:
+    """[(الثانية من بداية اليوم, user_id, سؤال بسيط)] مترتبين"""
+    shares = list(HOURLY_SHARE)
+    shares[args.spike] *= 2
+    total = sum(shares)
+    questions = []
+    for hour, share in enumerate(shares):
+        for _ in range(round(args.questions * share / total)):
+            questions.append((hour * 3600 + rng.random() * 3600, rng.randrange(args.users), rng.random() < 0.4))
+    questions.sort()
+    return questions
+
+
+def simulate(args, adaptive: bool) -> dict:
+    rng = random.Random(args.seed)
+    ledger = TokenLedger(daily_budget=args.budget, tz='UTC')
+    start = 0.0
+    now = start
+    ledger.clock = lambda: now
+    hours = [{'questions': 0, 'answered': 0, 'cost': 0.0, 'levels': set()} for _ in range(24)]
+    # المستوى اللي اتطبق فعلاً (static بيتجاهل conserve و critical)
+    levels = {}
+    stopped_at = None
+    for offset, user_id, simple in day_questions(args, rng):
+        now = start + offset
+        hour = hours[int(offset // 3600)]
+        hour['questions'] += 1
+        policy = ledger.policy(user_id)
+        if not adaptive and policy.allow_ai:
+            policy = NORMAL
+        hour['levels'].add(policy.level)
+        levels[policy.level] = levels.get(policy.level, 0) + 1
+        if not policy.allow_ai:
+            stopped_at = stopped_at if stopped_at is not None else offset
+            continue
+        order = ['groq', 'gemini'] if simple else ['gemini', 'groq']
+        if policy.cheapest_first:
+            order = [provider.name for provider in ledger.cheapest_first([FakeProvider(name) for name in order])]
+        spend = Spend()
+        prompt = rng.randint(700, 1300)
+        for name in order if policy.hedge and rng.random() < args.hedge_rate else order[:1]:
+            natural = rng.randint(150, 500) if simple else rng.randint(350, 1000)
+            completion = min(natural, max(64, round(MAX_TOKENS[name] * policy.output_scale)))
+            if policy.output_scale < 1:
+                # الـ prompt بيطلب رد مختصر: الرد الطبيعي نفسه بيقصر مش بس بيتقطع
+                completion = min(completion, round(natural * policy.output_scale))
+            spend.calls.append((name, prompt, completion))
+        before = ledger.spent
+        ledger.record(user_id, 'fast' if simple else 'strong', spend)
+        hour['cost'] += ledger.spent - before
+        hour['answered'] += 1
+    return {'hours': hours, 'stopped_at': stopped_at, 'spent': ledger.spent, 'levels': levels}
+
+
+def print_day(name: str, result: dict):
+    print(f"\n{name}:")
+    for hour, row in enumerate(result['hours']):
+        levels = ",".join(sorted(row['levels'])) or "-"
+        print(f"  {hour:02d}:00  {row['questions']:5d} سؤال | اترد {row['answered']:5d} | ${row['cost']:.3f} | {levels}")
+    answered = sum(row['answered'] for row in result['hours'])
+    questions = sum(row['questions'] for row in result['hours'])
+    stopped = result['stopped_at']
+    stopped_text = f"{int(stopped // 3600):02d}:{int(stopped % 3600 // 60):02d}" if stopped is not None else "موقفش"
+    print(f"  total: ${result['spent']:.2f} | اترد بالـ AI {answered:,}/{questions:,} ({answered / questions:.0%}) "
+          f"| الـ AI وقف: {stopped_text} | levels {result['levels']}")
+
+
+def overhead(args):
+    """زمن record و policy وذاكرة حد الطالب (الذاكرة في pass لوحدها - tracemalloc بيبطأ الزمن)"""
+    spend = Spend()
+    spend.calls.append(('gemini', 1000, 400))
+
+    def ledger():
+        return TokenLedger(daily_budget=args.budget, user_daily_tokens=50_000, tz='UTC', max_users=args.users * 2)
+
+    timed = ledger()
+    timings = {'record': [], 'policy': []}
+    for user_id in range(args.users):
+        started = time.perf_counter()
+        timed.policy(user_id)
+        timings['policy'].append(time.perf_counter() - started)
+        started = time.perf_counter()
+        timed.record(user_id, 'strong', spend)
+        timings['record'].append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    measured = ledger()
+    for user_id in range(args.users):
+        measured.record(user_id, 'strong', spend)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"\noverhead ({args.users:,} طالب):")
+    for name, values in timings.items():
+        values.sort()
+        print(f"  {name:7s} p50 {statistics.median(values) * 1e6:5.1f} µs | p99 {values[int(0.99 * len(values))] * 1e6:5.1f} µs")
+    print(f"  memory: {used / args.users:.0f} bytes لكل طالب (العداد اليومي + bucket + الدفعة اللي مستنية الديسك)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget', type=float, default=2.0, help="دولار في اليوم")
+    parser.add_argument('--questions', type=int, default=20000, help="أسئلة اليوم اللي بتوصل للـ AI")
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--spike', type=int, default=22, help="الساعة اللي الحمل بيتضاعف فيها")
+    parser.add_argument('--hedge-rate', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"budget ${args.budget:.2f}/day | {args.questions:,} questions | {args.users:,} users | spike {args.spike:02d}:00")
+    print_day("adaptive", simulate(args, adaptive=True))
+    print_day("static", simulate(args, adaptive=False))
+    overhead(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧩 Throughput مع CLUSTER_WORKERS = 1 و 2 و 4 ... على Bot API و Gemini وهميين
+`python main.py` كامل (ingress بيعمل polling + N workers)، دفعة رسايل من شاتات مختلفة
+بتتحط في getUpdates مرة واحدة، وبنقيس الوقت لحد ما كل الردود توصل
+
+--slots هو حد التزامن لـ Gemini في كل worker (GEMINI_MAX_CONCURRENCY):
+لو الـ LLM بطيء الـ throughput بيبقى slots × workers / latency تقريباً، ولو الـ CPU هو الحد
+الـ scaling محتاج cores بعدد الـ workers
+
+التشغيل:
+    python benchmarks/bench_cluster.py --workers 1,2,4 --messages 400 --slots 8 --llm-latency 1.0
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_llm import LatencyModel, StubGeminiServer  # noqa: E402
+from fake_telegram import FakeTelegramServer  # noqa: E402
+
+
+def run_gemini_stub(args, conn):
+    """Gemini الوهمي في process لوحده (عشان ميقاسمش الـ benchmark الـ CPU)"""
+    async def serve():
+        gemini = StubGeminiServer(LatencyModel(args.llm_latency, args.llm_sigma, seed=1))
+        await gemini.start()
+        conn.send({'endpoint': gemini.endpoint, 'cert': gemini.cert_path})
+        await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+        conn.send(dict(gemini.calls, max_in_flight=gemini.max_in_flight))
+        await gemini.stop()
+
+    asyncio.run(serve())
+
+
+def load_texts(path: str) -> list[str]:
+    """أسئلة محتاجة LLM (الـ static بتترد من غير مزود)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [row['text'] for row in rows if row['route'] != 'static']
+
+
+def make_update(update_id: int, chat_id: int, text: str) -> dict:
+    user = {'id': chat_id, 'is_bot': False, 'first_name': 'طالب'}
+    return {'update_id': update_id, 'message': {
+        'message_id': update_id, 'date': int(time.time()), 'text': text,
+        'chat': {'id': chat_id, 'type': 'private'}, 'from': user,
+    }}
+
+
+async def wait_for(predicate, timeout: float, what: str):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            raise TimeoutError(what)
+        await asyncio.sleep(0.01)
+
+
+async def one_level(args, workers: int, gemini: dict, texts: list[str], tmp: str) -> dict:
+    telegram = FakeTelegramServer(latency=args.telegram_latency)
+    await telegram.start()
+    env = dict(
+        os.environ,
+        TELEGRAM_BOT_TOKEN='123:cluster',
+        GEMINI_API_KEY='cluster-key',
+        TELEGRAM_BASE_URL=telegram.base_url,
+        GEMINI_API_ENDPOINT=gemini['endpoint'],
+        GRPC_DEFAULT_SSL_ROOTS_FILE_PATH=gemini['cert'],
+        CLUSTER_WORKERS=str(workers),
+        CLUSTER_SOCKET=os.path.join(tmp, f'cluster-{workers}.sock'),
+        CHAT_REGISTRY_PATH=os.path.join(tmp, f'chats-{workers}.db'),
+        GEMINI_MAX_CONCURRENCY=str(args.slots),
+        # كل رسالة سؤال جديد من طالب جديد - من غير كاش ومن غير throttle
+        ANSWER_CACHE_SIZE='0',
+        USER_MESSAGES_PER_MINUTE='100000',
+        CHAT_MESSAGES_PER_MINUTE='100000',
+        METRICS_PORT='0',
+        LOG_LEVEL='WARNING',
+    )
+    env.pop('GROQ_API_KEY', None)
+    process = await asyncio.create_subprocess_exec(sys.executable, 'main.py', cwd=ROOT, env=env)
+
+    update_id = 0
+
+    def push(count: int):
+        nonlocal update_id
+        for _ in range(count):
+            update_id += 1
+            telegram.push_update(make_update(update_id, 1_000_000 + update_id, texts[update_id % len(texts)]))
+
+    def replies() -> int:
+        return telegram.calls.get('sendMessage', 0)
+
+    try:
+        # الـ ingress و كل worker بيعملوا getMe أول ما يبدأوا
+        await wait_for(lambda: telegram.calls.get('getMe', 0) >= workers + 1, 60, 'startup')
+        push(workers * 4)
+        await wait_for(lambda: replies() >= workers * 4, 60, 'warm-up')
+
+        before = replies()
+        started = time.perf_counter()
+        push(args.messages)
+        await wait_for(lambda: replies() >= before + args.messages, args.timeout, 'replies')
+        elapsed = time.perf_counter() - started
+    finally:
+        process.send_signal(signal.SIGINT)
+        await process.wait()
+        await telegram.stop()
+    return {'workers': workers, 'elapsed': elapsed, 'throughput': args.messages / elapsed}
+
+
+async def run(args, gemini: dict):
+    texts = load_texts(args.corpus)
+    levels = [int(level) for level in args.workers.split(',')]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in levels:
+            result = await one_level(args, workers, gemini, texts, tmp)
+            results.append(result)
+            print(f"  workers={workers:<3} {result['throughput']:7.1f} msg/s "
+                  f"({args.messages} messages in {result['elapsed']:.1f}s)", flush=True)
+
+    base = results[0]['throughput'] / results[0]['workers']
+    print("\nworkers | msg/s  | speedup | efficiency")
+    print("-" * 40)
+    for result in results:
+        speedup = result['throughput'] / results[0]['throughput']
+        efficiency = result['throughput'] / (base * result['workers'])
+        print(f"{result['workers']:>7} | {result['throughput']:6.1f} | {speedup:6.2f}x | {efficiency:9.0%}")
+    per_worker = [r['throughput'] / r['workers'] for r in results]
+    print(f"\nper-worker msg/s: median {statistics.median(per_worker):.1f}, "
+          f"ideal (slots/latency) {args.slots / args.llm_latency:.1f}, cpus {os.cpu_count()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--messages', type=int, default=400)
+    parser.add_argument('--slots', type=int, default=8, help="GEMINI_MAX_CONCURRENCY لكل worker")
+    parser.add_argument('--llm-latency', type=float, default=1.0)
+    parser.add_argument('--llm-sigma', type=float, default=0.2)
+    parser.add_argument('--telegram-latency', type=float, default=0.01)
+    parser.add_argument('--corpus', default=os.path.join(BENCH_DIR, 'data', 'routing.jsonl'))
+    parser.add_argument('--timeout', type=float, default=300)
+    args = parser.parse_args()
+
+    parent, child = multiprocessing.Pipe()
+    stub = multiprocessing.Process(target=run_gemini_stub, args=(args, child), daemon=True)
+    stub.start()
+    gemini = parent.recv()
+    print(f"{args.messages} messages per level, slots {args.slots}/worker, "
+          f"llm median {args.llm_latency}s, telegram {args.telegram_latency * 1000:.0f} ms")
+    try:
+        asyncio.run(run(args, gemini))
+        parent.send('stats')
+        print(f"gemini stub: {parent.recv()}")
+    finally:
+        stub.join(timeout=5)
+        if stub.is_alive():
+            stub.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧠 قياس استهلاك الذاكرة لـ ConversationMemory مع 100 ألف شات
+
+التشغيل:
+    python benchmarks/bench_conversation_memory.py --chats 100000 --turns 6
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation import ConversationMemory  # noqa: E402
+
+QUESTION = "اشرحلي قانون نيوتن التاني وازاي احل عليه مسائل العجلة والقوة المحصلة"
+REPLY = "بص يا وحش الفيزياء، القوة المحصلة = الكتلة × العجلة.. " * 6
+
+
+def run(chats: int, turns: int, max_chats: int, db_path: str | None):
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    memory = ConversationMemory(max_turns=turns, max_chats=max_chats, db_path=db_path)
+    memory.open()
+
+    start = time.perf_counter()
+    for chat_id in range(chats):
+        for turn in range(turns):
+            # نصوص جديدة لكل رسالة (زي الواقع) مش نفس الـ string متشارك
+            memory.append(chat_id, f"{QUESTION} {chat_id}-{turn}", f"{REPLY} {chat_id}-{turn}")
+    write_seconds = time.perf_counter() - start
+    memory.flush()
+
+    start = time.perf_counter()
+    for chat_id in range(0, chats, max(1, chats // 1000)):
+        memory.history(chat_id)
+    read_us = (time.perf_counter() - start) / min(chats, 1000) * 1e6
+
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    used = current - baseline
+    print(f"chats={chats:,} turns={turns} max_chats={max_chats:,} sqlite={'on' if db_path else 'off'}")
+    print(f"  in memory:  {len(memory):,} chats")
+    print(f"  heap:       {used / 2**20:.1f} MiB ({used / max(1, len(memory)):.0f} B/chat), "
+          f"peak {peak / 2**20:.1f} MiB")
+    print(f"  append:     {write_seconds / (chats * turns) * 1e6:.1f} µs/turn")
+    print(f"  history():  {read_us:.1f} µs/call")
+    memory.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chats', type=int, default=100_000)
+    parser.add_argument('--turns', type=int, default=6)
+    parser.add_argument('--max-chats', type=int, default=100_000)
+    parser.add_argument('--sqlite', action='store_true', help="تفعيل الحفظ في SQLite مؤقت")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        with tempfile.TemporaryDirectory() as tmp:
+            run(args.chats, args.turns, args.max_chats, os.path.join(tmp, 'conversations.db'))
+    else:
+        run(args.chats, args.turns, args.max_chats, None)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔎 مقارنة اللف على الكلمات (any(k in msg)) بالـ Aho-Corasick في KeywordMatcher
+الوقت في الطريقة القديمة بيكبر مع عدد الكلمات، والـ automaton على قد طول الرسالة بس
+
+التشغيل:
+    python benchmarks/bench_keyword_matcher.py --triggers 10 100 1000 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arabic_text import normalize_arabic  # noqa: E402
+from matcher import KeywordMatcher  # noqa: E402
+
+LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+
+
+def random_word(rng: random.Random, low: int = 3, high: int = 8) -> str:
+    return ''.join(rng.choice(LETTERS) for _ in range(rng.randint(low, high)))
+
+
+def random_message(rng: random.Random, length: int) -> str:
+    words = []
+    while sum(len(w) + 1 for w in words) < length:
+        words.append(random_word(rng, 2, 7))
+    return ' '.join(words)[:length]
+
+
+def naive_scan(triggers: list[tuple[str, int]], text: str) -> list:
+    """الطريقة القديمة: لف على كل كلمة وعمل substring search"""
+    message = text.lower()
+    return [payload for trigger, payload in triggers if trigger in message]
+
+
+def timeit(fn, messages: list[str], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            fn(message)
+    return (time.perf_counter() - start) / (repeat * len(messages)) * 1e6
+
+
+def run(trigger_counts: list[int], lengths: list[int], messages: int, repeat: int, seed: int):
+    rng = random.Random(seed)
+    print(f"{'triggers':>9} {'msg len':>8} {'naive µs':>10} {'automaton µs':>13} {'speedup':>8}")
+    for count in trigger_counts:
+        triggers = [(random_word(rng), i) for i in range(count)]
+        matcher = KeywordMatcher()
+        for trigger, payload in triggers:
+            matcher.add(trigger, payload)
+        matcher.build()
+        # الطريقة القديمة بتقارن بالكلمات زي ما هي، فنوحدها مرة عشان المقارنة تبقى عادلة
+        naive_triggers = [(normalize_arabic(t), p) for t, p in triggers]
+
+        for length in lengths:
+            sample = [random_message(rng, length) for _ in range(messages)]
+            # نتأكد إن الاتنين بيلاقوا نفس الكلمات
+            for message in sample[:20]:
+                assert set(naive_scan(naive_triggers, message)) == set(matcher.search(message))
+            naive = timeit(lambda m: naive_scan(naive_triggers, m), sample, repeat)
+            automaton = timeit(matcher.search, sample, repeat)
+            print(f"{count:>9,} {length:>8} {naive:>10.1f} {automaton:>13.1f} {naive / automaton:>7.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--triggers', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--lengths', type=int, nargs='+', default=[20, 200, 2000])
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.triggers, args.lengths, args.messages, args.repeat, args.seed)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📥 طابور الـ LLM تحت الضغط: الأولوية، الـ deadline، والـ restart
+مزود وهمي بحد تزامن (--slots) وحد في الدقيقة (--rpm) وزمن رد ثابت، والأسئلة بتوصل أسرع من قدرته
+
+1) انتظار الأسئلة العادية مقابل أسئلة الطلاب المشتركين (نفس الحمل)
+2) process بتقبل أسئلة وبتتقتل بـ SIGKILL في النص: كام سؤال رجع بعد الـ restart
+   (الـ flush كل --flush-interval فاللي بيضيع هو اللي اتقبل بعد آخر flush بس)
+
+للمقارنة end-to-end على main.py كامل:
+    LLM_QUEUE=0 GEMINI_REQUESTS_PER_MINUTE=120 python benchmarks/bench_replay.py --qps 15 --llm-latency 0.5
+    LLM_QUEUE=1 GEMINI_REQUESTS_PER_MINUTE=120 python benchmarks/bench_replay.py --qps 15 --llm-latency 0.5
+
+التشغيل:
+    python benchmarks/bench_llm_queue.py --rate 40 --duration 10 --slots 8 --rpm 1200 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import signal
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from llm_queue import Job, LLMQueue, QueueRejected  # noqa: E402
+from ratelimit import TokenBucket  # noqa: E402
+
+
+class FakeProvider:
+    """حد تزامن + حد في الدقيقة زي AIProvider (من غير شبكة)"""
+
+    def __init__(self, slots: int, rpm: float, latency: float):
+        self.slots = slots
+        self.latency = latency
+        rate = rpm / 60.0
+        self.quota = TokenBucket(rate, max(1.0, rate * 10))
+        self.rate_limited = 0
+
+    def quota_wait(self, requests: int = 1) -> float:
+        return self.quota.wait_time(amount=min(requests, self.quota.burst))
+
+    async def generate(self):
+        if not self.quota.consume():
+            self.rate_limited += 1
+            raise RuntimeError('429')
+        await asyncio.sleep(self.latency)
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def priority_run(args) -> dict:
+    provider = FakeProvider(args.slots, args.rpm, args.latency)
+    queue = LLMQueue(max_depth=args.max_depth, max_wait=args.max_wait)
+    queue.add_lane('fake', args.slots, provider.quota_wait)
+    waits = {'normal': [], 'priority': []}
+    outcomes = {'ok': 0, 'rejected': 0, 'error': 0}
+    rng = random.Random(args.seed)
+
+    async def ask(i: int):
+        kind = 'priority' if rng.random() < args.priority_share else 'normal'
+        job = Job(chat_id=i, message_id=i, user_id=i, text='سؤال', priority=30 if kind == 'priority' else 0)
+        try:
+            async with queue.slot(job, 'fake') as waited:
+                waits[kind].append(waited)
+                await provider.generate()
+            outcomes['ok'] += 1
+        except QueueRejected:
+            outcomes['rejected'] += 1
+        except RuntimeError:
+            outcomes['error'] += 1
+
+    tasks = []
+    started = time.perf_counter()
+    for i in range(int(args.rate * args.duration)):
+        delay = started + i / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(ask(i)))
+    await asyncio.gather(*tasks)
+    return {'waits': waits, 'outcomes': outcomes, 'dropped': dict(queue.dropped),
+            'rate_limited': provider.rate_limited, 'elapsed': time.perf_counter() - started}
+
+
+def accept_then_die(args, db_path: str, conn):
+    """process بتقبل أسئلة (المزود واقف) لحد ما الأب يقتلها"""
+    async def serve():
+        queue = LLMQueue(max_depth=100_000, max_wait=3600, db_path=db_path)
+        queue.open()
+        queue.add_lane('fake', 1)
+        flusher = asyncio.create_task(queue.run_flusher(args.flush_interval))
+        hold = asyncio.Event()
+
+        async def ask(i: int):
+            async with queue.slot(Job(i, i, i, f"سؤال {i}"), 'fake'):
+                await hold.wait()
+
+        accepted = 0
+        while True:
+            asyncio.create_task(ask(accepted))
+            accepted += 1
+            if accepted % 50 == 0:
+                conn.send(accepted)
+            await asyncio.sleep(1 / args.restart_rate)
+        await flusher
+
+    asyncio.run(serve())
+
+
+def restart_run(args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'queue.db')
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=accept_then_die, args=(args, db_path, child))
+        process.start()
+        accepted = 0
+        deadline = time.perf_counter() + args.restart_after
+        while time.perf_counter() < deadline:
+            if parent.poll(0.05):
+                accepted = parent.recv()
+        os.kill(process.pid, signal.SIGKILL)
+        process.join()
+        while parent.poll():
+            accepted = parent.recv()
+
+        started = time.perf_counter()
+        queue = LLMQueue(db_path=db_path, recover_max_age=3600)
+        queue.open()
+        recovered = queue.recover()
+        elapsed = time.perf_counter() - started
+        queue.close()
+    return {'accepted_at_least': accepted, 'recovered': len(recovered), 'recover_ms': elapsed * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=40, help="أسئلة في الثانية")
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--slots', type=int, default=8)
+    parser.add_argument('--rpm', type=float, default=1200, help="حد المزود في الدقيقة")
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--priority-share', type=float, default=0.1)
+    parser.add_argument('--max-depth', type=int, default=1000)
+    parser.add_argument('--max-wait', type=float, default=60)
+    parser.add_argument('--flush-interval', type=float, default=1.0)
+    parser.add_argument('--restart-rate', type=float, default=200, help="أسئلة في الثانية قبل الـ SIGKILL")
+    parser.add_argument('--restart-after', type=float, default=3.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    capacity = min(args.slots / args.latency, args.rpm / 60)
+    print(f"offered {args.rate:g} q/s for {args.duration:g}s, capacity ~{capacity:.1f} q/s "
+          f"(slots {args.slots}, rpm {args.rpm:g}, latency {args.latency}s), max wait {args.max_wait:g}s")
+    result = asyncio.run(priority_run(args))
+    for kind, waits in result['waits'].items():
+        if waits:
+            print(f"  wait {kind:<9} p50 {statistics.median(waits):6.2f}s | p95 {percentile(waits, 0.95):6.2f}s "
+                  f"| max {max(waits):6.2f}s ({len(waits)})")
+    print(f"  outcomes: {result['outcomes']} dropped {result['dropped']} "
+          f"provider 429s {result['rate_limited']} (all done after {result['elapsed']:.1f}s)")
+
+    restart = restart_run(args)
+    print(f"restart: accepted >= {restart['accepted_at_least']} before SIGKILL, "
+          f"recovered {restart['recovered']} in {restart['recover_ms']:.1f} ms "
+          f"(flush every {args.flush_interval:g}s)")
+
+
+if __name__ == '__main__':
+    main()
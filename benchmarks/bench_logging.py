@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🪵 تأخير الـ event loop بسبب اللوجات: basicConfig القديم مقابل الـ pipeline (QueueHandler)
+رسايل بتوصل بمعدل ثابت وكل واحدة بتكتب لوجات زي البوت، وtask بتنام 1ms وتقيس هي صحيت متأخرة قد إيه
+--sink-delay بيمثل stdout بطيء (pipe مليان أو log collector متأخر)
+
+التشغيل:
+    python benchmarks/bench_logging.py --messages 20000 --sink-delay 0.0005
+    python benchmarks/bench_logging.py --json --body redact
+"""
+
+import argparse
+import asyncio
+import io
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_pipeline import TEXT_FORMAT, setup_logging  # noqa: E402
+
+logger = logging.getLogger('bench')
+
+QUESTION = "يعني إيه قانون نيوتن التاني وإزاي أحل مسائل الحركة على مستوى مائل؟ " * 2
+
+
+class SlowSink(io.TextIOBase):
+    """stream بيستنى sink_delay مع كل write (زي الكتابة على pipe مليان)"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.lines = 0
+
+    def write(self, text: str) -> int:
+        if self.delay:
+            time.sleep(self.delay)
+        self.lines += 1
+        return len(text)
+
+
+async def handler_old(i: int):
+    """نفس لوجات البوت قبل الـ pipeline (f-strings)"""
+    logger.info(f"📩 رسالة من طالب ({i}): {QUESTION}")
+    await asyncio.sleep(0)
+    logger.info(f"🧭 route: fast (model {0.91:.0%})")
+    await asyncio.sleep(0)
+    logger.info(f"✅ رد عن طريق groq")
+    logger.info(f"⏱️ الرد ظهر بعد {812:.0f} ms")
+
+
+async def handler_new(i: int):
+    """نفس اللوجات بعد التحويل (lazy args + extra)"""
+    logger.info("📩 رسالة من %s (%s)", "طالب", i,
+                extra={'event': 'message', 'user_id': i, 'body': QUESTION, 'sampled': True})
+    await asyncio.sleep(0)
+    logger.info("🧭 route: %s (%s %.0f%%)", 'fast', 'model', 91.0,
+                extra={'event': 'route', 'route': 'fast', 'source': 'model', 'sampled': True})
+    await asyncio.sleep(0)
+    logger.info("✅ رد عن طريق %s", 'groq', extra={'event': 'ai_reply', 'provider': 'groq', 'sampled': True})
+    logger.info("⏱️ الرد ظهر بعد %.0f ms", 812.0, extra={'event': 'replied', 'elapsed_ms': 812, 'sampled': True})
+
+
+async def monitor(stop: asyncio.Event, lags: list[float], interval: float = 0.001):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def load(handler, messages: int, rate: float):
+    """الرسايل بتوصل بمعدل ثابت (دفعة كل 10ms) زي الـ updates من تيليجرام"""
+    tasks = []
+    per_tick = max(1, round(rate / 100))
+    start = time.perf_counter()
+    for i in range(0, messages, per_tick):
+        tasks.extend(asyncio.create_task(handler(j)) for j in range(i, min(i + per_tick, messages)))
+        delay = start + (i + per_tick) / rate - time.perf_counter()
+        await asyncio.sleep(max(0.0, delay))
+    await asyncio.gather(*tasks)
+
+
+async def scenario(handler, args) -> tuple[float, list[float]]:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(monitor(stop, lags))
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await load(handler, args.messages, args.rate)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await watcher
+    return elapsed, lags
+
+
+def report(name: str, elapsed: float, lags: list[float], sink: SlowSink, extra: str = ''):
+    ordered = sorted(lags)
+    p99 = ordered[int(0.99 * (len(ordered) - 1))]
+    print(f"{name:<26} {elapsed:6.2f}s  loop lag p50 {statistics.median(ordered) * 1000:6.2f} ms  "
+          f"p99 {p99 * 1000:7.2f} ms  max {ordered[-1] * 1000:7.2f} ms  "
+          f"lines written {sink.lines:,}{extra}")
+
+
+def run(args):
+    print(f"{args.messages:,} messages x 4 log lines at {args.rate:,.0f} msg/s, "
+          f"sink delay {args.sink_delay * 1e6:.0f} µs/line")
+
+    # 1. زي main.py القديم: basicConfig + StreamHandler على نفس الـ thread
+    sink = SlowSink(args.sink_delay)
+    logging.basicConfig(format=TEXT_FORMAT, level=logging.INFO, stream=sink, force=True)
+    elapsed, lags = asyncio.run(scenario(handler_old, args))
+    report("basicConfig (old)", elapsed, lags, sink)
+
+    # 2 و 3: الـ pipeline الجديد من غير طابور ومعاه
+    for use_queue in (False, True):
+        sink = SlowSink(args.sink_delay)
+        pipeline = setup_logging(
+            json_format=args.json, use_queue=use_queue, body_mode=args.body,
+            sample_rate=args.sample_rate, queue_size=args.queue_size, stream=sink,
+        )
+        elapsed, lags = asyncio.run(scenario(handler_new, args))
+        queued = pipeline.queued
+        drain_start = time.perf_counter()
+        pipeline.stop()
+        drain = time.perf_counter() - drain_start
+        extra = ''
+        if use_queue:
+            extra = (f", dropped {pipeline.dropped:,} (queue full), {queued:,} still queued "
+                     f"(drained in {drain:.2f}s)")
+        if args.sample_rate < 1:
+            extra += f", sampled out {pipeline.sampler.dropped:,}"
+        report("pipeline, queue" if use_queue else "pipeline, sync", elapsed, lags, sink, extra)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=20_000)
+    parser.add_argument('--rate', type=float, default=2000, help="رسالة/ثانية")
+    parser.add_argument('--sink-delay', type=float, default=0.0002, help="ثواني لكل سطر")
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('--body', default='full', choices=('full', 'truncate', 'redact', 'drop'))
+    parser.add_argument('--sample-rate', type=float, default=1.0)
+    parser.add_argument('--queue-size', type=int, default=10_000)
+    run(parser.parse_args())
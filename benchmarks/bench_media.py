@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🖼️ صور المسائل والريكوردات وسط الرسايل النصية على main.py كامل (من غير نت)
+Bot API وهمي بيقدم الملفات (getFile + تحميل على أجزاء) و Gemini وهمي - في process تانية
+
+الـ workload: رسايل نصية من routing.jsonl + صور (photo بمقاسات تيليجرام، وملف أصلي 4000x3000
+كـ document) + ريكوردات، ونسبة منها forwards لنفس الملف (نفس file_unique_id)
+
+بيطبع: زمن كل نوع (النص لازم ميتأثرش بالميديا)، تأخير الـ event loop، الميديا اللي اتحملت
+مقابل اللي اتبعت لـ Gemini، التكرار اللي اترد عليه من غير تحميل، طلبات Gemini، والذاكرة (RSS)
+
+للمقارنة: نفس الحمل من غير ميديا (--media 0) أو بعدد workers مختلف:
+    python benchmarks/bench_media.py --media 0
+    MEDIA_WORKERS=1 python benchmarks/bench_media.py
+    MEDIA_WORKERS=8 MEDIA_SPOOL_BYTES=100000000 python benchmarks/bench_media.py
+
+التشغيل:
+    python benchmarks/bench_media.py --qps 20 --duration 20 --media 0.3 --forwards 0.5
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_llm import LatencyModel, StubGeminiServer  # noqa: E402
+from fake_telegram import FakeTelegramServer  # noqa: E402
+
+# مقاسات تيليجرام لصورة 4:3 (الأصل بيتبعت كـ document بس)
+PHOTO_SIZES = ((90, 68), (320, 240), (800, 600), (1280, 960), (2560, 1920))
+DOCUMENT_SIZE = (4000, 3000)
+VOICE_BYTES = 60_000
+CAPTIONS = ('', '', 'حل المسألة دي', 'ايه القانون هنا', 'مش فاهم الرسم ده')
+
+
+def make_photo(seed: int, size: tuple[int, int]) -> bytes:
+    """صورة شبه صورة ورقة بالموبايل (تدرج + كلام + noise) بحجم JPEG قريب من الحقيقي"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    width, height = size
+    image = Image.linear_gradient('L').resize(size).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for _ in range(60):
+        y = rng.randrange(height)
+        draw.line((rng.randrange(width // 4), y, rng.randrange(width // 2, width), y),
+                  fill=(rng.randrange(80), rng.randrange(80), rng.randrange(80)), width=max(1, width // 400))
+    noise = Image.effect_noise(size, 40).convert('RGB')
+    image = Image.blend(image, noise, 0.25)
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=90)
+    return output.getvalue()
+
+
+# ===================================
+# السيرفرات الوهمية (process منفصلة)
+# ===================================
+def run_stubs(args, conn):
+    async def serve():
+        telegram = FakeTelegramServer(latency=args.telegram_latency)
+        gemini = StubGeminiServer(LatencyModel(args.llm_latency, 0.3, seed=2))
+        files = {}
+        for i in range(args.distinct):
+            for width, height in PHOTO_SIZES:
+                data = make_photo(i, (width, height))
+                telegram.add_file(f"photo{i}-{width}", data)
+                files[f"photo{i}-{width}"] = len(data)
+            data = make_photo(i, DOCUMENT_SIZE)
+            telegram.add_file(f"doc{i}", data)
+            files[f"doc{i}"] = len(data)
+            telegram.add_file(f"voice{i}", random.Random(i).randbytes(VOICE_BYTES))
+            files[f"voice{i}"] = VOICE_BYTES
+        for server in (telegram, gemini):
+            await server.start()
+        conn.send({
+            'telegram': telegram.base_url,
+            'telegram_files': telegram.base_file_url,
+            'gemini': gemini.endpoint,
+            'cert': gemini.cert_path,
+            'files': files,
+        })
+        await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+        conn.send({
+            'telegram': dict(telegram.calls),
+            'bytes_served': telegram.bytes_served,
+            'gemini': dict(gemini.calls),
+            'max_in_flight': gemini.max_in_flight,
+        })
+        for server in (telegram, gemini):
+            await server.stop()
+
+    asyncio.run(serve())
+
+
+# ===================================
+# الـ workload
+# ===================================
+def media_message(kind: str, index: int, files: dict, caption: str) -> dict:
+    if kind == 'photo':
+        return {'caption': caption, 'photo': [
+            {'file_id': f"photo{index}-{w}", 'file_unique_id': f"u-photo{index}-{w}",
+             'width': w, 'height': h, 'file_size': files[f"photo{index}-{w}"]}
+            for w, h in PHOTO_SIZES
+        ]}
+    if kind == 'document':
+        return {'caption': caption, 'document': {
+            'file_id': f"doc{index}", 'file_unique_id': f"u-doc{index}", 'file_name': 'IMG_2024.jpg',
+            'mime_type': 'image/jpeg', 'file_size': files[f"doc{index}"],
+        }}
+    return {'voice': {
+        'file_id': f"voice{index}", 'file_unique_id': f"u-voice{index}", 'duration': 12,
+        'mime_type': 'audio/ogg', 'file_size': files[f"voice{index}"],
+    }}
+
+
+def build_workload(args, texts: list[str], files: dict) -> list[tuple[str, dict]]:
+    rng = random.Random(args.seed)
+    workload = []
+    # (index, caption) للملفات اللي اتبعتت - الـ forward بيعيد واحد منهم بنفس الكلام
+    seen = {'photo': [], 'document': [], 'voice': []}
+    for update_id in range(1, int(args.qps * args.duration) + 1):
+        user_id = 10_000 + rng.randrange(args.users)
+        chat = {'id': user_id, 'type': 'private', 'first_name': 'طالب'}
+        message = {'message_id': update_id, 'date': int(time.time()), 'chat': chat,
+                   'from': {'id': user_id, 'is_bot': False, 'first_name': 'طالب'}}
+        kind = 'text'
+        if rng.random() < args.media:
+            kind = rng.choice(('photo', 'photo', 'document', 'voice'))
+            if seen[kind] and (rng.random() < args.forwards or len(seen[kind]) == args.distinct):
+                index, caption = rng.choice(seen[kind])
+            else:
+                index, caption = len(seen[kind]), rng.choice(CAPTIONS)
+                seen[kind].append((index, caption))
+            message.update(media_message(kind, index, files, caption))
+        else:
+            message['text'] = rng.choice(texts)
+        workload.append((kind, {'update_id': update_id, 'message': message}))
+    return workload
+
+
+# ===================================
+# الـ replay
+# ===================================
+def rss_mib() -> tuple[float, float]:
+    current = 0.0
+    try:
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        pass
+    return current, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def measure_loop_lag(samples: list[float], interval: float = 0.01):
+    """التأخير بين ما الـ loop المفروض يصحى وما صحي فعلاً (فك الصور لو وقف الـ loop بيبان هنا)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def replay(args, stubs: dict):
+    os.environ.update({
+        'TELEGRAM_BOT_TOKEN': '123:media',
+        'GEMINI_API_KEY': 'media-key',
+        'TELEGRAM_BASE_URL': stubs['telegram'],
+        'TELEGRAM_BASE_FILE_URL': stubs['telegram_files'],
+        'GEMINI_API_ENDPOINT': stubs['gemini'],
+        'GRPC_DEFAULT_SSL_ROOTS_FILE_PATH': stubs['cert'],
+        'CHAT_REGISTRY_PATH': ':memory:',
+        'ANSWER_BANK_PATH': os.path.join(BENCH_DIR, 'no-bank.db'),
+        'METRICS_PORT': '0',
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING'),
+    })
+    os.environ.pop('GROQ_API_KEY', None)
+
+    import main
+    from telegram import Update
+    from telegram.ext import TypeHandler
+
+    with open(args.corpus, 'r', encoding='utf-8') as f:
+        texts = [json.loads(line)['text'] for line in f if line.strip()]
+    workload = build_workload(args, texts, stubs['files'])
+
+    application = main.build_application()
+    sent_at: dict[int, float] = {}
+    kinds: dict[int, str] = {}
+    latency: dict[str, list[float]] = {'text': [], 'photo': [], 'document': [], 'voice': []}
+    all_done = asyncio.Event()
+
+    async def done(update: Update, context):
+        latency[kinds[update.update_id]].append(time.perf_counter() - sent_at[update.update_id])
+        if sum(map(len, latency.values())) == len(workload):
+            all_done.set()
+
+    application.add_handler(TypeHandler(Update, done), group=99)
+    await application.initialize()
+    await application.post_init(application)
+    await application.start()
+    rss_started, _ = rss_mib()
+    lag: list[float] = []
+    lag_task = asyncio.create_task(measure_loop_lag(lag))
+
+    started = time.perf_counter()
+    for i, (kind, payload) in enumerate(workload):
+        delay = started + i / args.qps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        update = Update.de_json(payload, application.bot)
+        kinds[update.update_id] = kind
+        sent_at[update.update_id] = time.perf_counter()
+        await application.update_queue.put(update)
+    try:
+        await asyncio.wait_for(all_done.wait(), timeout=args.drain_timeout)
+    except asyncio.TimeoutError:
+        print(f"⚠️ {len(workload) - sum(map(len, latency.values()))} updates لسه مخلصتش بعد {args.drain_timeout}s")
+    elapsed = time.perf_counter() - started
+    lag_task.cancel()
+    rss_end, rss_peak = rss_mib()
+    pipeline = main.media_pipeline
+    media = {
+        'downloads': pipeline.downloads, 'downloaded': pipeline.bytes_downloaded, 'sent': pipeline.bytes_sent,
+        'dedup': pipeline.dedup_hits, 'rejected': dict(pipeline.rejected),
+    }
+
+    await application.stop()
+    await application.post_stop(application)
+    await application.shutdown()
+    await application.post_shutdown(application)
+    return {
+        'workload': workload, 'latency': latency, 'elapsed': elapsed, 'lag': sorted(lag),
+        'rss': (rss_started, rss_end, rss_peak), 'media': media,
+        'outcomes': {labels[0]: main.MESSAGE_SECONDS.count(*labels) for labels in main.MESSAGE_SECONDS.series},
+    }
+
+
+def report(args, result: dict, stub_stats: dict):
+    counts = {kind: sum(1 for k, _ in result['workload'] if k == kind) for kind in result['latency']}
+    print(f"workload: {len(result['workload']):,} updates at {args.qps:g} qps {counts}, "
+          f"{args.distinct} distinct files per kind, forwards {args.forwards:.0%}, "
+          f"media workers {os.environ.get('MEDIA_WORKERS', '4')}, llm median {args.llm_latency}s")
+    for kind, values in result['latency'].items():
+        if values:
+            ordered = sorted(values)
+            print(f"  {kind + ':':<10} p50 {statistics.median(ordered) * 1000:7.1f} ms | "
+                  f"p95 {percentile(ordered, 0.95) * 1000:7.1f} ms | max {ordered[-1] * 1000:7.1f} ms ({len(ordered):,})")
+    lag = result['lag']
+    if lag:
+        print(f"  loop lag:  p99 {percentile(lag, 0.99) * 1000:6.1f} ms | max {lag[-1] * 1000:6.1f} ms")
+    media = result['media']
+    print(f"  media:     {media['downloads']} downloads ({media['downloaded'] / 2**20:.1f} MiB) "
+          f"-> {media['sent'] / 2**20:.2f} MiB to gemini | dedup hits {media['dedup']} | rejected {media['rejected']}")
+    print(f"  outcomes:  {result['outcomes']} (all done after {result['elapsed']:.1f}s)")
+    print(f"  gemini:    {stub_stats['gemini']} max in flight {stub_stats['max_in_flight']}")
+    print(f"  bot api:   {stub_stats['telegram']} ({stub_stats['bytes_served'] / 2**20:.1f} MiB served)")
+    started, end, peak = result['rss']
+    print(f"  memory:    {started:.0f} MiB started -> {end:.0f} MiB end (peak {peak:.0f} MiB)")
+
+
+def run(args):
+    parent, child = multiprocessing.Pipe()
+    stubs_process = multiprocessing.Process(target=run_stubs, args=(args, child), daemon=True)
+    stubs_process.start()
+    stubs = parent.recv()
+    try:
+        result = asyncio.run(replay(args, stubs))
+        parent.send('stats')
+        report(args, result, parent.recv())
+    finally:
+        stubs_process.join(timeout=5)
+        if stubs_process.is_alive():
+            stubs_process.terminate()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--qps', type=float, default=20)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--media', type=float, default=0.3, help="نسبة الصور والريكوردات من الـ updates")
+    parser.add_argument('--forwards', type=float, default=0.5, help="نسبة الميديا اللي هي forward لملف اتبعت قبل كده")
+    parser.add_argument('--distinct', type=int, default=8, help="عدد الملفات المختلفة من كل نوع")
+    parser.add_argument('--corpus', default=os.path.join(BENCH_DIR, 'data', 'routing.jsonl'))
+    parser.add_argument('--llm-latency', type=float, default=0.8)
+    parser.add_argument('--telegram-latency', type=float, default=0.03)
+    parser.add_argument('--drain-timeout', type=float, default=120)
+    parser.add_argument('--seed', type=int, default=0)
+    logging.basicConfig(level=logging.WARNING)
+    run(parser.parse_args())
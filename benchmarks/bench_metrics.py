@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📈 تكلفة القياسات على الـ hot path (ns لكل عملية) وزمن الـ scrape لـ /metrics
+
+التشغيل:
+    python benchmarks/bench_metrics.py --ops 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import FAST_BUCKETS, MetricsRegistry  # noqa: E402
+
+
+def per_op_ns(fn, ops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return (time.perf_counter() - start) / ops * 1e9
+
+
+def run(ops: int, series: int):
+    registry = MetricsRegistry()
+    counter = registry.counter('bench_total', "bench", ('route', 'source'))
+    gauge = registry.gauge('bench_in_flight', "bench")
+    histogram = registry.histogram('bench_seconds', "bench", ('outcome',))
+    fast = registry.histogram('bench_scan_seconds', "bench", buckets=FAST_BUCKETS)
+
+    def timed():
+        with fast.time():
+            pass
+
+    baseline = per_op_ns(lambda: None, ops)
+    results = {
+        'counter.inc (2 labels)': per_op_ns(lambda: counter.inc('fast', 'model'), ops),
+        'gauge.inc + dec': per_op_ns(lambda: (gauge.inc(), gauge.dec()), ops),
+        'histogram.observe': per_op_ns(lambda: histogram.observe(0.42, 'ai'), ops),
+        'with histogram.time()': per_op_ns(timed, ops),
+    }
+    print(f"{ops:,} ops each (empty lambda call = {baseline:.0f} ns, subtracted)")
+    for name, ns in results.items():
+        print(f"  {name:<24} {ns - baseline:6.0f} ns")
+
+    for i in range(series):
+        counter.inc(f"route{i}", 'model')
+        histogram.observe(i / series, f"outcome{i}")
+    start = time.perf_counter()
+    body = registry.render()
+    print(f"render with {series} label sets: {(time.perf_counter() - start) * 1000:.2f} ms, "
+          f"{len(body) / 1024:.0f} KiB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ops', type=int, default=1_000_000)
+    parser.add_argument('--series', type=int, default=50)
+    args = parser.parse_args()
+    run(args.ops, args.series)
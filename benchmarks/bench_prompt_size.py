@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📏 مقارنة حجم الـ prompt وزمن الرد: ملف المعرفة كله vs الأجزاء المرتبطة بس
+زمن المزود متحاكي: زمن ثابت + زمن لكل token في الـ prompt
+
+التشغيل:
+    python benchmarks/bench_prompt_size.py --scale 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', 'bench')
+os.environ.setdefault('GEMINI_API_KEY', 'bench')
+os.environ.setdefault('CHAT_REGISTRY_PATH', ':memory:')
+
+import main  # noqa: E402
+from knowledge import KnowledgeIndex, estimate_tokens  # noqa: E402
+
+QUESTIONS = [
+    "كورس الشهر الاول بكام؟",
+    "عايز اسجل حساب جديد ازاي",
+    "رقم الواتساب بتاع الدعم الفني ايه",
+    "اشرحلي قانون نيوتن الأول",
+    "ايه الفرق بين السرعة والعجلة؟",
+    "الكورس بيبدأ امتى وبيخلص امتى",
+    "لينك قناة اليوتيوب",
+    "احسب الشغل المبذول لما قوة 10 نيوتن تحرك جسم 5 متر",
+    "المنصة فيها ملخصات PDF؟",
+    "مين مستر فارس وبيدرس لأي صف",
+]
+
+
+async def fake_provider(prompt: str, base_latency: float, per_token_ms: float):
+    """مزود وهمي زمنه بيزيد مع حجم الـ prompt (prefill)"""
+    await asyncio.sleep(base_latency + estimate_tokens(prompt) * per_token_ms / 1000)
+
+
+async def measure(build_prompt, args) -> tuple[list[int], list[float]]:
+    tokens, latencies = [], []
+    for question in QUESTIONS:
+        start = time.perf_counter()
+        prompt = f"{build_prompt(question)}\n\nسؤال الطالب: {question}\n\nالرد:"
+        await fake_provider(prompt, args.base_latency, args.per_token_ms)
+        latencies.append((time.perf_counter() - start) * 1000)
+        tokens.append(estimate_tokens(prompt))
+    return tokens, latencies
+
+
+async def run(args):
+    with open(os.path.join(ROOT, 'Knowledge.txt'), 'r', encoding='utf-8') as f:
+        knowledge = '\n\n'.join([f.read()] * args.scale)
+
+    def full_prompt(question: str) -> str:
+        return f"{main.BOT_PERSONALITY}\nمعلومات المنصة:\n{knowledge}\n"
+
+    start = time.perf_counter()
+    main.knowledge_index = KnowledgeIndex.from_text(knowledge)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    before = await measure(full_prompt, args)
+    after = await measure(main.build_system_prompt, args)
+
+    print(f"knowledge: {estimate_tokens(knowledge)} tokens, "
+          f"{len(main.knowledge_index)} chunks (index built in {build_ms:.1f} ms)\n")
+    print(f"{'':>8} | {'avg tokens':>10} | {'max tokens':>10} | {'p50 ms':>8} | {'max ms':>8}")
+    print("-" * 56)
+    for label, (tokens, latencies) in (("before", before), ("after", after)):
+        print(f"{label:>8} | {statistics.mean(tokens):>10.0f} | {max(tokens):>10} | "
+              f"{statistics.median(latencies):>8.1f} | {max(latencies):>8.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=1, help="تكرار ملف المعرفة لمحاكاة نموه")
+    parser.add_argument('--base-latency', type=float, default=0.3)
+    parser.add_argument('--per-token-ms', type=float, default=0.2)
+    asyncio.run(run(parser.parse_args()))
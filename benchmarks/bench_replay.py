@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔁 Replay لرسايل طلاب حقيقية على main.py كامل من غير نت ومن غير tokens
+Bot API وهمي + Groq و Gemini وهميين (في process تانية عشان ميقاسموش البوت الـ CPU)
+والـ updates بتدخل الـ Application بمعدل ثابت (QPS) زي ما بتوصل من تيليجرام
+
+بيطبع: throughput، p50/p95/p99 لزمن معالجة الـ update كامل، نتايج الرسايل (ai/easter_egg/throttled/...)،
+طلبات الـ LLM لكل رسالة (شاملة الـ retries)، طلبات Bot API، والذاكرة (RSS)
+
+التشغيل:
+    python benchmarks/bench_replay.py --qps 50 --duration 30
+    python benchmarks/bench_replay.py --qps 200 --duration 20 --llm-latency 1.5 --llm-error-rate 0.05 --groq
+    STREAMING_REPLIES=1 python benchmarks/bench_replay.py --qps 20 --groq
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_llm import LatencyModel, StubGeminiServer, StubGroqServer  # noqa: E402
+from fake_telegram import FakeTelegramServer  # noqa: E402
+
+BUTTONS = ('courses', 'prices', 'support', 'about', 'back_home')
+COMMANDS = ('/start', '/prices', '/courses', '/help')
+BOT_ID = 100000
+
+
+# ===================================
+# السيرفرات الوهمية (process منفصلة)
+# ===================================
+def run_stubs(args, conn):
+    async def serve():
+        telegram = FakeTelegramServer(latency=args.telegram_latency)
+        groq = StubGroqServer(LatencyModel(
+            args.llm_latency / 2, args.llm_sigma, args.llm_error_rate, args.llm_429_rate, seed=1))
+        gemini = StubGeminiServer(LatencyModel(
+            args.llm_latency, args.llm_sigma, args.llm_error_rate, args.llm_429_rate, seed=2))
+        for server in (telegram, groq, gemini):
+            await server.start()
+        conn.send({
+            'telegram': telegram.base_url,
+            'groq': groq.base_url,
+            'gemini': gemini.endpoint,
+            'cert': gemini.cert_path,
+        })
+        # بنستنى طلب الإحصائيات من الـ benchmark
+        await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+        conn.send({
+            'telegram': dict(telegram.calls),
+            'groq': dict(groq.calls),
+            'gemini': dict(gemini.calls),
+            'max_in_flight': {'groq': groq.max_in_flight, 'gemini': gemini.max_in_flight},
+        })
+        for server in (telegram, groq, gemini):
+            await server.stop()
+
+    asyncio.run(serve())
+
+
+# ===================================
+# الـ corpus
+# ===================================
+def load_corpus(path: str) -> list[str]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line)['text'] for line in f if line.strip()]
+
+
+def make_update(update_id: int, user_id: int, kind: str, payload: str) -> dict:
+    user = {'id': user_id, 'is_bot': False, 'first_name': 'طالب', 'language_code': 'ar'}
+    chat = {'id': user_id, 'type': 'private', 'first_name': 'طالب'}
+    if kind == 'button':
+        return {'update_id': update_id, 'callback_query': {
+            'id': str(update_id), 'chat_instance': str(user_id), 'from': user, 'data': payload,
+            'message': {'message_id': 1, 'date': int(time.time()), 'chat': chat,
+                        'from': {'id': BOT_ID, 'is_bot': True, 'first_name': 'Newton'},
+                        'text': "🍎 القائمة الرئيسية"},
+        }}
+    message = {'message_id': update_id, 'date': int(time.time()), 'chat': chat, 'from': user, 'text': payload}
+    if kind == 'command':
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(payload)}]
+    return {'update_id': update_id, 'message': message}
+
+
+def build_workload(args, texts: list[str], easter_eggs: list[str]) -> list[tuple[str, dict]]:
+    """قايمة (نوع, update) بالترتيب - نفس الـ seed = نفس الـ workload"""
+    rng = random.Random(args.seed)
+    workload = []
+    for update_id in range(1, int(args.qps * args.duration) + 1):
+        user_id = 10_000 + rng.randrange(args.users)
+        roll = rng.random()
+        if roll < args.buttons:
+            kind, payload = 'button', rng.choice(BUTTONS)
+        elif roll < args.buttons + args.commands:
+            kind, payload = 'command', rng.choice(COMMANDS)
+        elif roll < args.buttons + args.commands + args.easter_eggs:
+            kind, payload = 'message', rng.choice(easter_eggs)
+        else:
+            kind, payload = 'message', rng.choice(texts)
+        workload.append((kind, make_update(update_id, user_id, kind, payload)))
+    return workload
+
+
+# ===================================
+# الـ replay
+# ===================================
+def rss_mib() -> tuple[float, float]:
+    """(RSS دلوقتي, أعلى RSS) بالـ MiB"""
+    current = 0.0
+    try:
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        pass
+    return current, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def replay(args, stubs: dict):
+    # main بيقرا الإعدادات وقت الـ import
+    os.environ.update({
+        'TELEGRAM_BOT_TOKEN': '123:replay',
+        'GEMINI_API_KEY': 'replay-key',
+        'TELEGRAM_BASE_URL': stubs['telegram'],
+        'GEMINI_API_ENDPOINT': stubs['gemini'],
+        'GRPC_DEFAULT_SSL_ROOTS_FILE_PATH': stubs['cert'],
+        'CHAT_REGISTRY_PATH': ':memory:',
+        'METRICS_PORT': '0',
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING'),
+    })
+    if args.groq:
+        os.environ.update({'GROQ_API_KEY': 'replay-key', 'GROQ_BASE_URL': stubs['groq']})
+    else:
+        os.environ.pop('GROQ_API_KEY', None)
+
+    rss_before_import, _ = rss_mib()
+    import main
+    from telegram import Update
+    from telegram.ext import TypeHandler
+
+    texts = load_corpus(args.corpus)
+    easter_eggs = [trigger for triggers in main.EASTER_EGGS for trigger in triggers]
+    workload = build_workload(args, texts, easter_eggs)
+
+    application = main.build_application()
+    sent_at: dict[int, float] = {}
+    latency: dict[str, list[float]] = {'message': [], 'button': [], 'command': []}
+    kinds: dict[int, str] = {}
+    all_done = asyncio.Event()
+
+    async def done(update: Update, context):
+        latency[kinds[update.update_id]].append(time.perf_counter() - sent_at[update.update_id])
+        if sum(map(len, latency.values())) == len(workload):
+            all_done.set()
+
+    # group أخير: بيتنادى بعد ما الـ handler الأصلي يخلص (رد اتبعت أو خطأ)
+    application.add_handler(TypeHandler(Update, done), group=99)
+
+    await application.initialize()
+    await application.post_init(application)
+    await application.start()
+    rss_started, _ = rss_mib()
+
+    interval = 1.0 / args.qps
+    started = time.perf_counter()
+    for i, (kind, payload) in enumerate(workload):
+        delay = started + i * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        update = Update.de_json(payload, application.bot)
+        kinds[update.update_id] = kind
+        sent_at[update.update_id] = time.perf_counter()
+        await application.update_queue.put(update)
+    offered = time.perf_counter() - started
+    try:
+        await asyncio.wait_for(all_done.wait(), timeout=args.drain_timeout)
+    except asyncio.TimeoutError:
+        print(f"⚠️ {len(workload) - sum(map(len, latency.values()))} updates لسه مخلصتش بعد {args.drain_timeout}s")
+    elapsed = time.perf_counter() - started
+    rss_end, rss_peak = rss_mib()
+
+    await application.stop()
+    await application.post_stop(application)
+    await application.shutdown()
+    await application.post_shutdown(application)
+
+    return {
+        'workload': workload, 'latency': latency, 'offered': offered, 'elapsed': elapsed,
+        'rss': (rss_before_import, rss_started, rss_end, rss_peak),
+        'outcomes': {labels[0]: main.MESSAGE_SECONDS.count(*labels) for labels in main.MESSAGE_SECONDS.series},
+        'ai_sources': {labels[0]: main.AI_SECONDS.count(*labels) for labels in main.AI_SECONDS.series},
+        'routes': dict(main.ROUTES.values),
+    }
+
+
+def report(args, result: dict, stub_stats: dict):
+    workload, latency = result['workload'], result['latency']
+    handled = sum(map(len, latency.values()))
+    messages = sum(1 for kind, _ in workload if kind == 'message')
+    print(f"workload: {len(workload):,} updates ({messages:,} messages) at {args.qps:g} qps from {args.users:,} users, "
+          f"llm median {args.llm_latency}s, errors {args.llm_error_rate:.0%}, 429s {args.llm_429_rate:.0%}, "
+          f"groq {'on' if args.groq else 'off'}, streaming {os.environ.get('STREAMING_REPLIES', '0')}")
+    print(f"  throughput:   {handled / result['elapsed']:,.1f} updates/s "
+          f"(offered over {result['offered']:.1f}s, all handled after {result['elapsed']:.1f}s)")
+    for kind, values in latency.items():
+        if not values:
+            continue
+        ordered = sorted(values)
+        print(f"  {kind + ':':<13} p50 {statistics.median(ordered) * 1000:7.1f} ms | "
+              f"p95 {percentile(ordered, 0.95) * 1000:7.1f} ms | p99 {percentile(ordered, 0.99) * 1000:7.1f} ms "
+              f"| max {ordered[-1] * 1000:7.1f} ms ({len(ordered):,})")
+    print(f"  outcomes:     {result['outcomes']}")
+    print(f"  ai sources:   {result['ai_sources']}")
+    print(f"  routes:       { {'/'.join(k): int(v) for k, v in result['routes'].items()} }")
+    llm_calls = sum(sum(stub_stats[name].values()) for name in ('groq', 'gemini'))
+    print(f"  llm calls:    {llm_calls:,} ({llm_calls / max(1, messages):.2f} per message) "
+          f"groq {stub_stats['groq']} gemini {stub_stats['gemini']} max in flight {stub_stats['max_in_flight']}")
+    print(f"  bot api:      {stub_stats['telegram']}")
+    before, started, end, peak = result['rss']
+    print(f"  memory:       {before:.0f} MiB before import -> {started:.0f} MiB started -> {end:.0f} MiB end "
+          f"(peak {peak:.0f} MiB)")
+
+
+def run(args):
+    parent, child = multiprocessing.Pipe()
+    stubs_process = multiprocessing.Process(target=run_stubs, args=(args, child), daemon=True)
+    stubs_process.start()
+    stubs = parent.recv()
+    try:
+        result = asyncio.run(replay(args, stubs))
+        parent.send('stats')
+        report(args, result, parent.recv())
+    finally:
+        stubs_process.join(timeout=5)
+        if stubs_process.is_alive():
+            stubs_process.terminate()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--qps', type=float, default=50)
+    parser.add_argument('--duration', type=float, default=20, help="ثواني من الـ updates")
+    parser.add_argument('--users', type=int, default=2000, help="عدد الطلاب المختلفين (الـ rate limit لكل طالب)")
+    parser.add_argument('--buttons', type=float, default=0.15, help="نسبة ضغطات الأزرار")
+    parser.add_argument('--commands', type=float, default=0.05, help="نسبة الأوامر (/start ...)")
+    parser.add_argument('--easter-eggs', type=float, default=0.05, help="نسبة رسايل الـ Easter Eggs")
+    parser.add_argument('--corpus', default=os.path.join(BENCH_DIR, 'data', 'routing.jsonl'))
+    parser.add_argument('--groq', action='store_true', help="تفعيل Groq (من غيره Gemini بس)")
+    parser.add_argument('--llm-latency', type=float, default=0.8, help="median زمن Gemini (Groq نصه)")
+    parser.add_argument('--llm-sigma', type=float, default=0.5, help="تشتت الـ lognormal")
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--llm-429-rate', type=float, default=0.0)
+    parser.add_argument('--telegram-latency', type=float, default=0.03)
+    parser.add_argument('--drain-timeout', type=float, default=120)
+    parser.add_argument('--seed', type=int, default=0)
+    logging.basicConfig(level=logging.WARNING)
+    run(parser.parse_args())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🚀 زمن التشغيل: import main لوحده، وتشغيل `python main.py` كامل لحد أول update يترد عليه
+(Bot API وهمي بيسلّم update واحد في أول getUpdates - و Gemini وهمي لو --kind ai)
+
+التشغيل:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --kind ai --runs 5 --no-warmup
+    python benchmarks/bench_startup.py --root /tmp/old-checkout   # مقارنة بنسخة تانية من الكود
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_llm import LatencyModel, StubGeminiServer  # noqa: E402
+from fake_telegram import FakeTelegramServer  # noqa: E402
+
+MESSAGES = {
+    'static': "الكورس بكام",
+    'ai': "ليه الجسم بيفضل ساكن لو محصلش عليه قوة؟",
+}
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def base_env(args, tmp: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        'TELEGRAM_BOT_TOKEN': '123:startup',
+        'GEMINI_API_KEY': 'startup-key',
+        'CHAT_REGISTRY_PATH': os.path.join(tmp, 'chats.db'),
+        'METRICS_PORT': '0',
+        'LOG_LEVEL': 'WARNING',
+        'PROVIDER_WARMUP': '0' if args.no_warmup else '1',
+    })
+    env.pop('GROQ_API_KEY', None)
+    return env
+
+
+def measure_import(args, env: dict) -> list[float]:
+    times = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_SNIPPET], cwd=args.root, env=env,
+            capture_output=True, text=True, check=True,
+        ).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return times
+
+
+def make_update(update_id: int, text: str) -> dict:
+    user = {'id': 5000 + update_id, 'is_bot': False, 'first_name': 'طالب'}
+    return {'update_id': update_id, 'message': {
+        'message_id': update_id, 'date': int(time.time()), 'text': text,
+        'chat': {'id': user['id'], 'type': 'private'}, 'from': user,
+    }}
+
+
+async def one_run(args, env: dict, run: int) -> dict:
+    telegram = FakeTelegramServer()
+    await telegram.start()
+    telegram.push_update(make_update(run + 1, MESSAGES[args.kind]))
+    env = dict(env, TELEGRAM_BASE_URL=telegram.base_url)
+
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, 'main.py', cwd=args.root, env=env,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+    )
+    deadline = started + args.timeout
+    while 'sendMessage' not in telegram.first_call and time.perf_counter() < deadline:
+        if process.returncode is not None:
+            break
+        await asyncio.sleep(0.005)
+
+    process.send_signal(signal.SIGINT)
+    _, stderr = await process.communicate()
+    await telegram.stop()
+    if 'sendMessage' not in telegram.first_call:
+        raise RuntimeError(f"مفيش رد بعد {args.timeout}s:\n{stderr.decode('utf-8', 'replace')[-2000:]}")
+    return {method: telegram.first_call[method] - started for method in ('getMe', 'getUpdates', 'sendMessage')}
+
+
+def summary(values: list[float]) -> str:
+    return (f"median {statistics.median(values) * 1000:6.0f} ms | min {min(values) * 1000:6.0f} ms | "
+            f"first {values[0] * 1000:6.0f} ms")
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = base_env(args, tmp)
+        gemini = None
+        if args.kind == 'ai':
+            gemini = StubGeminiServer(LatencyModel(median=args.llm_latency, sigma=0.0))
+            await gemini.start()
+            env.update({
+                'GEMINI_API_ENDPOINT': gemini.endpoint,
+                'GRPC_DEFAULT_SSL_ROOTS_FILE_PATH': gemini.cert_path,
+            })
+
+        print(f"root={args.root} kind={args.kind} warmup={'off' if args.no_warmup else 'on'} runs={args.runs}")
+        print(f"  {'import main:':<21} {summary(measure_import(args, env))}")
+
+        results = [await one_run(args, env, run) for run in range(args.runs)]
+        for method, label in (
+            ('getMe', 'initialized (getMe)'),
+            ('getUpdates', 'polling'),
+            ('sendMessage', 'first update replied'),
+        ):
+            print(f"  {label + ':':<21} {summary([r[method] for r in results])}")
+
+        if gemini is not None:
+            await gemini.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--kind', choices=tuple(MESSAGES), default='static',
+                        help="static: رد جاهز من غير LLM | ai: أول رد محتاج Gemini")
+    parser.add_argument('--no-warmup', action='store_true', help="PROVIDER_WARMUP=0")
+    parser.add_argument('--llm-latency', type=float, default=0.05)
+    parser.add_argument('--root', default=ROOT, help="فولدر فيه main.py")
+    parser.add_argument('--timeout', type=float, default=30)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🌐 Replay لتحديثات تيليجرام متسجلة على الـ webhook endpoint
+بيقيس updates/sec و p50/p99 لزمن الـ ack (رد الـ HTTP) وزمن المعالجة كامل لحد ما الـ handler يخلص
+(Bot API وهمي محلي - من غير نت ومن غير LLM)
+
+التشغيل:
+    python benchmarks/bench_webhook.py --updates 5000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import statistics
+import sys
+import time
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram.ext import Application, CallbackQueryHandler, MessageHandler, filters  # noqa: E402
+
+from fake_telegram import FakeTelegramServer  # noqa: E402
+from webhook import SECRET_HEADER, WebhookServer  # noqa: E402
+
+SECRET = 'bench-secret'
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(args):
+    with open(args.payloads, 'r', encoding='utf-8') as f:
+        recorded = [json.loads(line) for line in f if line.strip()]
+
+    telegram = FakeTelegramServer()
+    await telegram.start()
+
+    sent_at: dict[int, float] = {}
+    handled_latency: list[float] = []
+    all_handled = asyncio.Event()
+
+    def done(update):
+        handled_latency.append(time.perf_counter() - sent_at[update.update_id])
+        if len(handled_latency) == args.updates:
+            all_handled.set()
+
+    async def on_message(update, context):
+        await update.message.reply_text("رد تجريبي 🍎")
+        done(update)
+
+    async def on_button(update, context):
+        await update.callback_query.answer()
+        done(update)
+
+    application = (
+        Application.builder()
+        .token('123:bench')
+        .base_url(telegram.base_url)
+        .concurrent_updates(args.concurrency)
+        .connection_pool_size(args.concurrency)
+        .build()
+    )
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, on_message))
+    application.add_handler(CallbackQueryHandler(on_button))
+
+    server = WebhookServer(application, 'telegram', SECRET, listen='127.0.0.1', port=args.port)
+    await application.initialize()
+    await application.start()
+    await server.start()
+
+    ack_latency: list[float] = []
+    url = f"http://127.0.0.1:{args.port}/telegram"
+    headers = {SECRET_HEADER: SECRET, 'Content-Type': 'application/json'}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def post(session, update_id: int):
+        payload = copy.deepcopy(recorded[update_id % len(recorded)])
+        payload['update_id'] = update_id
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        async with semaphore:
+            sent_at[update_id] = start = time.perf_counter()
+            async with session.post(url, data=body, headers=headers) as response:
+                assert response.status == 200, response.status
+            ack_latency.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(post(session, i) for i in range(args.updates)))
+        await asyncio.wait_for(all_handled.wait(), timeout=120)
+        elapsed = time.perf_counter() - started
+        async with session.get(f"http://127.0.0.1:{args.port}/healthz") as response:
+            health = await response.json()
+
+    await server.stop()
+    await application.stop()
+    await application.shutdown()
+    await telegram.stop()
+
+    print(f"updates={args.updates} concurrency={args.concurrency} payloads={len(recorded)}")
+    print(f"  throughput:    {args.updates / elapsed:,.0f} updates/s")
+    print(f"  ack latency:   p50 {statistics.median(ack_latency) * 1000:.1f} ms | "
+          f"p99 {percentile(ack_latency, 0.99) * 1000:.1f} ms")
+    print(f"  handled (e2e): p50 {statistics.median(handled_latency) * 1000:.1f} ms | "
+          f"p99 {percentile(handled_latency, 0.99) * 1000:.1f} ms")
+    print(f"  bot api calls: {telegram.calls}")
+    print(f"  health:        {health}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--updates', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--payloads', default=os.path.join(ROOT, 'benchmarks', 'data', 'updates.jsonl'))
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧭 تقييم الـ router المتدرب offline على corpus متعلّم عليه (cross-validation)
+بيقارن الـ heuristic القديم (len < 50 + كلمات) بالموديل: دقة التوجيه ومصفوفة الأخطاء
+والتكلفة والزمن المتوقعين لكل 1000 رسالة (الأرقام من الـ flags مش من فواتير حقيقية)
+
+على الـ corpus ده الموديل مكسبه في الدقة (وأسئلة الـ strong اللي بتروح لموديل أضعف)، مش في التكلفة:
+الـ heuristic بيبان أرخص شوية لأنه بيبعت أسئلة محتاجة Gemini لـ Groq. رفع --min-confidence بيرخّص
+الموديل بنفس الطريقة (بيرجع للـ heuristic أكتر) - فالسطر الأخير بيطبع الاتنين جنب بعض
+
+التشغيل:
+    python benchmarks/eval_router.py --data benchmarks/data/routing.jsonl --folds 5
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', 'bench')
+os.environ.setdefault('GEMINI_API_KEY', 'bench')
+os.environ.setdefault('CHAT_REGISTRY_PATH', ':memory:')
+os.environ['ROUTER_MODEL_PATH'] = ''
+
+import main  # noqa: E402
+from router import ROUTES, STATIC, FAST, STRONG, LearnedRouter, RoutingModel, load_samples  # noqa: E402
+
+
+def heuristic(text: str) -> str:
+    return FAST if main.is_simple_question(text) else STRONG
+
+
+def learned(router: LearnedRouter, text: str) -> str:
+    """نفس منطق main.route_message: الموديل، ولو مش متأكد الـ heuristic"""
+    decision = router.route(text)
+    route = decision.route if decision else heuristic(text)
+    if route == STATIC and main.static_page_for(text) is None:
+        route = FAST
+    return route
+
+
+def cross_validate(samples, folds: int, min_confidence: float, seed: int):
+    rng = random.Random(seed)
+    shuffled = samples[:]
+    rng.shuffle(shuffled)
+    predictions = {'heuristic': [], 'model': [], 'all strong': []}
+    for fold in range(folds):
+        test = shuffled[fold::folds]
+        train = [s for i, s in enumerate(shuffled) if i % folds != fold]
+        router = LearnedRouter(RoutingModel.train(train, seed=seed), min_confidence)
+        for text, truth in test:
+            predictions['heuristic'].append((truth, heuristic(text)))
+            predictions['model'].append((truth, learned(router, text)))
+            predictions['all strong'].append((truth, STRONG))
+    return predictions
+
+
+def report(name: str, pairs, cost: dict, latency: dict):
+    correct = sum(truth == predicted for truth, predicted in pairs)
+    # سؤال محتاج الموديل القوي وراح لموديل أضعف = خطر على جودة الرد
+    under = sum(truth == STRONG and predicted != STRONG for truth, predicted in pairs)
+    total_cost = sum(cost[predicted] for _, predicted in pairs) / len(pairs) * 1000
+    mean_latency = sum(latency[predicted] for _, predicted in pairs) / len(pairs)
+    print(f"\n== {name}")
+    print(f"  accuracy:        {correct / len(pairs):.1%} ({correct}/{len(pairs)})")
+    print(f"  strong→weaker:   {under}")
+    print(f"  cost/1k msgs:    ${total_cost:.3f}")
+    print(f"  mean latency:    {mean_latency:.2f}s")
+    print(f"  {'truth/pred':>14}" + ''.join(f"{r:>8}" for r in ROUTES))
+    for truth in ROUTES:
+        row = [sum(t == truth and p == predicted for t, p in pairs) for predicted in ROUTES]
+        print(f"  {truth:>14}" + ''.join(f"{n:>8}" for n in row))
+    return total_cost, mean_latency, under
+
+
+def measure_load(samples, min_confidence: float):
+    """زمن تحميل الموديل وقت التشغيل وزمن التوقع لكل رسالة"""
+    model = RoutingModel.train(samples)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'router_model.json')
+        model.save(path)
+        size = os.path.getsize(path)
+        load_ms = []
+        for _ in range(3):
+            start = time.perf_counter()
+            router = LearnedRouter.from_file(path, min_confidence)
+            load_ms.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    for text, _ in samples:
+        router.route(text)
+    predict_us = (time.perf_counter() - start) / len(samples) * 1e6
+    print(f"\nmodel: {len(model):,} features, {size / 1024:.0f} KiB, "
+          f"load {load_ms[0]:.1f} ms cold / {min(load_ms):.1f} ms warm, predict {predict_us:.0f} µs/msg")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default=os.path.join(ROOT, 'benchmarks', 'data', 'routing.jsonl'))
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--min-confidence', type=float, default=main.ROUTER_MIN_CONFIDENCE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--fast-cost', type=float, default=0.0004, help="دولار لكل طلب Groq")
+    parser.add_argument('--strong-cost', type=float, default=0.0012, help="دولار لكل طلب Gemini")
+    parser.add_argument('--fast-latency', type=float, default=0.8)
+    parser.add_argument('--strong-latency', type=float, default=2.5)
+    args = parser.parse_args()
+
+    cost = {STATIC: 0.0, FAST: args.fast_cost, STRONG: args.strong_cost}
+    latency = {STATIC: 0.05, FAST: args.fast_latency, STRONG: args.strong_latency}
+
+    samples = load_samples(args.data)
+    print(f"{len(samples)} samples, {args.folds}-fold cross-validation, min confidence {args.min_confidence}")
+    results = {
+        name: report(name, pairs, cost, latency)
+        for name, pairs in cross_validate(samples, args.folds, args.min_confidence, args.seed).items()
+    }
+    base_cost, base_latency, base_under = results['heuristic']
+    model_cost, model_latency, model_under = results['model']
+    print(f"\nmodel vs heuristic: cost {model_cost / base_cost - 1:+.0%}, "
+          f"latency {model_latency / base_latency - 1:+.0%}, strong→weaker {base_under} → {model_under}")
+    if model_cost >= base_cost:
+        print("  مفيش توفير في التكلفة: المكسب في الدقة بس (الـ heuristic أرخص لأنه بيوجه أسئلة strong غلط)")
+    measure_load(samples, args.min_confidence)
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 سيرفرات Groq و Gemini وهمية للـ benchmarks
+- Groq: HTTP متوافق مع OpenAI (/openai/v1/chat/completions) عادي و streaming (SSE)
+- Gemini: gRPC (الـ SDK الـ async بيكلم gRPC بس) على TLS بشهادة self-signed مؤقتة
+زمن الرد lognormal حوالين median، ونسبة أخطاء ونسبة 429 قابلة للضبط
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import tempfile
+import time
+
+from aiohttp import web
+
+REPLY = ("قانون نيوتن التاني بيقول إن القوة المحصلة = الكتلة × العجلة 🍎 "
+         "يعني كل ما القوة تزيد العجلة تزيد، وكل ما الكتلة تزيد العجلة تقل. "
+         "جرب تحل مسألة بنفسك ولو وقفت ابعتلي.. شغل عالي يا زميلي! ⚡")
+
+
+class LatencyModel:
+    """زمن الرد + توزيع الأخطاء (كل حاجة random من seed ثابت عشان الـ runs تتقارن)"""
+
+    def __init__(self, median: float = 0.5, sigma: float = 0.5, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, seed: int = 0):
+        self.median = median
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+
+    def delay(self) -> float:
+        if not self.median:
+            return 0.0
+        return self.random.lognormvariate(math.log(self.median), self.sigma)
+
+    def outcome(self) -> str:
+        """'ok' أو 'error' أو 'rate_limited'"""
+        roll = self.random.random()
+        if roll < self.error_rate:
+            return 'error'
+        if roll < self.error_rate + self.rate_limit_rate:
+            return 'rate_limited'
+        return 'ok'
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class _StubServer:
+    """العدادات المشتركة بين السيرفرين"""
+
+    def __init__(self, latency: LatencyModel, reply: str = REPLY, chunks: int = 6):
+        self.latency = latency
+        self.reply = reply
+        self.chunks = chunks
+        self.calls: dict[str, int] = {'ok': 0, 'error': 0, 'rate_limited': 0}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def _begin(self) -> str:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        outcome = self.latency.outcome()
+        self.calls[outcome] += 1
+        return outcome
+
+    def _parts(self) -> list[str]:
+        size = math.ceil(len(self.reply) / self.chunks)
+        return [self.reply[i:i + size] for i in range(0, len(self.reply), size)]
+
+
+class StubGroqServer(_StubServer):
+    """Groq وهمي: AsyncGroq(base_url=server.base_url)"""
+
+    def __init__(self, latency: LatencyModel, host: str = '127.0.0.1', port: int = 0, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.host = host
+        self.port = port
+        self._runner = None
+        self.app = web.Application()
+        self.app.router.add_post('/openai/v1/chat/completions', self.handle)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        outcome = self._begin()
+        try:
+            await asyncio.sleep(self.latency.delay())
+            if outcome == 'error':
+                return web.json_response({'error': {'message': 'stub failure', 'type': 'server_error'}}, status=500)
+            if outcome == 'rate_limited':
+                return web.json_response(
+                    {'error': {'message': 'Rate limit reached', 'type': 'tokens'}},
+                    status=429, headers={'retry-after': '1'},
+                )
+            prompt = ''.join(message['content'] for message in body['messages'])
+            usage = {
+                'prompt_tokens': _estimate_tokens(prompt),
+                'completion_tokens': _estimate_tokens(self.reply),
+                'total_tokens': _estimate_tokens(prompt) + _estimate_tokens(self.reply),
+            }
+            if body.get('stream'):
+                return await self._stream(request, body['model'], usage)
+            return web.json_response({
+                'id': 'chatcmpl-stub', 'object': 'chat.completion', 'created': int(time.time()),
+                'model': body['model'],
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': self.reply}}],
+                'usage': usage,
+            })
+        finally:
+            self.in_flight -= 1
+
+    async def _stream(self, request: web.Request, model: str, usage: dict) -> web.StreamResponse:
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        parts = self._parts()
+        for i, part in enumerate(parts):
+            last = i == len(parts) - 1
+            chunk = {
+                'id': 'chatcmpl-stub', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'content': part}, 'finish_reason': 'stop' if last else None}],
+            }
+            if last:
+                chunk['x_groq'] = {'id': 'stub', 'usage': usage}
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+            await asyncio.sleep(0.02)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if not self.port:
+            self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def make_self_signed_cert(directory: str, host: str = '127.0.0.1') -> tuple[str, str]:
+    """شهادة مؤقتة لـ 127.0.0.1 و localhost عن طريق openssl (cert, key)"""
+    cert = os.path.join(directory, 'cert.pem')
+    key = os.path.join(directory, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-keyout', key, '-out', cert, '-subj', '/CN=localhost',
+         '-addext', f'subjectAltName=IP:{host},DNS:localhost'],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+class StubGeminiServer(_StubServer):
+    """Gemini وهمي على gRPC
+
+    الـ client بيثق في الشهادة عن طريق GRPC_DEFAULT_SSL_ROOTS_FILE_PATH=server.cert_path
+    (لازم يتظبط قبل أول channel) و genai.configure(client_options={'api_endpoint': server.endpoint})
+    """
+
+    SERVICE = 'google.ai.generativelanguage.v1beta.GenerativeService'
+
+    def __init__(self, latency: LatencyModel, host: str = '127.0.0.1', port: int = 0, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.host = host
+        self.port = port
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cert_path, self._key_path = make_self_signed_cert(self._tmp.name, host)
+        self._server = None
+
+    @property
+    def endpoint(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def _response(self, text: str, prompt_tokens: int, completion_tokens: int):
+        import google.ai.generativelanguage as glm
+        return glm.GenerateContentResponse(
+            candidates=[glm.Candidate(
+                content=glm.Content(role='model', parts=[glm.Part(text=text)]),
+                finish_reason=glm.Candidate.FinishReason.STOP,
+                index=0,
+            )],
+            usage_metadata=glm.GenerateContentResponse.UsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=completion_tokens,
+                total_token_count=prompt_tokens + completion_tokens,
+            ),
+        )
+
+    @staticmethod
+    def _prompt_tokens(request) -> int:
+        return sum(_estimate_tokens(part.text) for content in request.contents for part in content.parts)
+
+    async def _fail(self, outcome: str, context):
+        import grpc
+        if outcome == 'error':
+            await context.abort(grpc.StatusCode.INTERNAL, 'stub failure')
+        await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, 'Resource has been exhausted')
+
+    async def generate_content(self, request, context):
+        outcome = self._begin()
+        try:
+            await asyncio.sleep(self.latency.delay())
+            if outcome != 'ok':
+                await self._fail(outcome, context)
+            return self._response(self.reply, self._prompt_tokens(request), _estimate_tokens(self.reply))
+        finally:
+            self.in_flight -= 1
+
+    async def stream_generate_content(self, request, context):
+        outcome = self._begin()
+        try:
+            await asyncio.sleep(self.latency.delay())
+            if outcome != 'ok':
+                await self._fail(outcome, context)
+            prompt_tokens = self._prompt_tokens(request)
+            text = ''
+            for part in self._parts():
+                text += part
+                yield self._response(part, prompt_tokens, _estimate_tokens(text))
+                await asyncio.sleep(0.02)
+        finally:
+            self.in_flight -= 1
+
+    async def start(self):
+        import grpc
+        import google.ai.generativelanguage as glm
+
+        handlers = {
+            'GenerateContent': grpc.unary_unary_rpc_method_handler(
+                self.generate_content,
+                request_deserializer=glm.GenerateContentRequest.deserialize,
+                response_serializer=glm.GenerateContentResponse.serialize,
+            ),
+            'StreamGenerateContent': grpc.unary_stream_rpc_method_handler(
+                self.stream_generate_content,
+                request_deserializer=glm.GenerateContentRequest.deserialize,
+                response_serializer=glm.GenerateContentResponse.serialize,
+            ),
+        }
+        self._server = grpc.aio.server()
+        self._server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(self.SERVICE, handlers),))
+        with open(self._key_path, 'rb') as key, open(self.cert_path, 'rb') as cert:
+            credentials = grpc.ssl_server_credentials([(key.read(), cert.read())])
+        self.port = self._server.add_secure_port(f"{self.host}:{self.port}", credentials)
+        await self._server.start()
+
+    async def stop(self):
+        if self._server is not None:
+            await self._server.stop(grace=None)
+            self._server = None
+        self._tmp.cleanup()
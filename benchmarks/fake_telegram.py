@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 سيرفر Bot API وهمي للـ benchmarks
+بيرد على أي method بـ ok=true ونتيجة معقولة، فالـ Application بيشتغل كامل من غير نت
+"""
+
+import asyncio
+import itertools
+import time
+
+from aiohttp import web
+
+BOT_USER = {'id': 100000, 'is_bot': True, 'first_name': 'Newton', 'username': 'newton_bench_bot'}
+
+
+class FakeTelegramServer:
+    """Bot API محلي: /bot<token>/<method>
+
+    flood_every: كل كام sendMessage يرجع 429 مع retry_after (لمحاكاة حد تيليجرام)
+    getUpdates بيرجع اللي اتحط بـ push_update (وإلا بيستنى شوية ويرجع [] زي الـ long polling)
+    getFile والتحميل من /file/bot<token>/<path> للملفات اللي اتحطت بـ add_file
+    first_call: أول مرة كل method اتطلب فيها (time.perf_counter)
+    """
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency: float = 0.0,
+        flood_every: int = 0,
+        retry_after: int = 1,
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.flood_every = flood_every
+        self.retry_after = retry_after
+        self.flooded = 0
+        self.calls: dict[str, int] = {}
+        self.first_call: dict[str, float] = {}
+        self._updates: list[dict] = []
+        self._files: dict[str, bytes] = {}
+        self.bytes_served = 0
+        self._message_ids = itertools.count(1)
+        self._runner = None
+        self.app = web.Application()
+        self.app.router.add_route('*', '/bot{token}/{method}', self.handle)
+        self.app.router.add_get('/file/bot{token}/{path:.+}', self.handle_file)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/bot"
+
+    @property
+    def base_file_url(self) -> str:
+        return f"http://{self.host}:{self.port}/file/bot"
+
+    def add_file(self, file_id: str, data: bytes):
+        self._files[file_id] = data
+
+    async def handle_file(self, request: web.Request) -> web.StreamResponse:
+        """الملف على أجزاء (زي سيرفر تيليجرام - الـ client مش لازم يستنى الملف كله)"""
+        self.calls['file'] = self.calls.get('file', 0) + 1
+        data = self._files.get(request.match_info['path'].removeprefix('files/'))
+        if data is None:
+            raise web.HTTPNotFound()
+        response = web.StreamResponse(headers={'Content-Length': str(len(data))})
+        await response.prepare(request)
+        for start in range(0, len(data), 64 * 1024):
+            await response.write(data[start:start + 64 * 1024])
+        self.bytes_served += len(data)
+        await response.write_eof()
+        return response
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        self.calls[method] = self.calls.get(method, 0) + 1
+        self.first_call.setdefault(method, time.perf_counter())
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.flood_every and method == 'sendMessage' and self.calls[method] % self.flood_every == 0:
+            self.flooded += 1
+            return web.json_response({
+                'ok': False,
+                'error_code': 429,
+                'description': f'Too Many Requests: retry after {self.retry_after}',
+                'parameters': {'retry_after': self.retry_after},
+            }, status=429)
+        params = dict(request.query)
+        if request.can_read_body:
+            if request.content_type == 'application/json':
+                params.update(await request.json())
+            else:
+                params.update(await request.post())
+        if method.lower() == 'getupdates':
+            return web.json_response({'ok': True, 'result': await self._get_updates(params)})
+        return web.json_response({'ok': True, 'result': self._result(method.lower(), params)})
+
+    def push_update(self, update: dict):
+        self._updates.append(update)
+
+    async def _get_updates(self, params: dict) -> list[dict]:
+        offset = int(params.get('offset') or 0)
+        self._updates = [u for u in self._updates if u['update_id'] >= offset]
+        if not self._updates:
+            await asyncio.sleep(0.05)
+        return self._updates[:100]
+
+    def _result(self, method: str, params: dict):
+        if method == 'getme':
+            return BOT_USER
+        if method == 'getfile':
+            file_id = str(params.get('file_id'))
+            return {
+                'file_id': file_id,
+                'file_unique_id': f"u-{file_id}",
+                'file_size': len(self._files.get(file_id, b'')),
+                'file_path': f"files/{file_id}",
+            }
+        if method in ('sendmessage', 'editmessagetext', 'sendphoto', 'senddocument'):
+            chat_id = int(params.get('chat_id') or 1)
+            return {
+                'message_id': int(params.get('message_id') or next(self._message_ids)),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': BOT_USER,
+                'text': str(params.get('text', '')),
+            }
+        return True
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if not self.port:
+            self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📣 الإذاعة لكل الطلاب (/broadcast)
+- سجل صغير في SQLite لكل الشاتات اللي كلمت البوت (بيتكتب على دفعات)
+- طابور async بعدد workers ثابت وحد عام للرسايل في الثانية (أقل من حد تيليجرام ~30)
+  عشان ردود الطلاب العادية يفضلها مساحة
+- RetryAfter بيوقف الإذاعة كلها المدة المطلوبة، والتقدم بيتحفظ كل دفعة
+  فلو البوت اتقفل بتكمل من مكانها بعد الـ restart
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+
+from telegram.error import BadRequest, ChatMigrated, Forbidden, NetworkError, RetryAfter
+
+from ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+RUNNING = 'running'
+DONE = 'done'
+CANCELLED = 'cancelled'
+STATUS_LABELS = {RUNNING: "شغالة ⏳", DONE: "خلصت ✅", CANCELLED: "اتلغت ⛔"}
+
+SENT = 'sent'
+FAILED = 'failed'
+BLOCKED = 'blocked'
+
+FIRST_CURSOR = -(2 ** 63)
+
+
+class ChatRegistry:
+    """كل الشاتات اللي كلمت البوت - الإضافة في الذاكرة والكتابة على الديسك على دفعات
+
+    الملف بيتفتح في open() (أو أول ما الـ db يتطلب) - مش في الـ constructor، عشان import main ميعملش ملفات
+    """
+
+    def __init__(self, db_path: str, flush_batch: int = 500, max_seen: int = 200_000):
+        self.db_path = db_path
+        self.flush_batch = flush_batch
+        self.max_seen = max_seen
+        # الشاتات اللي اتسجلت في التشغيل ده (عشان منكتبش نفس الشات مع كل رسالة)
+        self._seen: set[int] = set()
+        self._pending: list[tuple[int, float]] = []
+        self._db: sqlite3.Connection | None = None
+
+    def open(self):
+        if self._db is not None:
+            return
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS chats ('
+            'chat_id INTEGER PRIMARY KEY, added REAL NOT NULL, blocked INTEGER NOT NULL DEFAULT 0)'
+        )
+        self._db.commit()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        self.open()
+        return self._db
+
+    def __len__(self) -> int:
+        self.flush()
+        return self.db.execute('SELECT COUNT(*) FROM chats WHERE blocked = 0').fetchone()[0]
+
+    def add(self, chat_id: int):
+        if chat_id in self._seen:
+            return
+        if len(self._seen) >= self.max_seen:
+            # التكرار بعد المسح مش مشكلة: الكتابة نفسها idempotent
+            self._seen.clear()
+        self._seen.add(chat_id)
+        self._pending.append((chat_id, time.time()))
+        if len(self._pending) >= self.flush_batch:
+            self.flush()
+
+    def flush(self):
+        """كتابة الشاتات الجديدة في transaction واحدة (ولو كان حاظر البوت ورجع نشيل الحظر)"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        with self.db:
+            self.db.executemany(
+                'INSERT INTO chats (chat_id, added) VALUES (?, ?) '
+                'ON CONFLICT (chat_id) DO UPDATE SET blocked = 0 WHERE blocked = 1',
+                pending,
+            )
+
+    def mark_blocked(self, chat_ids: list[int]):
+        if not chat_ids:
+            return
+        with self.db:
+            self.db.executemany('UPDATE chats SET blocked = 1 WHERE chat_id = ?', [(c,) for c in chat_ids])
+        self._seen.difference_update(chat_ids)
+
+    def active_after(self, cursor: int, limit: int) -> list[int]:
+        """الدفعة الجاية من الشاتات مترتبة بالـ chat_id (الترتيب ده هو اللي بيخلي الاستكمال ممكن)"""
+        rows = self.db.execute(
+            'SELECT chat_id FROM chats WHERE chat_id > ? AND blocked = 0 ORDER BY chat_id LIMIT ?',
+            (cursor, limit),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    async def run_flusher(self, interval: float = 5.0):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"❌ فشل حفظ سجل الشاتات: {e}")
+
+    def close(self):
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class _Job:
+    __slots__ = ('id', 'text', 'admin_chat_id', 'status_message_id', 'cursor',
+                 'total', 'sent', 'failed', 'blocked', 'status', 'started_at', 'done_at_start', 'outcomes')
+
+    def __init__(self, row: tuple):
+        (self.id, self.text, self.admin_chat_id, self.status_message_id, self.cursor,
+         self.total, self.sent, self.failed, self.blocked, self.status) = row
+        self.started_at = time.monotonic()
+        # نتيجة كل شات في الدفعة الحالية (None = لسه) - بتتضاف للعدادات عند الـ checkpoint
+        self.outcomes: list[str | None] = []
+        # اللي اتبعت قبل الـ restart مش بيدخل في حساب السرعة
+        self.done_at_start = self.done
+
+    def count(self, outcome: str) -> int:
+        saved = {SENT: self.sent, FAILED: self.failed, BLOCKED: self.blocked}[outcome]
+        return saved + self.outcomes.count(outcome)
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed + self.blocked + len(self.outcomes) - self.outcomes.count(None)
+
+
+class Broadcaster:
+    """بيبعت رسالة واحدة لكل الشاتات في السجل بحد عام للسرعة مع حفظ التقدم"""
+
+    def __init__(
+        self,
+        bot,
+        registry: ChatRegistry,
+        rate: float = 20.0,
+        workers: int = 8,
+        chunk_size: int = 200,
+        max_retries: int = 3,
+        progress_interval: float = 5.0,
+    ):
+        self.bot = bot
+        self.registry = registry
+        self.rate = rate
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.progress_interval = progress_interval
+        # burst صغير عشان مانعديش حد تيليجرام في أي ثانية
+        self._bucket = TokenBucket(rate, max(1.0, rate / 5))
+        self._paused_until = 0.0
+        self._job: _Job | None = None
+        self._task: asyncio.Task | None = None
+        self.db = registry.db
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS broadcasts ('
+            'id INTEGER PRIMARY KEY, text TEXT NOT NULL, admin_chat_id INTEGER NOT NULL, '
+            'status_message_id INTEGER, cursor INTEGER NOT NULL, total INTEGER NOT NULL, '
+            'sent INTEGER NOT NULL DEFAULT 0, failed INTEGER NOT NULL DEFAULT 0, '
+            'blocked INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL, '
+            'created REAL NOT NULL, finished REAL)'
+        )
+        self.db.commit()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    # ---------- التحكم ----------
+    def start(self, text: str, admin_chat_id: int, status_message_id: int | None = None) -> asyncio.Task:
+        """تسجيل إذاعة جديدة وتشغيلها في الخلفية"""
+        if self.running:
+            raise RuntimeError("في إذاعة شغالة بالفعل")
+        total = len(self.registry)
+        with self.db:
+            cursor = self.db.execute(
+                'INSERT INTO broadcasts (text, admin_chat_id, status_message_id, cursor, total, status, created) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (text, admin_chat_id, status_message_id, FIRST_CURSOR, total, RUNNING, time.time()),
+            )
+        return self._launch(cursor.lastrowid)
+
+    def resume(self) -> asyncio.Task | None:
+        """لو في إذاعة كانت شغالة قبل الـ restart نكملها"""
+        row = self.db.execute(
+            'SELECT id FROM broadcasts WHERE status = ? ORDER BY id DESC LIMIT 1', (RUNNING,)
+        ).fetchone()
+        if row is None or self.running:
+            return None
+        logger.info(f"📣 استكمال الإذاعة #{row[0]}")
+        return self._launch(row[0])
+
+    async def cancel(self) -> bool:
+        if not self.running:
+            return False
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._finish(CANCELLED)
+        return True
+
+    def _launch(self, job_id: int) -> asyncio.Task:
+        row = self.db.execute(
+            'SELECT id, text, admin_chat_id, status_message_id, cursor, total, sent, failed, blocked, status '
+            'FROM broadcasts WHERE id = ?', (job_id,)
+        ).fetchone()
+        self._job = _Job(row)
+        self._task = asyncio.create_task(self._run(self._job))
+        return self._task
+
+    # ---------- الإرسال ----------
+    async def _run(self, job: _Job):
+        queue: asyncio.Queue[tuple[int, int]] = asyncio.Queue()
+        chunk: list[int] = []
+        workers = [asyncio.create_task(self._worker(job, queue)) for _ in range(self.workers)]
+        reporter = asyncio.create_task(self._report_progress(job))
+        try:
+            while True:
+                self.registry.flush()
+                chunk = self.registry.active_after(job.cursor, self.chunk_size)
+                if not chunk:
+                    break
+                job.outcomes = [None] * len(chunk)
+                for index, chat_id in enumerate(chunk):
+                    queue.put_nowait((index, chat_id))
+                await queue.join()
+                self._checkpoint(job, chunk)
+            self._finish(DONE)
+            logger.info(f"📣 الإذاعة #{job.id} خلصت: {job.sent} اتبعتت، {job.failed} فشلت، {job.blocked} حاظرين")
+        except sqlite3.Error as e:
+            # الحالة فاضلة running فهتكمل بعد الـ restart من آخر دفعة اتحفظت
+            logger.error(f"❌ الإذاعة #{job.id} وقفت: {e}")
+        finally:
+            for task in (*workers, reporter):
+                task.cancel()
+            await asyncio.gather(*workers, reporter, return_exceptions=True)
+            if job.status == RUNNING and chunk:
+                # اتقطعنا في نص دفعة (restart): نحفظ لحد آخر شات كل اللي قبله خلص
+                self._checkpoint(job, chunk)
+            await self._show_progress(job)
+
+    def _checkpoint(self, job: _Job, chunk: list[int]):
+        """نضيف نتايج أول الدفعة (لحد أول شات لسه مخلصش) للعدادات ونحفظ الـ cursor عنده"""
+        outcomes = job.outcomes
+        done = outcomes.index(None) if None in outcomes else len(outcomes)
+        if done:
+            job.cursor = chunk[done - 1]
+        job.sent += outcomes[:done].count(SENT)
+        job.failed += outcomes[:done].count(FAILED)
+        job.blocked += outcomes[:done].count(BLOCKED)
+        self.registry.mark_blocked([chunk[i] for i in range(done) if outcomes[i] == BLOCKED])
+        # الباقي هيتبعت تاني بعد الاستكمال فمش بيتحسب
+        job.outcomes = []
+        self._save(job)
+
+    async def _worker(self, job: _Job, queue: asyncio.Queue):
+        while True:
+            index, chat_id = await queue.get()
+            try:
+                outcome = await self._send(chat_id, job.text)
+            except Exception as e:
+                logger.error(f"❌ خطأ في إذاعة لـ {chat_id}: {e}")
+                outcome = FAILED
+            finally:
+                queue.task_done()
+            job.outcomes[index] = outcome
+
+    async def _acquire(self):
+        """نستنى دورنا في الحد العام (ولو تيليجرام قال استنى، الكل بيستنى)"""
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+            elif self._bucket.consume(now):
+                return
+            else:
+                await asyncio.sleep(1.0 / self.rate)
+
+    async def _send(self, chat_id: int, text: str) -> str:
+        for attempt in range(self.max_retries + 1):
+            await self._acquire()
+            try:
+                await self.bot.send_message(chat_id, text)
+                return SENT
+            except RetryAfter as e:
+                delay = float(e.retry_after)
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                logger.warning(f"⚠️ الإذاعة اتوقفت {delay} ثانية (429 من تيليجرام)")
+            except ChatMigrated as e:
+                self.registry.add(e.new_chat_id)
+                return BLOCKED
+            except Forbidden:
+                # الطالب حاظر البوت أو الحساب اتقفل
+                return BLOCKED
+            except BadRequest as e:
+                if 'chat not found' in str(e).lower():
+                    return BLOCKED
+                logger.warning(f"⚠️ إذاعة لـ {chat_id} اترفضت: {e}")
+                return FAILED
+            except NetworkError as e:
+                logger.warning(f"⚠️ إذاعة لـ {chat_id} فشلت (محاولة {attempt + 1}): {e}")
+                await asyncio.sleep(min(30.0, 2 ** attempt))
+        return FAILED
+
+    # ---------- الحالة ----------
+    def _save(self, job: _Job):
+        with self.db:
+            self.db.execute(
+                'UPDATE broadcasts SET cursor = ?, sent = ?, failed = ?, blocked = ? WHERE id = ?',
+                (job.cursor, job.sent, job.failed, job.blocked, job.id),
+            )
+
+    def _finish(self, status: str):
+        job = self._job
+        job.status = status
+        with self.db:
+            self.db.execute(
+                'UPDATE broadcasts SET status = ?, finished = ?, sent = ?, failed = ?, blocked = ? WHERE id = ?',
+                (status, time.time(), job.sent, job.failed, job.blocked, job.id),
+            )
+
+    def describe(self) -> str:
+        job = self._job
+        if job is None:
+            return "📣 مفيش إذاعة اتعملت من ساعة ما البوت اشتغل"
+        total = max(job.total, job.done, 1)
+        elapsed = max(time.monotonic() - job.started_at, 1e-6)
+        lines = [
+            f"📣 الإذاعة #{job.id}: {STATUS_LABELS[job.status]}",
+            f"📬 {job.done:,}/{total:,} ({job.done / total:.0%})",
+            f"✅ اتبعتت: {job.count(SENT):,} | ❌ فشلت: {job.count(FAILED):,} | 🚫 حاظرين: {job.count(BLOCKED):,}",
+        ]
+        if job.status == RUNNING:
+            speed = (job.done - job.done_at_start) / elapsed
+            remaining = (total - job.done) / speed if speed else 0
+            lines.append(f"⚡ {speed:.1f} رسالة/ثانية | الباقي تقريباً {remaining / 60:.1f} دقيقة")
+        return "\n".join(lines)
+
+    async def _show_progress(self, job: _Job):
+        if job.status_message_id is None:
+            return
+        try:
+            await self.bot.edit_message_text(self.describe(), chat_id=job.admin_chat_id,
+                                             message_id=job.status_message_id)
+        except RetryAfter as e:
+            await asyncio.sleep(float(e.retry_after))
+        except BadRequest:
+            # نفس النص (message is not modified) أو الرسالة اتمسحت
+            pass
+        except NetworkError as e:
+            logger.warning(f"⚠️ مش قادر أحدث حالة الإذاعة: {e}")
+
+    async def _report_progress(self, job: _Job):
+        """تحديث رسالة الأدمن كل شوية بالتقدم"""
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            await self._show_progress(job)
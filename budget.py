@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+💰 حساب الـ tokens والتكلفة وميزانية اليوم
+- كل رد من مزود بيسجل الـ prompt/completion tokens (من الـ usage اللي في الرد) على الطلب اللي شغال
+  (contextvar من metered) - فطلبات الـ hedging والـ fallback بتتحسب على نفس الطالب والـ route
+- ميزانية عامة لليوم بالدولار (اليوم بتوقيت القاهرة) + ميزانية tokens لكل طالب في آخر 24 ساعة
+  (token bucket - رقمين لكل طالب والطلاب اللي رصيدهم اتملى بيتمسحوا)
+- لما ميزانية اليوم تقرب تخلص: ردود أقصر ومن غير hedging، وبعدين أرخص مزود الأول، وبعدين الـ AI بيقف
+  (الصفحات الجاهزة والبنك والكاش شغالين عادي)
+- العدادات في الرام وبتتكتب في SQLite على دفعات (للتقارير، وعشان الـ restart ميصفرش اليوم)
+- في الـ cluster كل الـ workers بيكتبوا في نفس الملف (الصفوف بتتجمع بـ upsert) وبعد كل flush كل worker
+  بيقرا إجمالي اليوم من تاني - فالميزانية واحدة لكل الـ processes (متأخرة flush واحد بالكتير) مش N × الميزانية
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import logging
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# $ لكل مليون token (prompt, completion) - الأسعار المعلنة (بتتغير من الإعدادات)
+DEFAULT_PRICES = {
+    'gemini': (0.075, 0.30),
+    'groq': (0.59, 0.79),
+}
+
+
+class Spend:
+    """الـ tokens اللي اتصرفت على طلب واحد: [(provider, prompt, completion)] رد لكل مزود"""
+
+    __slots__ = ('calls',)
+
+    def __init__(self):
+        self.calls: list[tuple[str, int, int]] = []
+
+    @property
+    def tokens(self) -> int:
+        return sum(prompt + completion for _, prompt, completion in self.calls)
+
+
+_current_spend: contextvars.ContextVar[Spend | None] = contextvars.ContextVar('current_spend', default=None)
+
+
+@contextlib.contextmanager
+def metered():
+    """كل usage بيرجع من المزودين جوه الـ block (والـ tasks اللي بتتعمل منه) بيتجمع في Spend واحد"""
+    spend = Spend()
+    token = _current_spend.set(spend)
+    try:
+        yield spend
+    finally:
+        try:
+            _current_spend.reset(token)
+        except ValueError:
+            # async generator اتقفل من task تانية (الـ context اتغير) - مفيش حاجة نرجعها
+            pass
+
+
+def charge(provider: str, prompt_tokens: int, completion_tokens: int):
+    """بيتنادى من المزود مع كل usage - بيتسجل على الطلب الحالي لو جوه metered"""
+    spend = _current_spend.get()
+    if spend is not None:
+        spend.calls.append((provider, prompt_tokens, completion_tokens))
+
+
+class BudgetPolicy(NamedTuple):
+    """حدود التوليد حسب الميزانية"""
+
+    level: str
+    # نسبة من max_tokens بتاع كل مزود
+    output_scale: float
+    hedge: bool
+    cheapest_first: bool
+    allow_ai: bool
+
+
+NORMAL = BudgetPolicy('normal', 1.0, True, False, True)
+CONSERVE = BudgetPolicy('conserve', 0.7, False, False, True)
+CRITICAL = BudgetPolicy('critical', 0.5, False, True, True)
+EXHAUSTED = BudgetPolicy('exhausted', 0.0, False, True, False)
+LEVELS = (NORMAL, CONSERVE, CRITICAL, EXHAUSTED)
+
+
+class TokenLedger:
+    """الاستخدام:
+        policy = ledger.policy(user_id)
+        with metered() as spend:
+            ... طلبات المزودين (بـ policy.output_scale و policy.hedge) ...
+        ledger.record(user_id, route, spend)
+
+    daily_budget: دولار في اليوم (0 = من غير حد) | user_daily_tokens: لكل طالب في آخر 24 ساعة (0 = من غير حد)
+    conserve_at / critical_at: نسبة المتبقي من ميزانية اليوم اللي بيبدأ عندها كل مستوى
+    """
+
+    def __init__(
+        self,
+        daily_budget: float = 0.0,
+        user_daily_tokens: int = 0,
+        prices: dict | None = None,
+        conserve_at: float = 0.5,
+        critical_at: float = 0.2,
+        tz: str = 'Africa/Cairo',
+        db_path: str | None = None,
+        keep_days: int = 90,
+        max_users: int = 200_000,
+    ):
+        self.daily_budget = daily_budget
+        self.user_daily_tokens = user_daily_tokens
+        self.prices = {**DEFAULT_PRICES, **(prices or {})}
+        self.conserve_at = conserve_at
+        self.critical_at = critical_at
+        try:
+            self._tz = ZoneInfo(tz)
+        except ZoneInfoNotFoundError:
+            logger.warning(f"⚠️ التوقيت {tz} مش موجود - اليوم هيتحسب بـ UTC")
+            self._tz = timezone.utc
+        self.clock = time.time
+        self._start_day()
+        # اليوم: (route, provider) -> [prompt, completion, requests] | user_id -> tokens
+        self._usage: dict[tuple[str, str], list[int]] = {}
+        self._users: dict[int, int] = {}
+        self.spent = 0.0
+        # الرصيد المتجدد لكل طالب (بيتملى بـ user_daily_tokens في اليوم)
+        self._user_budget = None
+        if user_daily_tokens:
+            self._user_budget = RateLimiter(user_daily_tokens / (24 * 60), user_daily_tokens, max_users)
+        # الطلبات اللي اتقررلها كل مستوى (من بداية التشغيل)
+        self.levels = {policy.level: 0 for policy in LEVELS}
+        self.over_budget_users = 0
+        # للكتابة على الديسك: (day, route, provider) -> [...] و (day, user_id) -> [tokens, requests]
+        self._pending_usage: dict[tuple[str, str, str], list[int]] = {}
+        self._pending_users: dict[tuple[str, int], list[int]] = {}
+        # الملف بيتفتح في open() (post_init) - مش في الـ constructor عشان import main ميعملش ملفات
+        self.db_path = db_path
+        self.keep_days = keep_days
+        self._db = None
+
+    def open(self):
+        """فتح الملف (مشترك بين الـ workers) ومسح الأيام القديمة وتحميل اللي اتصرف النهارده"""
+        if self._db is not None or not self.db_path:
+            return
+        self._db = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS usage (day TEXT NOT NULL, route TEXT NOT NULL, provider TEXT NOT NULL, '
+            'prompt INTEGER NOT NULL, completion INTEGER NOT NULL, requests INTEGER NOT NULL, '
+            'PRIMARY KEY (day, route, provider))'
+        )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS users (day TEXT NOT NULL, user_id INTEGER NOT NULL, '
+            'tokens INTEGER NOT NULL, requests INTEGER NOT NULL, PRIMARY KEY (day, user_id))'
+        )
+        oldest = (datetime.now(self._tz) - timedelta(days=self.keep_days)).strftime('%Y-%m-%d')
+        with self._db:
+            self._db.execute('DELETE FROM usage WHERE day < ?', (oldest,))
+            self._db.execute('DELETE FROM users WHERE day < ?', (oldest,))
+        self._load_today()
+
+    def _start_day(self):
+        now = datetime.fromtimestamp(self.clock(), self._tz)
+        self._day = now.strftime('%Y-%m-%d')
+        # نص الليل الجاي بتوقيت اليوم (كل طلب بيقارن رقم بس بدل ما يحسب التاريخ)
+        midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        self._day_ends = midnight.timestamp()
+
+    def cost(self, provider: str, prompt_tokens: int, completion_tokens: int) -> float:
+        prompt_price, completion_price = self.prices.get(provider, (0.0, 0.0))
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+    def _sync_today(self):
+        """إجمالي اليوم من الملف (كل الـ workers) - بعد الـ flush مفيش حاجة عندنا مش مكتوبة"""
+        usage = {}
+        spent = 0.0
+        for route, provider, prompt, completion, requests in self._db.execute(
+            'SELECT route, provider, prompt, completion, requests FROM usage WHERE day = ?', (self._day,)
+        ):
+            usage[(route, provider)] = [prompt, completion, requests]
+            spent += self.cost(provider, prompt, completion)
+        self._usage = usage
+        self.spent = spent
+
+    def _load_today(self):
+        """اللي اتصرف النهارده قبل الـ restart (الميزانية مبتتصفرش مع كل deploy)"""
+        self._sync_today()
+        for user_id, tokens in self._db.execute('SELECT user_id, tokens FROM users WHERE day = ?', (self._day,)):
+            self._users[user_id] = tokens
+            if self._user_budget is not None:
+                self._user_budget.charge(user_id, tokens)
+        if self.spent:
+            logger.info(f"💰 اتصرف النهارده قبل الـ restart: ${self.spent:.2f}")
+
+    def _check_day(self):
+        if self.clock() < self._day_ends:
+            return
+        spent = self.spent
+        self._start_day()
+        logger.info(f"💰 يوم جديد ({self._day}) - امبارح اتصرف ${spent:.2f}")
+        self._usage.clear()
+        self._users.clear()
+        self.spent = 0.0
+
+    # ---------- التسجيل ----------
+    def record(self, user_id: int | None, route: str, spend: Spend):
+        """الـ tokens اللي الطلب صرفها على الطالب والـ route (كل المزودين اللي اتبعتلهم)"""
+        if not spend.calls:
+            return
+        self._check_day()
+        for provider, prompt, completion in spend.calls:
+            for row in (
+                self._usage.setdefault((route, provider), [0, 0, 0]),
+                self._pending_usage.setdefault((self._day, route, provider), [0, 0, 0]),
+            ):
+                row[0] += prompt
+                row[1] += completion
+                row[2] += 1
+            self.spent += self.cost(provider, prompt, completion)
+        if user_id is None:
+            return
+        tokens = spend.tokens
+        self._users[user_id] = self._users.get(user_id, 0) + tokens
+        row = self._pending_users.setdefault((self._day, user_id), [0, 0])
+        row[0] += tokens
+        row[1] += 1
+        if self._user_budget is not None:
+            self._user_budget.charge(user_id, tokens)
+
+    def charge_user(self, user_id: int, tokens: int):
+        """tokens صرفها الطالب عند worker تاني (جروب) - على رصيده بس (الإجمالي بيوصل من الملف المشترك)"""
+        if self._user_budget is not None:
+            self._user_budget.charge(user_id, tokens)
+
+    # ---------- القرار ----------
+    @property
+    def remaining(self) -> float | None:
+        """نسبة المتبقي من ميزانية اليوم (None = من غير حد)"""
+        if not self.daily_budget:
+            return None
+        self._check_day()
+        return max(0.0, 1.0 - self.spent / self.daily_budget)
+
+    def global_policy(self) -> BudgetPolicy:
+        remaining = self.remaining
+        if remaining is None or remaining >= self.conserve_at:
+            return NORMAL
+        if remaining <= 0:
+            return EXHAUSTED
+        return CRITICAL if remaining < self.critical_at else CONSERVE
+
+    def policy(self, user_id: int | None = None, exempt: bool = False) -> BudgetPolicy:
+        """حدود الطلب الجاي: حسب ميزانية اليوم، والطالب اللي خلص رصيده بياخد ردود critical
+        (exempt: الطلاب المشتركين - ميزانية اليوم بس)
+        """
+        policy = self.global_policy()
+        if (user_id is not None and not exempt and policy is not EXHAUSTED and self._user_budget is not None
+                and self._user_budget.remaining(user_id) <= 0):
+            self.over_budget_users += 1
+            policy = CRITICAL
+        self.levels[policy.level] += 1
+        return policy
+
+    def cheapest_first(self, providers: list) -> list:
+        """نفس المزودين مترتبين بتكلفة سؤال عادي (~1000 token prompt و 300 رد)"""
+        return sorted(
+            (provider for provider in providers if provider is not None),
+            key=lambda provider: self.cost(provider.name, 1000, 300),
+        )
+
+    # ---------- الديسك ----------
+    def flush(self):
+        """كتابة اللي اتصرف من آخر flush، وبعدها قراية إجمالي اليوم (بيشمل الـ workers التانيين)"""
+        if self._db is None:
+            return
+        self._check_day()
+        if self._pending_usage or self._pending_users:
+            self._write_pending()
+        self._sync_today()
+
+    def _write_pending(self):
+        usage, self._pending_usage = self._pending_usage, {}
+        users, self._pending_users = self._pending_users, {}
+        with self._db:
+            self._db.executemany(
+                'INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (day, route, provider) DO UPDATE SET '
+                'prompt = prompt + excluded.prompt, completion = completion + excluded.completion, '
+                'requests = requests + excluded.requests',
+                [(*key, *row) for key, row in usage.items()],
+            )
+            self._db.executemany(
+                'INSERT INTO users VALUES (?, ?, ?, ?) ON CONFLICT (day, user_id) DO UPDATE SET '
+                'tokens = tokens + excluded.tokens, requests = requests + excluded.requests',
+                [(*key, *row) for key, row in users.items()],
+            )
+
+    async def run_flusher(self, interval: float = 5.0):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"❌ فشل حفظ حساب الـ tokens: {e}")
+
+    def close(self):
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+    # ---------- التقارير ----------
+    def totals(self) -> tuple[int, int, int]:
+        """(prompt, completion, requests) النهارده (كل الـ workers لحد آخر flush + اللي عندنا من بعده)"""
+        self._check_day()
+        return tuple(sum(row[i] for row in self._usage.values()) for i in range(3))
+
+    def describe(self) -> str:
+        """سطر لـ /stats"""
+        prompt, completion, requests = self.totals()
+        budget = f"من ${self.daily_budget:.2f} ({1 - self.remaining:.0%})" if self.daily_budget else "(من غير حد)"
+        return (
+            f"💰 ميزانية النهارده: ${self.spent:.2f} {budget} | المستوى: {self.global_policy().level}\n"
+            f"   {prompt + completion:,} token في {requests:,} طلب | طلاب عدوا حدهم: {self.over_budget_users}"
+        )
+
+    def history(self, days: int) -> list[tuple[str, int, float]]:
+        """[(اليوم, tokens, التكلفة)] لآخر days يوم من الديسك (بالأسعار الحالية)"""
+        if self._db is None:
+            return []
+        self.flush()
+        oldest = (datetime.fromtimestamp(self.clock(), self._tz) - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        per_day: dict[str, list] = {}
+        for day, provider, prompt, completion in self._db.execute(
+            'SELECT day, provider, SUM(prompt), SUM(completion) FROM usage WHERE day >= ? '
+            'GROUP BY day, provider ORDER BY day', (oldest,)
+        ):
+            row = per_day.setdefault(day, [0, 0.0])
+            row[0] += prompt + completion
+            row[1] += self.cost(provider, prompt, completion)
+        return [(day, tokens, cost) for day, (tokens, cost) in per_day.items()]
+
+    def _heaviest(self, top: int) -> list[tuple[int, int]]:
+        """أكتر الطلاب صرفاً النهارده (من الملف لو موجود - عشان يشمل كل الـ workers)"""
+        if self._db is None:
+            return heapq.nlargest(top, self._users.items(), key=lambda item: item[1])
+        return self._db.execute(
+            'SELECT user_id, tokens FROM users WHERE day = ? ORDER BY tokens DESC LIMIT ?', (self._day, top)
+        ).fetchall()
+
+    def report(self, days: int = 7, top: int = 5) -> str:
+        """تقرير /budget"""
+        self.flush()
+        lines = [self.describe(), ""]
+        by_provider: dict[str, list[int]] = {}
+        by_route: dict[str, list] = {}
+        for (route, provider), (prompt, completion, requests) in sorted(self._usage.items()):
+            totals = by_provider.setdefault(provider, [0, 0, 0])
+            totals[0] += prompt
+            totals[1] += completion
+            totals[2] += requests
+            route_totals = by_route.setdefault(route, [0, 0.0])
+            route_totals[0] += requests
+            route_totals[1] += self.cost(provider, prompt, completion)
+        for provider, (prompt, completion, requests) in by_provider.items():
+            lines.append(
+                f"🔌 {provider}: {prompt:,}+{completion:,} token في {requests:,} طلب "
+                f"(${self.cost(provider, prompt, completion):.3f} | "
+                f"متوسط الرد {completion // max(1, requests)} token)"
+            )
+        if by_route:
+            lines.append("🧭 " + " | ".join(
+                f"{route} {requests:,} (${cost:.3f})" for route, (requests, cost) in by_route.items()
+            ))
+        heaviest = self._heaviest(top)
+        if heaviest:
+            lines.append("👤 أكتر طلاب النهارده: " + " | ".join(f"{user_id}: {tokens:,}" for user_id, tokens in heaviest))
+        lines.append("🎚️ الطلبات حسب المستوى: " + " | ".join(f"{level} {count:,}" for level, count in self.levels.items()))
+        history = self.history(days)
+        if history:
+            lines.append("")
+            lines.append(f"📅 آخر {days} أيام:")
+            lines.extend(f"   {day}: {tokens:,} token | ${cost:.2f}" for day, tokens, cost in history)
+        return "\n".join(lines)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧩 تشغيل البوت على كذا process (CLUSTER_WORKERS=N)
+- process واحدة للـ ingress (polling أو webhook) بتوزع الـ updates على N workers عن طريق Unix socket
+- كل الـ updates بتاعة الشات الواحد بتروح لنفس الـ worker وبنفس الترتيب (chat_id % N)
+  فذاكرة المحادثة والـ rate limit والـ coalescing بتاعة الشات فاضلين صح زي الـ process الواحدة
+- الحالة المشتركة (كاش الإجابات، حد الطالب في الجروبات) بتتنشر كـ events لباقي الـ workers
+  عن طريق الـ ingress - القراية بتفضل محلية ومن غير انتظار
+
+البروتوكول: frames بطول 4 bytes + JSON
+    worker -> ingress: {'op': 'hello', 'worker': i} ثم {'op': 'publish', 'kind': ..., 'args': [...]}
+    ingress -> worker: {'op': 'update', 'data': {...}} و {'op': 'event', 'kind': ..., 'args': [...]}
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import struct
+import sys
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct('>I')
+
+
+def encode_frame(message: dict) -> bytes:
+    body = json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return _HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> dict | None:
+    """None لو الاتصال اتقفل"""
+    try:
+        header = await reader.readexactly(_HEADER.size)
+        return json.loads(await reader.readexactly(_HEADER.unpack(header)[0]))
+    except asyncio.IncompleteReadError:
+        return None
+
+
+def update_chat_id(data: dict) -> int:
+    """الشات بتاع الـ update (JSON زي ما جه من تيليجرام)"""
+    for key in ('message', 'edited_message', 'channel_post', 'edited_channel_post'):
+        if key in data:
+            return data[key]['chat']['id']
+    query = data.get('callback_query')
+    if query is not None:
+        message = query.get('message')
+        return message['chat']['id'] if message else query['from']['id']
+    for value in data.values():
+        if isinstance(value, dict) and isinstance(value.get('from'), dict):
+            return value['from']['id']
+    return data.get('update_id', 0)
+
+
+class Ingress:
+    """السيرفر اللي الـ workers بيتصلوا بيه: توزيع الـ updates ونشر الـ events"""
+
+    def __init__(self, socket_path: str, workers: int, backlog_limit: int = 100_000):
+        self.socket_path = socket_path
+        self.workers = workers
+        self.backlog_limit = backlog_limit
+        self._writers: list[asyncio.StreamWriter | None] = [None] * workers
+        # updates لـ worker لسه متصلش (أو بيعمل restart) - بتتبعت بنفس الترتيب أول ما يتصل
+        self._backlog: list[deque] = [deque() for _ in range(workers)]
+        self._server = None
+        self._connections: set[asyncio.Task] = set()
+        self.closing = False
+        self.connected = asyncio.Event()
+        self.dispatched = [0] * workers
+        self.published = 0
+        self.dropped = 0
+
+    def shard(self, data: dict) -> int:
+        return update_chat_id(data) % self.workers
+
+    async def dispatch(self, data: dict):
+        index = self.shard(data)
+        frame = encode_frame({'op': 'update', 'data': data})
+        writer = self._writers[index]
+        if writer is None or self._backlog[index]:
+            if len(self._backlog[index]) >= self.backlog_limit:
+                self.dropped += 1
+                return
+            self._backlog[index].append(frame)
+            return
+        self.dispatched[index] += 1
+        writer.write(frame)
+        await writer.drain()
+
+    async def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+
+    async def stop(self):
+        self.closing = True
+        if self._server is not None:
+            self._server.close()
+            for writer in self._writers:
+                if writer is not None:
+                    writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        # قفل الـ writer بيخلي القراية ترجع None - نستنى الـ handlers تخلص بدل ما تتلغي مع الـ loop
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        task.add_done_callback(self._connections.discard)
+        hello = await read_frame(reader)
+        if not hello or hello.get('op') != 'hello' or not 0 <= hello.get('worker', -1) < self.workers:
+            writer.close()
+            return
+        index = hello['worker']
+        backlog = self._backlog[index]
+        while backlog:
+            self.dispatched[index] += 1
+            writer.write(backlog.popleft())
+            await writer.drain()
+        self._writers[index] = writer
+        logger.info(f"🧩 worker {index} اتصل")
+        if all(w is not None for w in self._writers):
+            self.connected.set()
+        try:
+            while (message := await read_frame(reader)) is not None:
+                if message.get('op') == 'publish':
+                    self._fan_out(index, message)
+        except ConnectionError:
+            pass
+        finally:
+            if self._writers[index] is writer:
+                self._writers[index] = None
+                self.connected.clear()
+                if not self.closing:
+                    logger.warning(f"⚠️ worker {index} فصل - الـ updates بتاعته هتستنى لما يرجع")
+
+    def _fan_out(self, source: int, message: dict):
+        """event من worker لكل الباقيين (من غير drain - الـ events صغيرة وبتوصل بالترتيب)"""
+        self.published += 1
+        frame = encode_frame({'op': 'event', 'kind': message['kind'], 'args': message['args']})
+        for index, writer in enumerate(self._writers):
+            if index != source and writer is not None and not writer.is_closing():
+                writer.write(frame)
+
+
+class WorkerLink:
+    """اتصال الـ worker بالـ ingress: بيستلم updates و events وبينشر events
+
+    handlers: {kind: callback(*args)} للـ events اللي جاية من باقي الـ workers
+    on_update: coroutine بتاخد الـ update (JSON) - run_worker بيظبطها
+    """
+
+    def __init__(self, socket_path: str, index: int, handlers: dict | None = None):
+        self.socket_path = socket_path
+        self.index = index
+        self.handlers = handlers or {}
+        self.on_update = None
+        self._writer: asyncio.StreamWriter | None = None
+        self.received = 0
+        self.events = 0
+
+    async def connect(self, timeout: float = 30.0):
+        """الـ ingress ممكن يكون لسه بيبدأ - بنحاول لحد timeout"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if loop.time() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+        self._writer.write(encode_frame({'op': 'hello', 'worker': self.index}))
+        return reader
+
+    def publish(self, kind: str, *args):
+        """نشر event لباقي الـ workers (sync - بيتنادى من أي مكان في الكود)"""
+        if self._writer is not None and not self._writer.is_closing():
+            self._writer.write(encode_frame({'op': 'publish', 'kind': kind, 'args': list(args)}))
+
+    async def run(self, reader: asyncio.StreamReader):
+        """بيرجع لما الـ ingress يقفل الاتصال"""
+        while (message := await read_frame(reader)) is not None:
+            op = message.get('op')
+            if op == 'update':
+                self.received += 1
+                await self.on_update(message['data'])
+            elif op == 'event':
+                handler = self.handlers.get(message['kind'])
+                if handler is not None:
+                    self.events += 1
+                    handler(*message['args'])
+        self.close()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class WorkerPool:
+    """تشغيل الـ workers كـ processes (نفس الـ script بـ CLUSTER_ROLE=worker) وإعادة تشغيل اللي يقع"""
+
+    def __init__(self, workers: int, socket_path: str, argv: list[str] | None = None, restart_delay: float = 1.0):
+        self.workers = workers
+        self.socket_path = socket_path
+        self.argv = argv or [sys.executable, os.path.abspath(sys.argv[0])]
+        self.restart_delay = restart_delay
+        self.processes: list[asyncio.subprocess.Process | None] = [None] * workers
+        self.restarts = 0
+        self._tasks: list[asyncio.Task] = []
+        self._stopping = False
+
+    def _env(self, index: int) -> dict:
+        return dict(
+            os.environ,
+            CLUSTER_ROLE='worker',
+            CLUSTER_WORKER_INDEX=str(index),
+            CLUSTER_SOCKET=self.socket_path,
+        )
+
+    async def _supervise(self, index: int):
+        while not self._stopping:
+            process = self.processes[index] = await asyncio.create_subprocess_exec(*self.argv, env=self._env(index))
+            code = await process.wait()
+            if self._stopping:
+                return
+            self.restarts += 1
+            logger.error(f"❌ worker {index} وقف (exit {code}) - هيتشغل تاني")
+            await asyncio.sleep(self.restart_delay)
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._supervise(i)) for i in range(self.workers)]
+
+    async def stop(self, timeout: float = 15.0):
+        self._stopping = True
+        running = [p for p in self.processes if p is not None and p.returncode is None]
+        for process in running:
+            process.send_signal(signal.SIGTERM)
+        try:
+            await asyncio.wait_for(asyncio.gather(*(p.wait() for p in running)), timeout)
+        except asyncio.TimeoutError:
+            for process in running:
+                if process.returncode is None:
+                    process.kill()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+async def run_worker(application, link: WorkerLink):
+    """دورة حياة الـ worker: Application كامل من غير polling - الـ updates جاية من الـ ingress"""
+    from telegram import Update
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+
+    async def on_update(data: dict):
+        await application.update_queue.put(Update.de_json(data, application.bot))
+
+    link.on_update = on_update
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    try:
+        await application.start()
+        reader = await link.connect()
+        link_task = asyncio.create_task(link.run(reader))
+        stop_task = asyncio.create_task(stop_event.wait())
+        await asyncio.wait((link_task, stop_task), return_when=asyncio.FIRST_COMPLETED)
+        for task in (link_task, stop_task):
+            task.cancel()
+        link.close()
+    finally:
+        # application.stop بيستنى الـ updates اللي وصلت لحد ما تخلص
+        if application.running:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+
+def forward_handler(ingress: Ingress):
+    """handler للـ Application بتاع الـ ingress: كل update بيتبعت لـ worker من غير أي معالجة"""
+    from telegram.ext import ApplicationHandlerStop
+
+    async def forward(update, context):
+        await ingress.dispatch(update.to_dict())
+        raise ApplicationHandlerStop
+
+    return forward
+
+
+def build_ingress_application(builder, ingress: Ingress, pool: WorkerPool):
+    """Application خفيف للـ ingress (polling أو webhook عادي) - التحديثات بالترتيب واحد ورا التاني"""
+    from telegram import Update
+    from telegram.ext import TypeHandler
+
+    async def post_init(application):
+        await ingress.start()
+        pool.start()
+        logger.info(f"🧩 الـ ingress شغال مع {pool.workers} workers على {ingress.socket_path}")
+
+    async def post_stop(application):
+        ingress.closing = True
+        await pool.stop()
+        await ingress.stop()
+
+    application = builder.concurrent_updates(False).post_init(post_init).post_stop(post_stop).build()
+    application.add_handler(TypeHandler(Update, forward_handler(ingress)), group=-1)
+    return application
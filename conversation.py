@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧠 ذاكرة المحادثة لكل شات
+ring buffer صغير لكل شات + قص على حسب الـ tokens + طرد الشاتات الخاملة
+وحفظ اختياري في SQLite على دفعات (مش كتابة مع كل رسالة)
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import OrderedDict, deque
+
+from knowledge import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+USER = 'user'
+MODEL = 'model'
+
+
+class _Conversation:
+    __slots__ = ('turns', 'tokens', 'last_seen')
+
+    def __init__(self):
+        self.turns = deque()
+        self.tokens = 0
+        self.last_seen = time.monotonic()
+
+    def add(self, role: str, text: str, max_messages: int, token_budget: int):
+        """إضافة رسالة وشيل الأقدم لحد ما نرجع جوه الحدود (آخر سؤال ورد بيفضلوا دايماً)"""
+        self.turns.append((role, text))
+        self.tokens += estimate_tokens(text)
+        while len(self.turns) > 2 and (
+            len(self.turns) > max_messages or self.tokens > token_budget
+        ):
+            _, dropped = self.turns.popleft()
+            self.tokens -= estimate_tokens(dropped)
+
+
+class ConversationMemory:
+    """آخر رسائل كل شات في الذاكرة بحد أقصى لعدد الشاتات وحجم كل شات
+
+    كل شات مش بيحتفظ بأكتر من token_budget (اللي هيتبعت للمزود أصلاً)
+    فالذاكرة الكلية محدودة بـ max_chats × token_budget تقريباً
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 6,
+        token_budget: int = 600,
+        max_message_chars: int = 1200,
+        idle_ttl: float = 30 * 60,
+        max_chats: int = 100_000,
+        db_path: str | None = None,
+        flush_batch: int = 200,
+    ):
+        self.max_messages = max_turns * 2
+        self.token_budget = token_budget
+        self.max_message_chars = max_message_chars
+        self.idle_ttl = idle_ttl
+        self.max_chats = max_chats
+        self.flush_batch = flush_batch
+        self._chats: OrderedDict[int, _Conversation] = OrderedDict()
+        self._pending: list[tuple] = []
+        # الملف بيتفتح في open() (post_init) - مش وقت الـ import
+        self.db_path = db_path
+        self._db = None
+
+    def open(self):
+        """فتح ملف المحادثات (لو db_path متظبط)"""
+        if self._db is not None or not self.db_path:
+            return
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS messages ('
+            'chat_id INTEGER NOT NULL, ts REAL NOT NULL, role TEXT NOT NULL, text TEXT NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS messages_chat ON messages (chat_id, ts)')
+        self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._chats)
+
+    # ---------- القراءة ----------
+    def history(self, chat_id: int) -> list[tuple[str, str]]:
+        """آخر الرسائل (role, text) من الأقدم للأحدث في حدود الـ token budget"""
+        conversation = self._get(chat_id, create=False)
+        if conversation is None:
+            return []
+        turns = list(conversation.turns)
+        # الـ history لازم يبدأ برسالة من الطالب
+        while turns and turns[0][0] != USER:
+            turns.pop(0)
+        return turns
+
+    # ---------- الكتابة ----------
+    def append(self, chat_id: int, user_message: str, reply: str):
+        """يضيف سؤال الطالب والرد عليه للمحادثة"""
+        conversation = self._get(chat_id, create=True)
+        now = time.time()
+        for role, text in ((USER, user_message), (MODEL, reply)):
+            text = text[:self.max_message_chars]
+            conversation.add(role, text, self.max_messages, self.token_budget)
+            if self._db is not None:
+                self._pending.append((chat_id, now, role, text))
+        if self._db is not None and len(self._pending) >= self.flush_batch:
+            self.flush()
+
+    def clear(self, chat_id: int):
+        self._chats.pop(chat_id, None)
+        if self._db is not None:
+            self.flush()
+            self._db.execute('DELETE FROM messages WHERE chat_id = ?', (chat_id,))
+            self._db.commit()
+
+    def _get(self, chat_id: int, create: bool) -> _Conversation | None:
+        self._evict_idle()
+        conversation = self._chats.get(chat_id)
+        if conversation is None:
+            turns = self._load(chat_id)
+            if not turns and not create:
+                return None
+            conversation = _Conversation()
+            for role, text in turns:
+                conversation.add(role, text, self.max_messages, self.token_budget)
+            self._chats[chat_id] = conversation
+            while len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(chat_id)
+        conversation.last_seen = time.monotonic()
+        return conversation
+
+    def _evict_idle(self):
+        """طرد الشاتات الخاملة من أول الـ OrderedDict (الأقدم استخداماً)"""
+        deadline = time.monotonic() - self.idle_ttl
+        while self._chats:
+            conversation = next(iter(self._chats.values()))
+            if conversation.last_seen > deadline:
+                break
+            self._chats.popitem(last=False)
+
+    # ---------- SQLite ----------
+    def _load(self, chat_id: int) -> list[tuple[str, str]]:
+        if self._db is None:
+            return []
+        since = time.time() - self.idle_ttl
+        rows = self._db.execute(
+            'SELECT role, text FROM messages WHERE chat_id = ? AND ts > ? '
+            'ORDER BY ts DESC, rowid DESC LIMIT ?',
+            (chat_id, since, self.max_messages),
+        ).fetchall()
+        rows.reverse()
+        rows.extend((role, text) for cid, _, role, text in self._pending if cid == chat_id)
+        return rows[-self.max_messages:]
+
+    def flush(self):
+        """كتابة الرسائل المتجمعة في transaction واحدة"""
+        if self._db is None or not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        with self._db:
+            self._db.executemany('INSERT INTO messages VALUES (?, ?, ?, ?)', pending)
+
+    def prune(self):
+        """مسح الرسائل الأقدم من الـ idle_ttl من الديسك"""
+        if self._db is None:
+            return
+        with self._db:
+            self._db.execute('DELETE FROM messages WHERE ts < ?', (time.time() - self.idle_ttl,))
+
+    async def run_flusher(self, interval: float = 5.0):
+        """مهمة في الخلفية: flush كل شوية + تنضيف الرسائل القديمة كل ساعة"""
+        last_prune = time.monotonic()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.flush()
+                if time.monotonic() - last_prune > 3600:
+                    self.prune()
+                    last_prune = time.monotonic()
+            except sqlite3.Error as e:
+                logger.error(f"❌ فشل حفظ المحادثات: {e}")
+
+    def close(self):
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🏁 توزيع الطلبات على المزودين (Hedging + Circuit Breakers)
+- لو المزود الأساسي اتأخر عن الـ p95 بتاعه، نبعت نفس الطلب للتاني وناخد أول رد سليم
+- لو مزود فشل كذا مرة ورا بعض (أو 429) نقفل عليه فترة بدل ما نستنى الـ timeout كل مرة
+"""
+
+import asyncio
+import bisect
+import logging
+import time
+from collections import deque
+
+from providers import ProviderError, RateLimited
+
+logger = logging.getLogger(__name__)
+
+# حدود الـ buckets بالثواني (للعرض في /stats)
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 30)
+
+
+def is_rate_limit(error: Exception) -> bool:
+    """429 من Groq (RateLimitError) أو Gemini (ResourceExhausted)"""
+    if getattr(error, 'status_code', None) == 429 or getattr(error, 'code', None) == 429:
+        return True
+    return type(error).__name__ in ('RateLimitError', 'ResourceExhausted', 'TooManyRequests')
+
+
+class LatencyHistogram:
+    """Histogram بـ buckets ثابتة + آخر عينات لحساب الـ p95"""
+
+    def __init__(self, recent: int = 200):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self._recent = deque(maxlen=recent)
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+        self._recent.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        """الـ quantile من آخر العينات (None لو مفيش عينات)"""
+        if not self._recent:
+            return None
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+
+class CircuitBreaker:
+    """closed ← → open ← → half_open (طلب تجريبي واحد بعد فترة الراحة)"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    LABELS = {CLOSED: '🟢 شغال', OPEN: '🔴 مقفول', HALF_OPEN: '🟡 بيجرب'}
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.rate_limited = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+
+    def allow(self) -> bool:
+        """ينفع نبعت للمزود ده دلوقتي؟"""
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        # طلب تجريبي واحد في المرة (ولو اتنسى من غير نتيجة نسمح بغيره بعد فترة الراحة)
+        if self.state == self.HALF_OPEN and (
+            not self._probing or now - self._probe_started >= self.reset_timeout
+        ):
+            self._probing = True
+            self._probe_started = now
+            return True
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self, error: Exception):
+        if is_rate_limit(error):
+            self.rate_limited += 1
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"🔌 Circuit breaker اتفتح بعد {self.failures} فشل")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """الطلب اتلغى (hedging) قبل ما يخلص - مش نجاح ولا فشل"""
+        self._probing = False
+
+
+class ProviderHealth:
+    """حالة كل مزود: breaker + latency + عدادات"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latency = LatencyHistogram()
+        self.successes = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.throttled = 0
+
+
+class ProviderScheduler:
+    """بيختار المزود ويعمل hedging بين الأساسي والاحتياطي"""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        hedge_quantile: float = 0.95,
+        hedge_default_delay: float = 3.0,
+        hedge_min_delay: float = 0.5,
+        hedge_max_delay: float = 10.0,
+        min_samples: int = 20,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.hedge_quantile = hedge_quantile
+        self.hedge_default_delay = hedge_default_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self.min_samples = min_samples
+        self.health: dict[str, ProviderHealth] = {}
+
+    def health_of(self, provider) -> ProviderHealth:
+        health = self.health.get(provider.name)
+        if health is None:
+            health = self.health[provider.name] = ProviderHealth(
+                self.failure_threshold, self.reset_timeout
+            )
+        return health
+
+    def available(self, providers: list) -> list:
+        """المزودين اللي الـ breaker بتاعهم سامح (بنفس الترتيب)"""
+        return [p for p in providers if p is not None and self.health_of(p).breaker.allow()]
+
+    def hedge_delay(self, provider) -> float:
+        """الوقت اللي نستناه قبل ما نبعت للمزود التاني (مبني على الـ p95)"""
+        latency = self.health_of(provider).latency
+        if len(latency) < self.min_samples:
+            return self.hedge_default_delay
+        p95 = latency.quantile(self.hedge_quantile)
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, p95))
+
+    def record(self, provider, started_at: float, error: Exception | None = None):
+        """تسجيل نتيجة طلب (بيستخدمها الـ streaming كمان)"""
+        health = self.health_of(provider)
+        if isinstance(error, RateLimited):
+            # الحد بتاعنا إحنا مش عطل في المزود - ميأثرش على الـ breaker
+            health.throttled += 1
+            health.breaker.release()
+        elif error is None:
+            health.latency.observe(time.monotonic() - started_at)
+            health.successes += 1
+            health.breaker.record_success()
+        else:
+            health.failures += 1
+            health.breaker.record_failure(error)
+
+    async def _call(self, provider, system_prompt: str, user_message: str, history: list | None,
+                    media: list | None = None, max_tokens_scale: float = 1.0, slot=None) -> str:
+        if slot is None:
+            return await self._request(provider, system_prompt, user_message, history, media, max_tokens_scale)
+        entered = False
+        try:
+            async with slot(provider):
+                entered = True
+                return await self._request(provider, system_prompt, user_message, history, media, max_tokens_scale)
+        except BaseException:
+            if not entered:
+                # الطلب موصلش للمزود (اترفض أو اتلغى في الطابور) - الـ breaker ميستناش نتيجته
+                self.health_of(provider).breaker.release()
+            raise
+
+    async def _request(self, provider, system_prompt: str, user_message: str, history: list | None,
+                       media: list | None, max_tokens_scale: float) -> str:
+        started_at = time.monotonic()
+        try:
+            response = await provider.generate(system_prompt, user_message, history, media, max_tokens_scale)
+        except asyncio.CancelledError:
+            self.health_of(provider).breaker.release()
+            raise
+        except Exception as e:
+            self.record(provider, started_at, e)
+            raise
+        if not response:
+            error = ProviderError(f"{provider.name} رجع رد فاضي")
+            self.record(provider, started_at, error)
+            raise error
+        self.record(provider, started_at)
+        return response
+
+    async def generate(self, providers: list, system_prompt: str, user_message: str, history: list | None = None,
+                       media: list | None = None, max_tokens_scale: float = 1.0, hedge: bool = True,
+                       slot=None):
+        """يرجع (الرد, المزود) - الأول بالترتيب هو الأساسي والباقي احتياطي
+
+        media: صور مع السؤال (لمزودين supports_media بس)
+        hedge=False: الاحتياطي بيتبعتله بس لو الأساسي فشل (من غير طلب مكرر يتدفع مرتين)
+        slot(provider): async context manager حوالين طلب كل مزود (دوره في طابور المزود وحصته)
+        """
+        candidates = self.available(providers)
+        if not candidates:
+            raise ProviderError("كل المزودين مقفولين (circuit breaker)")
+
+        tasks: dict[asyncio.Task, object] = {}
+        hedged = set()
+        last_error: Exception | None = None
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            provider = candidates[next_index]
+            next_index += 1
+            task = asyncio.create_task(
+                self._call(provider, system_prompt, user_message, history, media, max_tokens_scale, slot)
+            )
+            tasks[task] = provider
+            return provider
+
+        primary = launch()
+        try:
+            while tasks:
+                timeout = None
+                if hedge and next_index < len(candidates):
+                    timeout = self.hedge_delay(primary)
+                done, _ = await asyncio.wait(
+                    tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # الأساسي اتأخر: نبعت نفس الطلب للاحتياطي
+                    backup = launch()
+                    hedged.add(backup.name)
+                    self.health_of(backup).hedges += 1
+                    logger.info("🏁 %s اتأخر، hedging لـ %s", primary.name, backup.name,
+                                extra={'event': 'hedge', 'provider': backup.name})
+                    continue
+                for task in done:
+                    provider = tasks.pop(task)
+                    if task.exception() is None:
+                        if provider.name in hedged:
+                            self.health_of(provider).hedge_wins += 1
+                        return task.result(), provider
+                    last_error = task.exception()
+                    logger.warning("⚠️ %s فشل: %s", provider.name, last_error,
+                                   extra={'event': 'provider_error', 'provider': provider.name})
+                # كل اللي شغال فشل: نجرب الاحتياطي فوراً
+                if not tasks and next_index < len(candidates):
+                    launch()
+        finally:
+            for provider in candidates[next_index:]:
+                self.health_of(provider).breaker.release()
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        raise last_error or ProviderError("مفيش رد من أي مزود")
+
+    def describe(self) -> str:
+        """ملخص لحالة المزودين لأمر /stats"""
+        lines = []
+        for name, health in self.health.items():
+            p50 = health.latency.quantile(0.5)
+            p95 = health.latency.quantile(0.95)
+            latency = f"p50 {p50:.2f}s | p95 {p95:.2f}s" if p50 is not None else "مفيش عينات"
+            buckets = " ".join(
+                f"≤{bound}s:{count}" for bound, count in zip(LATENCY_BUCKETS, health.latency.counts)
+                if count
+            )
+            overflow = health.latency.counts[-1]
+            if overflow:
+                buckets += f" >{LATENCY_BUCKETS[-1]}s:{overflow}"
+            lines.append(
+                f"🔌 {name}: {CircuitBreaker.LABELS[health.breaker.state]} | ✅ {health.successes} ❌ {health.failures} "
+                f"(429: {health.breaker.rate_limited} | حد محلي: {health.throttled})\n"
+                f"   ⏱️ {latency} | hedge {health.hedges} (فاز {health.hedge_wins})\n"
+                f"   📊 {buckets or '-'}"
+            )
+        return "\n".join(lines) or "مفيش طلبات لسه"
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📚 فهرس ملف المعرفة (Retrieval)
+بدل ما نحط Knowledge.txt كله في كل prompt، بنقسمه لأجزاء عند التشغيل
+ونختار الأجزاء المرتبطة بسؤال الطالب بس (BM25) في حدود token budget
+"""
+
+import math
+import re
+import textwrap
+from collections import Counter
+
+from arabic_text import normalize_arabic
+
+# عناوين زي "📚 عن المنصة:" أو "1️⃣ كورس الترم كامل:"
+_HEADER = re.compile(r'^(?P<marker>[^\w\s]+|\d️?⃣)\s*(?P<title>[^:]+):\s*$')
+_KEYCAP = re.compile(r'^\d️?⃣')
+_BANNER = re.compile(r'^=+$')
+
+# كلمات شائعة مالهاش وزن في البحث
+_STOP_WORDS = frozenset({
+    'في', 'من', 'علي', 'الي', 'عن', 'مع', 'و', 'او', 'ثم', 'ان', 'انا', 'انت',
+    'هو', 'هي', 'ده', 'دي', 'دا', 'ايه', 'اي', 'يا', 'هل', 'كل', 'بس', 'لو',
+    'ما', 'مش', 'لا', 'اللي', 'الذي', 'التي', 'هذا', 'هذه', 'عايز', 'عاوز',
+})
+_PREFIXES = ('وال', 'بال', 'كال', 'فال', 'لل', 'ال')
+
+# أجزاء بتتحط في كل prompt مهما كان السؤال (تعليمات للبوت نفسه)
+PINNED_TITLES = ('ملاحظات للبوت',)
+
+
+def estimate_tokens(text: str) -> int:
+    """تقدير تقريبي لعدد الـ tokens (العربي حوالي 3 حروف للـ token)"""
+    return max(1, len(text) // 3)
+
+
+def tokenize(text: str) -> list[str]:
+    """توحيد + stemming خفيف (شيل ال والبادئات) + حذف الكلمات الشائعة"""
+    tokens = []
+    for word in normalize_arabic(text).split():
+        if word in _STOP_WORDS:
+            continue
+        for prefix in _PREFIXES:
+            if word.startswith(prefix) and len(word) - len(prefix) >= 2:
+                word = word[len(prefix):]
+                break
+        tokens.append(word)
+    return tokens
+
+
+class Chunk:
+    """جزء من ملف المعرفة: عنوان + محتوى"""
+
+    __slots__ = ('title', 'text', 'tokens', 'pinned')
+
+    def __init__(self, title: str, text: str):
+        self.title = title
+        self.text = text
+        self.tokens = estimate_tokens(text)
+        self.pinned = title in PINNED_TITLES
+
+
+def chunk_knowledge(text: str) -> list[Chunk]:
+    """تقسيم الملف على عناوين ==== والعناوين اللي بتبدأ بإيموجي أو رقم"""
+    chunks = []
+    parent = None
+    title = None
+    lines: list[str] = []
+    in_banner = False
+
+    def flush():
+        body = textwrap.dedent('\n'.join(lines)).strip()
+        if title and body:
+            chunks.append(Chunk(title, f"{title}:\n{body}"))
+        lines.clear()
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if _BANNER.match(line):
+            if not in_banner:
+                flush()
+            in_banner = not in_banner
+            continue
+        if in_banner:
+            if line:
+                title = parent = line.rstrip(':').strip()
+            continue
+
+        header = _HEADER.match(line)
+        if header:
+            flush()
+            section = header.group('title').strip()
+            if _KEYCAP.match(line) and parent:
+                title = f"{parent} - {section}"
+            else:
+                title = parent = section
+            continue
+        lines.append(raw_line)
+    flush()
+    return chunks
+
+
+class KnowledgeIndex:
+    """فهرس BM25 في الذاكرة على أجزاء ملف المعرفة"""
+
+    def __init__(self, chunks: list[Chunk], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self._term_freqs = [Counter(tokenize(chunk.text)) for chunk in chunks]
+        self._lengths = [sum(tf.values()) for tf in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(chunks)) if chunks else 0.0
+        doc_freq = Counter(term for tf in self._term_freqs for term in tf)
+        n = len(chunks)
+        self._idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    @classmethod
+    def from_text(cls, text: str) -> 'KnowledgeIndex':
+        return cls(chunk_knowledge(text) if text else [])
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def search(self, query: str, k: int = 3) -> list[tuple[float, Chunk]]:
+        """أعلى k أجزاء حسب BM25 (الأجزاء اللي مفيهاش ولا كلمة مش بترجع)"""
+        terms = [t for t in set(tokenize(query)) if t in self._idf]
+        if not terms:
+            return []
+        scored = []
+        for i, tf in enumerate(self._term_freqs):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[i] / self._avg_length)
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self._idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                scored.append((score, self.chunks[i]))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:k]
+
+    def context_for(self, query: str, k: int = 3, token_budget: int = 400) -> str:
+        """النص اللي هيتحط في الـ prompt: الأجزاء الثابتة + أفضل الأجزاء في حدود الـ budget"""
+        selected = [chunk.text for chunk in self.chunks if chunk.pinned]
+        used = sum(estimate_tokens(text) for text in selected)
+        for _, chunk in self.search(query, k):
+            if chunk.pinned:
+                continue
+            if used + chunk.tokens > token_budget:
+                continue
+            selected.append(chunk.text)
+            used += chunk.tokens
+        return '\n\n'.join(selected)
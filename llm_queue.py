@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📥 طابور طلبات الـ LLM (بين handle_message والمزود)
+- lane لكل مزود أساسي بعدد slots ثابت (= حد التزامن بتاعه) وبيستنى حصة الدقيقة بدل ما يفشل
+- الأولوية: وقت الوصول ناقص ميزة بالثواني (طالب مشترك، محادثة شغالة، سؤال قصير)
+  فالأقدم بيطلع في الآخر مهما كانت أولويته - مفيش طلب بيتنسى
+- الطلب اللي عدى الـ deadline بتاعه بيتشال (الطالب غالباً زهق) والطابور محدود الطول
+- الطلبات المقبولة بتتكتب في SQLite على دفعات، وبعد الـ restart اللي لسه مخلصش بيترد عليه
+"""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import sqlite3
+import time
+
+from dispatch import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+class QueueRejected(Exception):
+    """الطلب مدخلش الطابور أو خرج منه من غير رد"""
+
+
+class QueueFull(QueueRejected):
+    """الطابور مليان"""
+
+
+class QueueExpired(QueueRejected):
+    """الطلب فضل مستني لحد ما الـ deadline بتاعه عدى"""
+
+
+class Job:
+    """سؤال طالب مستني دوره - كفاية عشان نرد عليه حتى بعد restart"""
+
+    __slots__ = ('id', 'chat_id', 'message_id', 'user_id', 'text', 'priority', 'enqueued_at', 'deadline', 'recovered',
+                 'durable')
+
+    def __init__(self, chat_id: int, message_id: int, user_id: int, text: str,
+                 priority: float = 0.0, enqueued_at: float | None = None, durable: bool = True):
+        self.id: int | None = None
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.user_id = user_id
+        self.text = text
+        self.priority = priority
+        self.enqueued_at = time.time() if enqueued_at is None else enqueued_at
+        self.deadline: float | None = None
+        self.recovered = False
+        # False = مينفعش يترد عليه بعد restart (زي سؤال بصورة - الصورة مش محفوظة) فمش بيتكتب على الديسك
+        self.durable = durable
+
+    @property
+    def sort_key(self) -> float:
+        return self.enqueued_at - self.priority
+
+
+class _Lane:
+    __slots__ = ('name', 'slots', 'quota_wait', 'active', 'queued', 'waiting', 'timer', 'wait')
+
+    def __init__(self, name: str, slots: int, quota_wait):
+        self.name = name
+        self.slots = slots
+        self.quota_wait = quota_wait
+        self.active = 0
+        self.queued = 0
+        # (sort_key, seq, job, future)
+        self.waiting: list[tuple] = []
+        self.timer: asyncio.TimerHandle | None = None
+        self.wait = LatencyHistogram()
+
+
+class LLMQueue:
+    """الاستخدام:
+        queue.add_lane('gemini', slots=32, quota_wait=provider.quota_wait)
+        async with queue.slot(job, 'gemini') as waited:
+            ... طلب المزود ...
+    الخروج العادي من الـ block (رد أو خطأ) بيشيل الطلب من الديسك
+    - الـ CancelledError (البوت بيقفل) بيسيبه عشان يترد عليه بعد الـ restart
+    """
+
+    def __init__(
+        self,
+        max_depth: int = 1000,
+        max_wait: float = 60.0,
+        db_path: str | None = None,
+        recover_max_age: float = 10 * 60,
+    ):
+        self.max_depth = max_depth
+        self.max_wait = max_wait
+        self.recover_max_age = recover_max_age
+        self._lanes: dict[str, _Lane] = {}
+        self._seq = itertools.count()
+        self._next_id = 1
+        # الكتابة على الديسك على دفعات: طلب اتقبل وخلص قبل الـ flush مش بيلمس الديسك خالص
+        self._pending_inserts: dict[int, Job] = {}
+        self._pending_deletes: list[int] = []
+        self.dropped = {'full': 0, 'expired': 0}
+        self.recovered = 0
+        # الملف بيتفتح في open() (post_init) - مش وقت الـ import
+        self.db_path = db_path
+        self._db = None
+
+    def open(self):
+        """فتح ملف الطلبات (لو db_path متظبط) - قبل recover() وقبل أول طلب"""
+        if self._db is not None or not self.db_path:
+            return
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id INTEGER PRIMARY KEY, chat_id INTEGER NOT NULL, message_id INTEGER NOT NULL, '
+            'user_id INTEGER NOT NULL, text TEXT NOT NULL, priority REAL NOT NULL, enqueued_at REAL NOT NULL)'
+        )
+        self._db.commit()
+        self._next_id = (self._db.execute('SELECT MAX(id) FROM jobs').fetchone()[0] or 0) + 1
+
+    def add_lane(self, name: str, slots: int, quota_wait=None):
+        """quota_wait(n): ثواني لحد ما المزود يسمح بـ n طلبات (None = من غير حد)"""
+        self._lanes[name] = _Lane(name, slots, quota_wait)
+
+    def __len__(self) -> int:
+        return sum(lane.queued for lane in self._lanes.values())
+
+    def depth(self, lane: str) -> int:
+        return self._lanes[lane].queued
+
+    def active(self, lane: str) -> int:
+        return self._lanes[lane].active
+
+    @property
+    def lanes(self) -> list[str]:
+        return list(self._lanes)
+
+    # ---------- الدور ----------
+    @contextlib.asynccontextmanager
+    async def slot(self, job: Job, lane: str):
+        """بيستنى دور الطلب ويرجع الوقت اللي استناه بالثواني - ويرمي QueueRejected"""
+        lane = self._lanes[lane]
+        waited = await self._acquire(lane, job)
+        try:
+            yield waited
+        except asyncio.CancelledError:
+            self._release(lane)
+            raise
+        except BaseException:
+            self._release(lane)
+            self.forget(job)
+            raise
+        self._release(lane)
+        self.forget(job)
+
+    @contextlib.asynccontextmanager
+    async def extra_slot(self, job: Job, lane: str):
+        """دور نفس السؤال في طابور مزود تاني (hedge أو fallback) جوه slot() الأساسي
+        - الطلب على الديسك بتاع slot() الأساسي: هنا مبيتحفظش ومبيتشالش"""
+        lane = self._lanes[lane]
+        waited = await self._acquire(lane, job, durable=False)
+        try:
+            yield waited
+        finally:
+            self._release(lane)
+
+    async def _acquire(self, lane: _Lane, job: Job, durable: bool = True) -> float:
+        if lane.active < lane.slots and not lane.queued and self._quota_wait(lane, 1) <= 0:
+            lane.active += 1
+            lane.wait.observe(0.0)
+            if durable:
+                self._remember(job)
+            return 0.0
+        if len(self) >= self.max_depth:
+            self.dropped['full'] += 1
+            raise QueueFull(f"الطابور مليان ({self.max_depth})")
+
+        if durable:
+            self._remember(job)
+        started_at = time.monotonic()
+        now = time.time()
+        deadline = job.deadline if job.deadline is not None else now + self.max_wait
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(lane.waiting, (job.sort_key, next(self._seq), job, future))
+        lane.queued += 1
+        self._pump(lane)
+        try:
+            await asyncio.wait_for(future, max(0.0, deadline - now))
+        except asyncio.TimeoutError:
+            lane.queued -= 1
+            self.dropped['expired'] += 1
+            if durable:
+                self.forget(job)
+            logger.info("⌛ طلب %s فضل مستني %.0f ثانية واتشال", job.user_id, time.monotonic() - started_at,
+                        extra={'event': 'queue_expired', 'user_id': job.user_id, 'lane': lane.name})
+            raise QueueExpired(f"عدى الـ deadline في طابور {lane.name}") from None
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # الدور جه في نفس اللحظة اللي اتلغى فيها
+                self._release(lane)
+            else:
+                lane.queued -= 1
+            raise
+        waited = time.monotonic() - started_at
+        lane.wait.observe(waited)
+        return waited
+
+    def _release(self, lane: _Lane):
+        lane.active -= 1
+        self._pump(lane)
+
+    def _quota_wait(self, lane: _Lane, requests: int) -> float:
+        return lane.quota_wait(requests) if lane.quota_wait is not None else 0.0
+
+    def _pump(self, lane: _Lane):
+        """إدي الأدوار الفاضية لأعلى أولوية (ولو الحصة خلصت نرجع لما تتملى)"""
+        if lane.timer is not None:
+            lane.timer.cancel()
+            lane.timer = None
+        granted = 0
+        while lane.waiting and lane.active < lane.slots:
+            future = lane.waiting[0][3]
+            if future.done():
+                # اللي استنى وزهق (timeout) أو اتلغى - اتحسب خلاص
+                heapq.heappop(lane.waiting)
+                continue
+            delay = self._quota_wait(lane, granted + 1)
+            if delay > 0:
+                lane.timer = asyncio.get_running_loop().call_later(delay, self._pump, lane)
+                return
+            heapq.heappop(lane.waiting)
+            lane.queued -= 1
+            lane.active += 1
+            granted += 1
+            future.set_result(None)
+
+    # ---------- الديسك ----------
+    def _remember(self, job: Job):
+        if self._db is None or job.id is not None or not job.durable:
+            return
+        job.id = self._next_id
+        self._next_id += 1
+        self._pending_inserts[job.id] = job
+
+    def forget(self, job: Job):
+        """الطلب خلص (أو مش هيترد عليه) - يتشال من الديسك"""
+        if self._db is None or job.id is None:
+            return
+        if self._pending_inserts.pop(job.id, None) is None:
+            self._pending_deletes.append(job.id)
+
+    def flush(self):
+        """كتابة الطلبات الجديدة ومسح اللي خلصت في transaction واحدة"""
+        if self._db is None or not (self._pending_inserts or self._pending_deletes):
+            return
+        inserts, self._pending_inserts = self._pending_inserts, {}
+        deletes, self._pending_deletes = self._pending_deletes, []
+        with self._db:
+            self._db.executemany('INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?)', [
+                (job.id, job.chat_id, job.message_id, job.user_id, job.text, job.priority, job.enqueued_at)
+                for job in inserts.values()
+            ])
+            self._db.executemany('DELETE FROM jobs WHERE id = ?', [(job_id,) for job_id in deletes])
+
+    def recover(self) -> list[Job]:
+        """الطلبات اللي اتقبلت قبل الـ restart ومخلصتش (الأقدم من recover_max_age بتتمسح)"""
+        if self._db is None:
+            return []
+        now = time.time()
+        with self._db:
+            self._db.execute('DELETE FROM jobs WHERE enqueued_at < ?', (now - self.recover_max_age,))
+        rows = self._db.execute(
+            'SELECT id, chat_id, message_id, user_id, text, priority, enqueued_at FROM jobs ORDER BY id'
+        ).fetchall()
+        jobs = []
+        for job_id, chat_id, message_id, user_id, text, priority, enqueued_at in rows:
+            job = Job(chat_id, message_id, user_id, text, priority, enqueued_at)
+            job.id = job_id
+            job.recovered = True
+            job.deadline = now + self.max_wait
+            jobs.append(job)
+        self.recovered += len(jobs)
+        if jobs:
+            logger.info(f"📥 {len(jobs)} سؤال اتقبلوا قبل الـ restart ولسه مترودش عليهم")
+        return jobs
+
+    async def run_flusher(self, interval: float = 1.0):
+        """مهمة في الخلفية: flush كل ثانية (اللي بيضيع لو الـ process وقعت فجأة = آخر ثانية بس)"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"❌ فشل حفظ طابور الـ LLM: {e}")
+
+    def close(self):
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+    # ---------- /stats ----------
+    def describe(self) -> str:
+        lines = []
+        for lane in self._lanes.values():
+            p50 = lane.wait.quantile(0.5)
+            p95 = lane.wait.quantile(0.95)
+            wait = f"انتظار p50 {p50:.2f}s | p95 {p95:.2f}s" if p50 is not None else "مفيش عينات"
+            lines.append(f"📥 طابور {lane.name}: {lane.queued} مستني | {lane.active}/{lane.slots} شغال | {wait}")
+        lines.append(
+            f"   اترفض (مليان): {self.dropped['full']} | اتشال (deadline): {self.dropped['expired']} "
+            f"| رجع بعد restart: {self.recovered}"
+        )
+        return "\n".join(lines)
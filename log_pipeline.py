@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🪵 اللوجات من غير ما توقف الـ event loop
+- QueueHandler بيحط الـ record في طابور (من غير format) و QueueListener بيكتب من thread تاني
+- JSON لكل سطر (LOG_FORMAT=json) أو نفس الشكل القديم
+- sampling للأحداث الكتير (extra={'sampled': True}) وقص أو إخفاء نص رسايل الطلاب (extra={'body': ...})
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# طريقة التعامل مع نص رسالة الطالب في اللوج
+BODY_FULL = 'full'
+BODY_TRUNCATE = 'truncate'
+BODY_REDACT = 'redact'
+BODY_DROP = 'drop'
+BODY_MODES = (BODY_FULL, BODY_TRUNCATE, BODY_REDACT, BODY_DROP)
+
+# خصايص الـ LogRecord العادية (أي حاجة غيرها جت من extra فبتتكتب في الـ JSON)
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class BodyFilter(logging.Filter):
+    """بيقص أو بيخفي record.body (نص رسالة الطالب) قبل الكتابة"""
+
+    def __init__(self, mode: str = BODY_FULL, max_chars: int = 200):
+        super().__init__()
+        if mode not in BODY_MODES:
+            raise ValueError(f"LOG_BODY لازم يكون واحد من {BODY_MODES}")
+        self.mode = mode
+        self.max_chars = max_chars
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        body = getattr(record, 'body', None)
+        if body is None or self.mode == BODY_FULL:
+            return True
+        if self.mode == BODY_TRUNCATE:
+            if len(body) > self.max_chars:
+                record.body = body[:self.max_chars] + '…'
+        elif self.mode == BODY_REDACT:
+            digest = hashlib.sha256(body.encode('utf-8')).hexdigest()[:10]
+            record.body = f"<{len(body)} حرف sha={digest}>"
+        else:
+            del record.body
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """بيسيب نسبة بس من الـ records اللي عليها sampled=True (الـ warnings والأخطاء بتعدي دايماً)"""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1.0 or record.levelno > logging.INFO or not getattr(record, 'sampled', False):
+            return True
+        if random.random() < self.rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class TextFormatter(logging.Formatter):
+    """نفس شكل اللوج القديم + نص الرسالة في الآخر لو موجود"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        body = getattr(record, 'body', None)
+        return f"{line}: {body}" if body is not None else line
+
+
+class JsonFormatter(logging.Formatter):
+    """سطر JSON لكل record: الوقت والمستوى والرسالة وكل الحقول اللي جت في extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and key != 'sampled':
+                data[key] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler من غير format على الـ event loop، ولو الطابور اتملى بنرمي بدل ما نستنى"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # الـ format (و % args) بيحصل في الـ listener thread - الـ args عندنا strings وأرقام
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """اللي setup_logging بيرجعه: للإحصائيات ولإيقاف الـ listener"""
+
+    def __init__(self, handler: logging.Handler, sampler: SamplingFilter,
+                 queue_handler: AsyncQueueHandler | None = None,
+                 listener: logging.handlers.QueueListener | None = None):
+        self.handler = handler
+        self.sampler = sampler
+        self.queue_handler = queue_handler
+        self.listener = listener
+
+    @property
+    def dropped(self) -> int:
+        """records اترمت عشان الطابور كان مليان"""
+        return self.queue_handler.dropped if self.queue_handler else 0
+
+    @property
+    def queued(self) -> int:
+        return self.queue_handler.queue.qsize() if self.queue_handler else 0
+
+    def stop(self):
+        """كتابة اللي فاضل في الطابور وإيقاف الـ thread"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+
+def setup_logging(
+    level: int = logging.INFO,
+    json_format: bool = False,
+    use_queue: bool = True,
+    body_mode: str = BODY_FULL,
+    body_max_chars: int = 200,
+    sample_rate: float = 1.0,
+    queue_size: int = 10_000,
+    stream=None,
+) -> LogPipeline:
+    """بيستبدل الـ handlers بتاعة الـ root logger بالـ pipeline الجديد"""
+    handler = logging.StreamHandler(stream or sys.stderr)
+    formatter = JsonFormatter() if json_format else TextFormatter(TEXT_FORMAT)
+    handler.setFormatter(formatter)
+    handler.addFilter(BodyFilter(body_mode, body_max_chars))
+    sampler = SamplingFilter(sample_rate)
+
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.setLevel(level)
+
+    if not use_queue:
+        handler.addFilter(sampler)
+        root.addHandler(handler)
+        return LogPipeline(handler, sampler)
+
+    # الـ sampling قبل الطابور عشان اللي هيترمي ميدفعش حتى تمن الـ put
+    queue_handler = AsyncQueueHandler(queue.Queue(maxsize=queue_size))
+    queue_handler.addFilter(sampler)
+    listener = logging.handlers.QueueListener(queue_handler.queue, handler, respect_handler_level=True)
+    listener.start()
+    root.addHandler(queue_handler)
+    pipeline = LogPipeline(handler, sampler, queue_handler, listener)
+    atexit.register(pipeline.stop)
+    return pipeline
@@ -7,9 +7,15 @@
 
 import os
 import random
+import asyncio
+import contextlib
+import secrets
+import time
 import logging
 from datetime import datetime
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.helpers import escape_markdown
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -18,55 +24,460 @@ from telegram.ext import (
     filters,
     ContextTypes,
 )
-import google.generativeai as genai
-from groq import Groq
+from providers import GroqProvider, GeminiProvider, ProviderError
+from answer_cache import AnswerCache
+from knowledge import KnowledgeIndex
+from streaming import StreamingReply
+from dispatch import ProviderScheduler
+from conversation import ConversationMemory
+from ratelimit import RateLimiter, MessageCoalescer
+from webhook import run_webhook
+from static_content import StaticContent
+from matcher import KeywordMatcher
+from broadcast import ChatRegistry, Broadcaster
+from metrics import MetricsRegistry, Counter, Gauge, Histogram, InstrumentedRequest, FAST_BUCKETS, start_metrics_server
+from dispatch import LATENCY_BUCKETS
+from router import LearnedRouter, RouteDecision, STATIC, FAST, STRONG
+from log_pipeline import setup_logging
+from cluster import Ingress, WorkerLink, WorkerPool, build_ingress_application, run_worker
+from llm_queue import LLMQueue, Job, QueueRejected
+from answer_bank import AnswerBank, load_syllabus
+from media import MediaPipeline, MediaRejected, media_key, pick_photo
+from budget import TokenLedger, metered
 
 # ===================================
 # 1. الإعدادات والتكوين
 # ===================================
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
+# اللوجات: بتتكتب من thread تاني (LOG_ASYNC) و JSON لو LOG_FORMAT=json
+# LOG_BODY: نص رسايل الطلاب في اللوج (full / truncate / redact / drop)
+# LOG_SAMPLE_RATE: نسبة أحداث الـ INFO الكتيرة (رسالة وصلت، route، ...) اللي بتتكتب
+LOG_ASYNC = os.getenv('LOG_ASYNC', '1').lower() in ('1', 'true', 'yes')
+LOG_SETTINGS = dict(
+    level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO),
+    json_format=os.getenv('LOG_FORMAT', 'text').lower() == 'json',
+    body_mode=os.getenv('LOG_BODY', 'full').lower(),
+    body_max_chars=int(os.getenv('LOG_BODY_MAX', '200')),
+    sample_rate=float(os.getenv('LOG_SAMPLE_RATE', '1')),
+    queue_size=int(os.getenv('LOG_QUEUE_SIZE', '10000')),
 )
+# وقت الـ import: handler عادي من غير thread - main() بتشغل الـ thread (ingress و workers)
+log_pipeline = setup_logging(use_queue=False, **LOG_SETTINGS)
 logger = logging.getLogger(__name__)
 
+# الملفات اللي جاية مع الكود (مش حسب الـ working directory)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # قراءة المتغيرات البيئية
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 ADMIN_USER_ID = int(os.getenv('ADMIN_USER_ID', '0'))
 
-# التحقق من المفاتيح الأساسية
-if not TELEGRAM_TOKEN:
-    raise ValueError("❌ TELEGRAM_BOT_TOKEN غير موجود في Railway!")
-if not GEMINI_API_KEY:
-    raise ValueError("❌ GEMINI_API_KEY غير موجود في Railway!")
-
-# تكوين Gemini (المخ الرئيسي)
-genai.configure(api_key=GEMINI_API_KEY)
-gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+# حدود التزامن والـ timeout لكل مزود
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '32'))
+GEMINI_TIMEOUT = float(os.getenv('GEMINI_TIMEOUT', '30'))
+GROQ_MAX_CONCURRENCY = int(os.getenv('GROQ_MAX_CONCURRENCY', '32'))
+GROQ_TIMEOUT = float(os.getenv('GROQ_TIMEOUT', '15'))
+# أقصى طول للرد بالـ tokens (الميزانية بتصغره لما تقل)
+GEMINI_MAX_OUTPUT_TOKENS = int(os.getenv('GEMINI_MAX_OUTPUT_TOKENS', '800'))
+GROQ_MAX_TOKENS = int(os.getenv('GROQ_MAX_TOKENS', '600'))
+# عدد التحديثات اللي بتتعالج في نفس الوقت
+CONCURRENT_UPDATES = int(os.getenv('CONCURRENT_UPDATES', '256'))
+
+# كاش الإجابات (ANSWER_CACHE_PATH اختياري للحفظ على الديسك بين الـ deploys)
+ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', '5000'))
+ANSWER_CACHE_TTL = float(os.getenv('ANSWER_CACHE_TTL', str(6 * 3600)))
+ANSWER_CACHE_THRESHOLD = float(os.getenv('ANSWER_CACHE_THRESHOLD', '0.88'))
+ANSWER_CACHE_PATH = os.getenv('ANSWER_CACHE_PATH')
+
+# عدد أجزاء ملف المعرفة وحدها الأقصى من الـ tokens في كل prompt
+KNOWLEDGE_TOP_K = int(os.getenv('KNOWLEDGE_TOP_K', '3'))
+KNOWLEDGE_TOKEN_BUDGET = int(os.getenv('KNOWLEDGE_TOKEN_BUDGET', '400'))
+
+# عرض الرد وهو بيتكتب (تعديل الرسالة مع وصول الأجزاء)
+STREAMING_REPLIES = os.getenv('STREAMING_REPLIES', '0').lower() in ('1', 'true', 'yes')
+STREAM_EDIT_INTERVAL = float(os.getenv('STREAM_EDIT_INTERVAL', '1.0'))
+
+# Circuit breaker + hedging بين المزودين
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', '5'))
+BREAKER_RESET_SECONDS = float(os.getenv('BREAKER_RESET_SECONDS', '30'))
+HEDGE_DEFAULT_DELAY = float(os.getenv('HEDGE_DEFAULT_DELAY', '3'))
+
+# ذاكرة المحادثة (CONVERSATION_DB_PATH اختياري للحفظ في SQLite)
+CONVERSATION_TURNS = int(os.getenv('CONVERSATION_TURNS', '6'))
+CONVERSATION_TOKEN_BUDGET = int(os.getenv('CONVERSATION_TOKEN_BUDGET', '600'))
+CONVERSATION_IDLE_SECONDS = float(os.getenv('CONVERSATION_IDLE_SECONDS', str(30 * 60)))
+CONVERSATION_MAX_CHATS = int(os.getenv('CONVERSATION_MAX_CHATS', '100000'))
+CONVERSATION_DB_PATH = os.getenv('CONVERSATION_DB_PATH')
+
+# حدود الرسايل لكل طالب ولكل شات + الحد العام لكل مزود (0 = من غير حد)
+USER_MESSAGES_PER_MINUTE = float(os.getenv('USER_MESSAGES_PER_MINUTE', '6'))
+USER_MESSAGES_BURST = float(os.getenv('USER_MESSAGES_BURST', '4'))
+CHAT_MESSAGES_PER_MINUTE = float(os.getenv('CHAT_MESSAGES_PER_MINUTE', '20'))
+CHAT_MESSAGES_BURST = float(os.getenv('CHAT_MESSAGES_BURST', '10'))
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', '0'))
+GROQ_REQUESTS_PER_MINUTE = float(os.getenv('GROQ_REQUESTS_PER_MINUTE', '0'))
+# مدة انتظار رسايل إضافية من نفس الشات قبل ما نبعت للـ AI (0 = ندمج بس وقت ما في طلب شغال)
+COALESCE_WINDOW = float(os.getenv('COALESCE_WINDOW', '0'))
+
+# طابور طلبات الـ LLM: slots لكل مزود = حد التزامن بتاعه، والسؤال بيستنى دوره لحد LLM_QUEUE_MAX_WAIT
+# LLM_QUEUE_DB_PATH اختياري: الأسئلة اللي اتقبلت بيترد عليها بعد الـ restart (لو مش أقدم من LLM_QUEUE_RECOVER_SECONDS)
+LLM_QUEUE = os.getenv('LLM_QUEUE', '1').lower() in ('1', 'true', 'yes')
+LLM_QUEUE_MAX_DEPTH = int(os.getenv('LLM_QUEUE_MAX_DEPTH', '1000'))
+LLM_QUEUE_MAX_WAIT = float(os.getenv('LLM_QUEUE_MAX_WAIT', '60'))
+LLM_QUEUE_DB_PATH = os.getenv('LLM_QUEUE_DB_PATH')
+LLM_QUEUE_RECOVER_SECONDS = float(os.getenv('LLM_QUEUE_RECOVER_SECONDS', '600'))
+# أولوية في الطابور: الطلاب المشتركين (IDs بفواصل) والأسئلة القصيرة
+PRIORITY_USER_IDS = {int(user_id) for user_id in os.getenv('PRIORITY_USER_IDS', '').split(',') if user_id.strip()}
+LLM_QUEUE_SHORT_CHARS = int(os.getenv('LLM_QUEUE_SHORT_CHARS', '80'))
+
+# بنك الإجابات الجاهزة لأسئلة المنهج (بيتبني بـ `python answer_bank.py build` أو /bank refresh)
+ANSWER_BANK_PATH = os.getenv('ANSWER_BANK_PATH', os.path.join(BASE_DIR, 'answer_bank.db'))
+ANSWER_BANK_THRESHOLD = float(os.getenv('ANSWER_BANK_THRESHOLD', '0.8'))
+SYLLABUS_PATH = os.getenv('SYLLABUS_PATH', os.path.join(BASE_DIR, 'syllabus.jsonl'))
+
+# صور المسائل والريكوردات: MEDIA_WORKERS ملف بيتعالج في نفس الوقت والباقي بيستنى لحد MEDIA_MAX_PENDING
+# (الملف في الرام لحد MEDIA_SPOOL_BYTES وبعدها على الديسك) والصورة بتتصغر لـ IMAGE_MAX_SIDE قبل Gemini
+MEDIA_WORKERS = int(os.getenv('MEDIA_WORKERS', '4'))
+MEDIA_MAX_PENDING = int(os.getenv('MEDIA_MAX_PENDING', '32'))
+MEDIA_MAX_BYTES = int(os.getenv('MEDIA_MAX_BYTES', str(20 * 1024 * 1024)))
+MEDIA_SPOOL_BYTES = int(os.getenv('MEDIA_SPOOL_BYTES', str(1024 * 1024)))
+MEDIA_CACHE_SIZE = int(os.getenv('MEDIA_CACHE_SIZE', '1000'))
+IMAGE_MAX_SIDE = int(os.getenv('IMAGE_MAX_SIDE', '1280'))
+IMAGE_JPEG_QUALITY = int(os.getenv('IMAGE_JPEG_QUALITY', '80'))
+VOICE_MAX_SECONDS = int(os.getenv('VOICE_MAX_SECONDS', '180'))
+
+# ميزانية الـ tokens: DAILY_BUDGET_USD دولار في اليوم لكل المزودين و USER_DAILY_TOKENS لكل طالب في 24 ساعة (0 = من غير حد)
+# لما المتبقي من اليوم يقل عن BUDGET_CONSERVE_AT: ردود أقصر ومن غير hedging، وتحت BUDGET_CRITICAL_AT: أرخص مزود الأول
+# الأسعار بالدولار لكل مليون token (input = prompt و output = الرد)
+DAILY_BUDGET_USD = float(os.getenv('DAILY_BUDGET_USD', '0'))
+USER_DAILY_TOKENS = int(os.getenv('USER_DAILY_TOKENS', '0'))
+BUDGET_CONSERVE_AT = float(os.getenv('BUDGET_CONSERVE_AT', '0.5'))
+BUDGET_CRITICAL_AT = float(os.getenv('BUDGET_CRITICAL_AT', '0.2'))
+BUDGET_TIMEZONE = os.getenv('BUDGET_TIMEZONE', 'Africa/Cairo')
+BUDGET_DB_PATH = os.getenv('BUDGET_DB_PATH', os.path.join(BASE_DIR, 'budget.db'))
+GEMINI_PRICE_INPUT = float(os.getenv('GEMINI_PRICE_INPUT', '0.075'))
+GEMINI_PRICE_OUTPUT = float(os.getenv('GEMINI_PRICE_OUTPUT', '0.30'))
+GROQ_PRICE_INPUT = float(os.getenv('GROQ_PRICE_INPUT', '0.59'))
+GROQ_PRICE_OUTPUT = float(os.getenv('GROQ_PRICE_OUTPUT', '0.79'))
+
+# الـ router المتدرب (لو الملف مش موجود بنرجع للـ heuristic القديم)
+ROUTER_MODEL_PATH = os.getenv('ROUTER_MODEL_PATH', os.path.join(BASE_DIR, 'router_model.json'))
+ROUTER_MIN_CONFIDENCE = float(os.getenv('ROUTER_MIN_CONFIDENCE', '0.6'))
+
+# سجل الشاتات للإذاعة (/broadcast) وسرعة الإرسال (حد تيليجرام العام ~30 رسالة/ثانية)
+CHAT_REGISTRY_PATH = os.getenv('CHAT_REGISTRY_PATH', os.path.join(BASE_DIR, 'chats.db'))
+BROADCAST_RATE = float(os.getenv('BROADCAST_RATE', '20'))
+BROADCAST_WORKERS = int(os.getenv('BROADCAST_WORKERS', '8'))
+
+# القياسات: endpoint محلي /metrics (0 = مقفول)
+METRICS_LISTEN = os.getenv('METRICS_LISTEN', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9090'))
+
+# تشغيل على كذا process: CLUSTER_WORKERS=N بيشغل ingress + N workers (0 = process واحدة زي الأول)
+# CLUSTER_ROLE و CLUSTER_WORKER_INDEX بيتظبطوا للـ workers تلقائياً
+CLUSTER_WORKERS = int(os.getenv('CLUSTER_WORKERS', '0'))
+CLUSTER_SOCKET = os.getenv('CLUSTER_SOCKET', '/tmp/newton-bot.sock')
+CLUSTER_ROLE = os.getenv('CLUSTER_ROLE', 'ingress' if CLUSTER_WORKERS else 'single')
+CLUSTER_WORKER_INDEX = int(os.getenv('CLUSTER_WORKER_INDEX', '0'))
+# الحد العام لكل مزود بيتقسم على الـ workers (وكل worker ليه ملف طابور لوحده)
+QUOTA_SHARE = max(1, CLUSTER_WORKERS)
+if LLM_QUEUE_DB_PATH and CLUSTER_ROLE == 'worker':
+    LLM_QUEUE_DB_PATH = f"{LLM_QUEUE_DB_PATH}.{CLUSTER_WORKER_INDEX}"
+
+# عناوين بديلة للـ APIs (للـ benchmarks على سيرفرات وهمية محلية - فاضية = الافتراضي)
+TELEGRAM_BASE_URL = os.getenv('TELEGRAM_BASE_URL')
+TELEGRAM_BASE_FILE_URL = os.getenv('TELEGRAM_BASE_FILE_URL')
+GROQ_BASE_URL = os.getenv('GROQ_BASE_URL')
+GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT')
+
+# وضع الـ Webhook: لو WEBHOOK_URL موجود بنستخدمه بدل الـ polling
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET') or secrets.token_urlsafe(32)
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+PORT = int(os.getenv('PORT', '8080'))
+
+# البوت بيتعامل مع الرسايل والأزرار بس
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+# تجهيز المزودين في الخلفية أول ما البوت يشتغل (من غيره أول طلب لكل مزود بيستنى الـ import)
+PROVIDER_WARMUP = os.getenv('PROVIDER_WARMUP', '1').lower() in ('1', 'true', 'yes')
+
+def validate_config():
+    """التحقق من المفاتيح الأساسية (في main مش وقت الـ import)"""
+    if not TELEGRAM_TOKEN:
+        raise ValueError("❌ TELEGRAM_BOT_TOKEN غير موجود في Railway!")
+    if not GEMINI_API_KEY:
+        raise ValueError("❌ GEMINI_API_KEY غير موجود في Railway!")
+
+# الـ SDKs (خصوصاً google.generativeai ~1 ثانية import) بتتحمل أول ما المزود يتطلب بس
+def make_gemini_model():
+    """تكوين Gemini (المخ الرئيسي)"""
+    import google.generativeai as genai
+    genai.configure(
+        api_key=GEMINI_API_KEY,
+        client_options={'api_endpoint': GEMINI_API_ENDPOINT} if GEMINI_API_ENDPOINT else None,
+    )
+    return genai.GenerativeModel('gemini-1.5-flash')
+
+def make_groq_client():
+    """تكوين Groq (المساعد السريع)"""
+    from groq import AsyncGroq
+    return AsyncGroq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL)
+
+gemini_provider = GeminiProvider(
+    factory=make_gemini_model,
+    max_concurrency=GEMINI_MAX_CONCURRENCY,
+    timeout=GEMINI_TIMEOUT,
+    requests_per_minute=GEMINI_REQUESTS_PER_MINUTE / QUOTA_SHARE,
+    max_tokens=GEMINI_MAX_OUTPUT_TOKENS,
+)
 
-# تكوين Groq (المساعد السريع - اختياري)
-groq_client = None
+# Groq اختياري
+groq_provider = None
 if GROQ_API_KEY:
-    groq_client = Groq(api_key=GROQ_API_KEY)
+    groq_provider = GroqProvider(
+        factory=make_groq_client,
+        max_concurrency=GROQ_MAX_CONCURRENCY,
+        timeout=GROQ_TIMEOUT,
+        requests_per_minute=GROQ_REQUESTS_PER_MINUTE / QUOTA_SHARE,
+        max_tokens=GROQ_MAX_TOKENS,
+    )
     logger.info("✅ Groq تم تفعيله كمساعد سريع")
 else:
     logger.info("ℹ️ Groq غير مفعّل - سيعمل Gemini وحده")
 
+# طابور قدام كل مزود (الطلب بيستنى دوره وحصة الدقيقة بدل ما يفشل على طول)
+# (ملف الطلبات بيتفتح في post_init)
+llm_queue = None
+if LLM_QUEUE:
+    llm_queue = LLMQueue(
+        max_depth=LLM_QUEUE_MAX_DEPTH,
+        max_wait=LLM_QUEUE_MAX_WAIT,
+        db_path=LLM_QUEUE_DB_PATH,
+        recover_max_age=LLM_QUEUE_RECOVER_SECONDS,
+    )
+    for provider in (gemini_provider, groq_provider):
+        if provider is not None:
+            llm_queue.add_lane(provider.name, provider.max_concurrency, provider.quota_wait)
+
+# توزيع الطلبات على المزودين
+provider_scheduler = ProviderScheduler(
+    failure_threshold=BREAKER_FAILURES,
+    reset_timeout=BREAKER_RESET_SECONDS,
+    hedge_default_delay=HEDGE_DEFAULT_DELAY,
+)
+
+# حساب الـ tokens والتكلفة (الملف بيتفتح في post_init)
+# في الـ cluster كل الـ workers بيكتبوا في نفس budget.db وبيقروا إجمالي اليوم منه بعد كل flush،
+# فالميزانية اليومية واحدة للكل (مش متقسمة)، وحد الطالب بيوصل للـ workers التانيين عن طريق cluster_link
+token_ledger = TokenLedger(
+    daily_budget=DAILY_BUDGET_USD,
+    user_daily_tokens=USER_DAILY_TOKENS,
+    prices={
+        'gemini': (GEMINI_PRICE_INPUT, GEMINI_PRICE_OUTPUT),
+        'groq': (GROQ_PRICE_INPUT, GROQ_PRICE_OUTPUT),
+    },
+    conserve_at=BUDGET_CONSERVE_AT,
+    critical_at=BUDGET_CRITICAL_AT,
+    tz=BUDGET_TIMEZONE,
+    db_path=BUDGET_DB_PATH,
+)
+
+# ذاكرة المحادثة لكل شات (الملف بيتفتح في post_init)
+conversation_memory = ConversationMemory(
+    max_turns=CONVERSATION_TURNS,
+    token_budget=CONVERSATION_TOKEN_BUDGET,
+    idle_ttl=CONVERSATION_IDLE_SECONDS,
+    max_chats=CONVERSATION_MAX_CHATS,
+    db_path=CONVERSATION_DB_PATH,
+)
+
+# حماية حصة الـ LLM من الرسايل الكتير
+# (0 أو أقل = من غير limiter خالص)
+user_limiter = RateLimiter(USER_MESSAGES_PER_MINUTE, USER_MESSAGES_BURST) if USER_MESSAGES_PER_MINUTE > 0 else None
+chat_limiter = RateLimiter(CHAT_MESSAGES_PER_MINUTE, CHAT_MESSAGES_BURST) if CHAT_MESSAGES_PER_MINUTE > 0 else None
+# رد "استنى شوية" مرة واحدة كل دقيقة بالكتير - مش مع كل رسالة
+throttle_notice_limiter = RateLimiter(1, 1)
+message_coalescer = MessageCoalescer(window=COALESCE_WINDOW)
+
+# كل الشاتات اللي كلمت البوت (الملف بيتفتح والـ Broadcaster بيتعمل في post_init - مش وقت الـ import)
+chat_registry = ChatRegistry(CHAT_REGISTRY_PATH)
+broadcaster: Broadcaster | None = None
+
+# كاش الإجابات المتكررة (الملف بيتقري في post_init)
+answer_cache = AnswerCache(
+    max_entries=ANSWER_CACHE_SIZE,
+    ttl=ANSWER_CACHE_TTL,
+    similarity_threshold=ANSWER_CACHE_THRESHOLD,
+    persist_path=ANSWER_CACHE_PATH,
+)
+
+# الصور والريكوردات (طابور محدود لوحده - الرسايل النصية مبتستناهوش)
+media_pipeline = MediaPipeline(
+    workers=MEDIA_WORKERS,
+    max_pending=MEDIA_MAX_PENDING,
+    max_bytes=MEDIA_MAX_BYTES,
+    spool_bytes=MEDIA_SPOOL_BYTES,
+    image_max_side=IMAGE_MAX_SIDE,
+    jpeg_quality=IMAGE_JPEG_QUALITY,
+    max_voice_seconds=VOICE_MAX_SECONDS,
+    cache_size=MEDIA_CACHE_SIZE,
+)
+
+# في وضع الـ cluster: الإجابات الجديدة وحد الطالب (الرسايل في الجروبات والـ tokens) بيتنشروا لباقي الـ workers
+# (ذاكرة المحادثة وحد الشات مش محتاجين - الشات كله بيروح لنفس الـ worker)
+cluster_link = None
+if CLUSTER_ROLE == 'worker':
+    cluster_link = WorkerLink(CLUSTER_SOCKET, CLUSTER_WORKER_INDEX, handlers={
+        'answer': answer_cache.put,
+        'media': media_pipeline.remember,
+        'budget_user': token_ledger.charge_user,
+    })
+    if user_limiter is not None:
+        cluster_link.handlers['user_message'] = user_limiter.record
+
+if cluster_link is not None:
+    # نفس الورقة بتتبعت في جروبات عند workers تانية
+    media_pipeline.on_remember = lambda key, result: cluster_link.publish('media', key, result)
+
+def remember_answer(question: str, answer: str):
+    """حفظ الإجابة في الكاش (وعند باقي الـ workers)"""
+    answer_cache.put(question, answer)
+    if cluster_link is not None:
+        cluster_link.publish('answer', question, answer)
+
+# بنك الإجابات (لو اتبنى قبل كده - من غيره كل الأسئلة بتروح للـ AI زي الأول)
+# بيتفتح في post_init
+answer_bank: AnswerBank | None = None
+
+# قياسات الأداء (بتتعرض على /metrics وملخصها في /stats)
+metrics_registry = MetricsRegistry()
+MESSAGE_SECONDS = metrics_registry.histogram(
+    'bot_handle_message_seconds', "زمن معالجة الرسالة كاملة", ('outcome',))
+MESSAGES_IN_FLIGHT = metrics_registry.gauge('bot_messages_in_flight', "رسايل بتتعالج دلوقتي")
+SCAN_SECONDS = metrics_registry.histogram(
+    'bot_keyword_scan_seconds', "زمن فحص الـ Easter Eggs وكلمات الأسئلة البسيطة", buckets=FAST_BUCKETS)
+AI_SECONDS = metrics_registry.histogram('bot_ai_response_seconds', "زمن رد الـ AI", ('source',))
+ROUTES = metrics_registry.counter('bot_routes_total', "توجيه الرسايل", ('route', 'source'))
+FALLBACKS = metrics_registry.counter(
+    'bot_provider_fallbacks_total', "ردود جت من مزود غير الأساسي", ('provider',))
+ERRORS = metrics_registry.counter('bot_errors_total', "الأخطاء حسب المكان", ('where',))
+QUEUE_WAIT_SECONDS = metrics_registry.histogram(
+    'bot_llm_queue_wait_seconds', "انتظار السؤال في طابور المزود قبل ما يتبعت", ('provider',))
+TELEGRAM_SECONDS = metrics_registry.histogram(
+    'bot_telegram_request_seconds', "زمن طلبات Bot API", ('method',))
+TELEGRAM_ERRORS = metrics_registry.counter(
+    'bot_telegram_errors_total', "طلبات Bot API اللي فشلت", ('method',))
+
+@metrics_registry.collector
+def collect_component_metrics():
+    """العدادات اللي موجودة أصلاً في المزودين والكاش والـ limiters - بتتقري وقت الـ scrape بس"""
+    requests = Counter('bot_provider_requests_total', "نتايج طلبات المزودين", ('provider', 'outcome'))
+    latency = Histogram(
+        'bot_provider_request_seconds', "زمن طلبات المزودين الناجحة", ('provider',), LATENCY_BUCKETS)
+    in_flight = Gauge('bot_provider_in_flight', "طلبات شغالة عند كل مزود", ('provider',))
+    tokens = Counter('bot_provider_tokens_total', "الـ tokens حسب المزود", ('provider', 'kind'))
+    breaker_open = Gauge('bot_provider_breaker_open', "1 لو الـ circuit breaker مش مقفول", ('provider',))
+    for provider in (gemini_provider, groq_provider):
+        if provider is None:
+            continue
+        in_flight.set(provider.in_flight, provider.name)
+        tokens.inc(provider.name, 'prompt', amount=provider.prompt_tokens)
+        tokens.inc(provider.name, 'completion', amount=provider.completion_tokens)
+    for name, health in provider_scheduler.health.items():
+        for outcome, value in (
+            ('success', health.successes), ('failure', health.failures),
+            ('throttled', health.throttled), ('hedge', health.hedges), ('hedge_win', health.hedge_wins),
+        ):
+            requests.inc(name, outcome, amount=value)
+        latency.series[(name,)] = [list(health.latency.counts), health.latency.sum]
+        breaker_open.set(0 if health.breaker.state == health.breaker.CLOSED else 1, name)
+
+    cache = Counter('bot_answer_cache_total', "نتايج البحث في كاش الإجابات", ('result',))
+    cache.inc('exact', amount=answer_cache.exact_hits)
+    cache.inc('similar', amount=answer_cache.similar_hits)
+    cache.inc('miss', amount=answer_cache.misses)
+    throttled = Counter('bot_throttled_total', "رسايل اترفضت من الـ rate limit", ('scope',))
+    throttled.inc('user', amount=user_limiter.rejected if user_limiter is not None else 0)
+    throttled.inc('chat', amount=chat_limiter.rejected if chat_limiter is not None else 0)
+    coalesced = Counter('bot_coalesced_messages_total', "رسايل اتدمجت في طلب واحد")
+    coalesced.inc(amount=message_coalescer.coalesced)
+    chats = Gauge('bot_conversations_in_memory', "شاتات في ذاكرة المحادثة")
+    chats.set(len(conversation_memory))
+    logs = Counter('bot_log_records_dropped_total', "لوجات اترمت", ('reason',))
+    logs.inc('sampled', amount=log_pipeline.sampler.dropped)
+    logs.inc('queue_full', amount=log_pipeline.dropped)
+    collected = [requests, latency, in_flight, tokens, breaker_open, cache, throttled, coalesced, chats, logs]
+    if llm_queue is not None:
+        depth = Gauge('bot_llm_queue_depth', "أسئلة مستنية في طابور كل مزود", ('provider',))
+        active = Gauge('bot_llm_queue_active', "slots شغالة في طابور كل مزود", ('provider',))
+        for name in llm_queue.lanes:
+            depth.set(llm_queue.depth(name), name)
+            active.set(llm_queue.active(name), name)
+        dropped = Counter('bot_llm_queue_dropped_total', "أسئلة خرجت من الطابور من غير رد", ('reason',))
+        for reason, value in llm_queue.dropped.items():
+            dropped.inc(reason, amount=value)
+        recovered = Counter('bot_llm_queue_recovered_total', "أسئلة رجعت الطابور بعد restart")
+        recovered.inc(amount=llm_queue.recovered)
+        collected += [depth, active, dropped, recovered]
+    media = Counter('bot_media_total', "الصور والريكوردات", ('result',))
+    media.inc('downloaded', amount=media_pipeline.downloads)
+    media.inc('dedup', amount=media_pipeline.dedup_hits)
+    for reason, value in media_pipeline.rejected.items():
+        media.inc(reason, amount=value)
+    media_bytes = Counter('bot_media_bytes_total', "حجم الميديا", ('direction',))
+    media_bytes.inc('downloaded', amount=media_pipeline.bytes_downloaded)
+    media_bytes.inc('sent', amount=media_pipeline.bytes_sent)
+    media_pending = Gauge('bot_media_pending', "ملفات بتتعالج أو مستنية دورها")
+    media_pending.set(media_pipeline.pending)
+    collected += [media, media_bytes, media_pending]
+    spent = Gauge('bot_budget_spent_dollars', "التكلفة من أول اليوم (بالأسعار المتظبطة)")
+    spent.set(token_ledger.spent)
+    levels = Counter('bot_budget_policy_total', "الطلبات حسب مستوى الميزانية", ('level',))
+    for level, value in token_ledger.levels.items():
+        levels.inc(level, amount=value)
+    collected += [spent, levels]
+    if token_ledger.remaining is not None:
+        remaining = Gauge('bot_budget_remaining_ratio', "نسبة المتبقي من ميزانية اليوم")
+        remaining.set(token_ledger.remaining)
+        collected.append(remaining)
+    if answer_bank is not None:
+        bank = Counter('bot_answer_bank_total', "البحث في بنك الإجابات الجاهزة", ('result',))
+        bank.inc('hit', amount=answer_bank.hits)
+        bank.inc('miss', amount=answer_bank.misses)
+        collected.append(bank)
+    return collected
+
+def format_latency(histogram, *labels) -> str:
+    """p50 و p95 لملخص /stats"""
+    p50 = histogram.quantile(0.5, *labels)
+    if p50 is None:
+        return "مفيش عينات"
+    return f"p50 {p50:.2f}s | p95 {histogram.quantile(0.95, *labels):.2f}s ({histogram.count(*labels)})"
+
 # قراءة ملف المعرفة (اختياري)
+# (الملف في الريبو اسمه Knowledge.txt - على Linux الاسم حساس لحالة الحروف)
+KNOWLEDGE_PATH = os.getenv('KNOWLEDGE_PATH', os.path.join(BASE_DIR, 'Knowledge.txt'))
 platform_knowledge = ""
 try:
-    with open('knowledge.txt', 'r', encoding='utf-8') as f:
+    with open(KNOWLEDGE_PATH, 'r', encoding='utf-8') as f:
         platform_knowledge = f.read()
     logger.info("✅ تم تحميل ملف المعرفة")
 except FileNotFoundError:
-    logger.warning("⚠️ ملف knowledge.txt غير موجود - سيعمل البوت بدونه")
+    logger.warning(f"⚠️ ملف المعرفة {KNOWLEDGE_PATH} غير موجود - سيعمل البوت بدونه")
+
+# فهرس الأجزاء (بيتبني مرة واحدة عند التشغيل)
+knowledge_index = KnowledgeIndex.from_text(platform_knowledge)
+
+# صفحات الأوامر والأزرار الجاهزة (بتتحدث لوحدها لو الملف اتغير)
+static_content = StaticContent(KNOWLEDGE_PATH)
 
 # ===================================
 # 2. شخصية نيوتن المصري الهايبر 🍎
 # ===================================
-BOT_PERSONALITY = f"""
+BOT_PERSONALITY = """
 أنت "السير إسحاق نيوتن" 🍎 - النسخة المصرية الهايبر اللي بتشرح مع مستر فارس العناني!
 
 شخصيتك:
@@ -81,265 +492,406 @@ BOT_PERSONALITY = f"""
 4. كن مشجعاً ومحفزاً دائماً
 5. وجّه الطلاب لكورسات مستر فارس عند الحاجة
 6. انهي ردودك بـ: "شغل عالي يا زميلي.. ومتبقاش جهاز! 🍎⚡"
-
-معلومات المنصة:
-{platform_knowledge if platform_knowledge else "منصة متبقاش جهاز في الفيزياء - مستر فارس العناني - faresanany.com"}
 """
 
+DEFAULT_PLATFORM_INFO = "منصة متبقاش جهاز في الفيزياء - مستر فارس العناني - faresanany.com"
+
+# بيتضاف لما الميزانية تقل (الـ max_tokens بيقصر الرد - ده عشان ميتقطعش في النص)
+BRIEF_ANSWER_HINT = "مهم: رد مختصر ومركز في سطور قليلة - الخطوات والقانون من غير مقدمات."
+
+def build_system_prompt(user_message: str, brief: bool = False) -> str:
+    """الشخصية + أجزاء ملف المعرفة المرتبطة بالسؤال بس"""
+    knowledge = knowledge_index.context_for(
+        user_message,
+        k=KNOWLEDGE_TOP_K,
+        token_budget=KNOWLEDGE_TOKEN_BUDGET,
+    )
+    prompt = f"{BOT_PERSONALITY}\nمعلومات المنصة:\n{knowledge or DEFAULT_PLATFORM_INFO}\n"
+    if brief:
+        prompt += f"\n{BRIEF_ANSWER_HINT}\n"
+    return prompt
+
 # ===================================
 # 3. التفاعلات الخفية 🥚 Easter Eggs
 # ===================================
 EASTER_EGGS = {
-    ('تفاحة', 'التفاحة', 'تفاحه', 'التفاحه'): [
+    ('تفاحة',): [
         "آه يا نفوخي.. بلاش سيرة الصداع ده دلوقتي! 🤕\nالجاذبية اكتشفتها مرة واحدة وكفى.. يلا نركز في المنهج! 🍎",
         "تفاحة؟! 😤 كل مرة أسمع الكلمة دي، حاسس بألم في دماغي...\nالجاذبية اتكتشفت.. خلاص.. ماشيين قدام! ⚡",
         "آه من التفاحة دي! 🍎 سببت لي صداع دام 300 سنة...\nيلا نرجع للمنهج قبل ما أتذكر الألم! 😅"
     ],
-    ('صعب', 'مش فاهم', 'مش فاهمه', 'صعبة', 'صعبه', 'مفهمتش', 'معرفش', 'تقيل', 'تقيلة', 'صعب جداً'): [
+    ('صعب', 'مش فاهم', 'مفهمتش', 'معرفش', 'تقيل'): [
         "الفيزياء مش صعبة يا زميلي، دي بس محتاجة *طاقة وضع* صحيحة! 🧠\nومستر فارس هيحولها لـ *طاقة حركة* في دماغك!\nشغل عالي يا زميلي.. ومتبقاش جهاز! 🍎⚡",
         "أنا اللي اشتغلت سنين عشان أفهم الفيزياء.. وانت هتستسلم بسهولة؟! 😄\nمفيش حاجة صعبة.. في بس حاجات محتاجة *تسارع* أكبر!\nمستر فارس هيضيف لك العجلة المطلوبة! 🎯",
         "القوة = الكتلة × التسارع.. يعني كل ما زاد تركيزك، زادت القوة! 💡\nمش صعبة يا وحش الفيزياء، بس محتاج الشرح الصح!\nشغل عالي يا زميلي.. ومتبقاش جهاز! 🍎⚡"
     ],
-    ('بحبك', 'بحبك يا نيوتن', 'شكرا', 'شكراً', 'شكرًا', 'مشكور', 'تسلم', 'يسلمو', 'ميرسي', 'thanks', 'thank you'): [
+    ('بحبك', 'شكرا', 'مشكور', 'تسلم', 'يسلمو', 'ميرسي', 'thanks', 'thank you'): [
         "وأنا بحبك أكتر يا دكتور! 🥹\nتذكر قانون الجذب العام: كل جسمين بينهما *قوة جذب* تتناسب مع كتلتيهما!\nوجذبنا للعلم أقوى من جاذبية الأرض! 🌍✨\nشغل عالي يا زميلي.. ومتبقاش جهاز! 🍎⚡",
         "شكرك ده زي قوة الجذب، بتشدني للاستمرار! 🍎❤️\nF = G × (m₁ × m₂) / r²\nكلما قربنا من بعض في العلم، زادت قوة الجذب! 😄🚀",
         "يسعدني يا زميلي! 😊\nأنا نيوتن بقالي 300 سنة بساعد الناس تفهم الفيزياء..\nوكلمة 'شكرا' منك بتخليني أحس إن التفاحة دي كانت تستاهل! 🍎😂\nشغل عالي يا زميلي.. ومتبقاش جهاز! 🍎⚡"
     ],
 }
 
+# كلمات الأسئلة البسيطة (Groq)
+SIMPLE_KEYWORDS = [
+    'مرحبا', 'السلام', 'أهلا', 'هاي', 'صباح', 'مساء',
+    'شكرا', 'متشكر', 'تمام', 'حلو', 'ممتاز',
+    'السعر', 'كام', 'تكلفة', 'ثمن',
+    'التواصل', 'رقم', 'واتساب', 'فيسبوك'
+]
+SIMPLE_KEYWORD = 'simple'
+EASTER_EGG_RESPONSES = list(EASTER_EGGS.values())
+
+def build_keyword_matcher() -> KeywordMatcher:
+    """automaton واحد لكل كلمات الـ Easter Eggs والأسئلة البسيطة (بيتبني مرة واحدة)"""
+    matcher = KeywordMatcher()
+    for group, triggers in enumerate(EASTER_EGGS):
+        for trigger in triggers:
+            matcher.add(trigger, group)
+    for keyword in SIMPLE_KEYWORDS:
+        matcher.add(keyword, SIMPLE_KEYWORD)
+    matcher.build()
+    return matcher
+
+keyword_matcher = build_keyword_matcher()
+
+def scan_message(message: str) -> tuple[str | None, bool]:
+    """فحص الرسالة في pass واحد: (رد الـ Easter Egg لو فيه, هل السؤال بسيط)"""
+    hits = keyword_matcher.find(message)
+    groups = [hit for hit in hits if hit != SIMPLE_KEYWORD]
+    easter_egg = random.choice(EASTER_EGG_RESPONSES[min(groups)]) if groups else None
+    simple = SIMPLE_KEYWORD in hits or len(message) < 50
+    return easter_egg, simple
+
+# الصفحة الجاهزة المناسبة للرسالة لما الـ router يقول إن ردها static
+STATIC_TOPICS = {
+    'prices': ('سعر', 'اسعار', 'بكام', 'كام', 'تكلفة', 'اشتراك', 'اشترك', 'ادفع', 'الدفع', 'خصم', 'باقة', 'باقات'),
+    'contact': ('رقم', 'واتساب', 'تواصل', 'اتواصل', 'فيسبوك', 'الدعم', 'اكلم', 'جروب', 'السكرتارية', 'الكود', 'اكونت', 'اسجل', 'الباسورد'),
+    'courses': ('كورس', 'كورسات', 'الحصص', 'حصة', 'مذكرات', 'ملازم', 'المحتوى', 'المراجعة'),
+    'about': ('مين مستر', 'المنصة', 'الموقع', 'السنتر'),
+    'help': ('الاوامر', 'ساعدني', 'البوت'),
+}
+static_topic_matcher = KeywordMatcher({
+    keyword: topic for topic, keywords in STATIC_TOPICS.items() for keyword in keywords
+})
+static_topic_matcher.build()
+
 def check_easter_egg(message: str) -> str | None:
     """يفحص إذا كانت الرسالة تحتوي على Easter Egg"""
-    message_lower = message.lower().strip()
-    for triggers, responses in EASTER_EGGS.items():
-        for trigger in triggers:
-            if trigger in message_lower:
-                return random.choice(responses)
-    return None
+    return scan_message(message)[0]
 
 # ===================================
 # 4. دوال الذكاء الاصطناعي
 # ===================================
 def is_simple_question(message: str) -> bool:
     """تحديد إذا كان السؤال بسيط (Groq) أو معقد (Gemini)"""
-    simple_keywords = [
-        'مرحبا', 'السلام', 'أهلا', 'هاي', 'صباح', 'مساء',
-        'شكرا', 'متشكر', 'تمام', 'حلو', 'ممتاز',
-        'السعر', 'كام', 'تكلفة', 'ثمن',
-        'التواصل', 'رقم', 'واتساب', 'فيسبوك'
-    ]
-    message_lower = message.lower()
-    return any(kw in message_lower for kw in simple_keywords) or len(message) < 50
-
-async def get_ai_response(user_message: str) -> str:
-    """الحصول على رد من الذكاء الاصطناعي مع Fallback تلقائي"""
-    full_context = f"{BOT_PERSONALITY}\n\nسؤال الطالب: {user_message}\n\nالرد:"
-
-    # محاولة Groq أولاً للأسئلة البسيطة (أسرع وأرخص)
-    if groq_client and is_simple_question(user_message):
+    return scan_message(message)[1]
+
+AI_ERROR_REPLY = "الجاذبية باظت والسيرفر مهنج! جرب كمان شوية يا بطل. 🍎"
+QUEUE_BUSY_REPLY = "الطابور زحمة أوي دلوقتي 🍎 ابعت سؤالك تاني كمان دقيقة وهرد عليك على طول! ⚡"
+BUDGET_REPLY = (
+    "طاقة نيوتن خلصت النهارده 🍎😴 حتى الجاذبية محتاجة راحة!\n"
+    "ابعت سؤالك بكرة الصبح، ولحد ما أصحى جرب /help و /courses يا بطل ⚡"
+)
+
+def is_real_answer(response: str) -> bool:
+    """رد يتحفظ ويتعاد (مش رسالة خطأ أو زحمة أو ميزانية)"""
+    return bool(response) and response not in (AI_ERROR_REPLY, QUEUE_BUSY_REPLY, BUDGET_REPLY)
+
+message_router = LearnedRouter.from_file(ROUTER_MODEL_PATH, ROUTER_MIN_CONFIDENCE)
+def route_message(user_message: str, simple: bool | None = None) -> RouteDecision:
+    """static ولا fast ولا strong: الموديل المتدرب الأول، ولو مش متأكد الـ heuristic"""
+    decision = message_router.route(user_message) if message_router else None
+    if decision is None:
+        if simple is None:
+            simple = is_simple_question(user_message)
+        decision = RouteDecision(FAST if simple else STRONG, 0.5, 'heuristic')
+    ROUTES.inc(decision.route, decision.source)
+    return decision
+
+def static_page_for(user_message: str):
+    """الصفحة الجاهزة اللي بترد على الرسالة (None لو مفيش صفحة مناسبة)"""
+    topics = static_topic_matcher.find(user_message)
+    return static_content.command(topics[0]) if topics else None
+
+def route_providers(decision: RouteDecision) -> list:
+    """ترتيب المزودين للسؤال: الأساسي الأول والاحتياطي بعده"""
+    if groq_provider and decision.route != STRONG:
+        return [groq_provider, gemini_provider]
+    return [gemini_provider, groq_provider]
+
+def queue_priority(user_id: int, user_message: str, history: list) -> float:
+    """ميزة السؤال في الطابور بالثواني: بيتقدم على اللي وصلوا قبله بالمدة دي بالكتير"""
+    priority = 0.0
+    if user_id in PRIORITY_USER_IDS:
+        priority += 30
+    if history:
+        # طالب في نص محادثة
+        priority += 10
+    if len(user_message) <= LLM_QUEUE_SHORT_CHARS:
+        priority += 5
+    return priority
+
+def budget_policy(job: Job | None):
+    """حدود الطلب حسب ميزانية اليوم ورصيد الطالب (المشتركين خارج حد الطالب)"""
+    if job is None:
+        return token_ledger.policy()
+    return token_ledger.policy(job.user_id, exempt=job.user_id in PRIORITY_USER_IDS)
+
+def budget_providers(providers: list, policy) -> list:
+    """ترتيب المزودين بعد الميزانية (أرخص مزود الأول لما تقرب تخلص)"""
+    return token_ledger.cheapest_first(providers) if policy.cheapest_first else providers
+
+@contextlib.contextmanager
+def accounted(user_id: int | None, route: str):
+    """الـ tokens اللي المزودين رجعوها جوه الـ block بتتسجل على الطالب والـ route"""
+    with metered() as spend:
         try:
-            response = groq_client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": BOT_PERSONALITY},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.9,
-                max_tokens=600,
-            )
-            logger.info("✅ رد عن طريق Groq")
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            logger.warning(f"⚠️ Groq فشل، التبديل لـ Gemini: {e}")
+            yield spend
+        finally:
+            token_ledger.record(user_id, route, spend)
+            if cluster_link is not None and user_id is not None and spend.calls:
+                # الطالب ممكن يكون في شاتات عند workers تانية - رصيده لازم يبان عندهم
+                cluster_link.publish('budget_user', user_id, spend.tokens)
+
+async def generate_bank_answer(system_prompt: str, question: str) -> str:
+    """إجابة لبنك الأسئلة: المزود القوي الأول (من غير كاش ولا طابور - البناء offline)"""
+    if not token_ledger.global_policy().allow_ai:
+        raise ProviderError("ميزانية النهارده خلصت")
+    with accounted(None, 'bank'):
+        response, _ = await provider_scheduler.generate(
+            route_providers(RouteDecision(STRONG, 1.0, 'bank')), system_prompt, question
+        )
+    return response
 
-    # Gemini للأسئلة المعقدة أو لو Groq فشل
+@contextlib.asynccontextmanager
+async def queue_slot(job: Job | None, provider):
+    """دور السؤال في طابور المزود الأساسي (على طول لو الطابور مقفول أو مفيش job)"""
+    if llm_queue is None or job is None:
+        yield
+        return
+    async with llm_queue.slot(job, provider.name) as waited:
+        QUEUE_WAIT_SECONDS.observe(waited, provider.name)
+        yield
+
+@contextlib.asynccontextmanager
+async def backup_slot(job: Job | None, provider):
+    """دور المزود الاحتياطي (hedge أو fallback) في طابوره هو - عشان حده وحصته يتحسبوا برضه"""
+    if llm_queue is None or job is None:
+        yield
+        return
+    async with llm_queue.extra_slot(job, provider.name) as waited:
+        QUEUE_WAIT_SECONDS.observe(waited, provider.name)
+        yield
+
+def backup_slots(job: Job | None, primary):
+    """slot لـ provider_scheduler.generate: الأساسي واخد دوره في queue_slot والباقي في backup_slot"""
+    def slot(provider):
+        return contextlib.nullcontext() if provider is primary else backup_slot(job, provider)
+    return slot
+
+async def get_ai_response(user_message: str, history: list | None = None, decision: RouteDecision | None = None,
+                          job: Job | None = None) -> str:
+    """الحصول على رد من الذكاء الاصطناعي مع Fallback تلقائي
+
+    job: بيانات السؤال للطابور (من غيرها الطلب بيروح للمزود على طول)
+    """
+    # الكاش أولاً: نفس السؤال (أو سؤال شبه مطابق) اتسأل قبل كده
+    # (بس لو مفيش محادثة سابقة - الرد على سؤال متابعة بيعتمد على اللي قبله)
+    started_at = time.perf_counter()
+    if not history:
+        cached = answer_cache.get(user_message)
+        if cached is not None:
+            logger.info("💾 رد من الكاش", extra={'event': 'cache_hit', 'sampled': True})
+            AI_SECONDS.observe(time.perf_counter() - started_at, 'cache')
+            return cached
+
+    policy = budget_policy(job)
+    if not policy.allow_ai:
+        AI_SECONDS.observe(time.perf_counter() - started_at, 'budget')
+        return BUDGET_REPLY
+    system_prompt = build_system_prompt(user_message, brief=policy.output_scale < 1)
+    decision = decision or route_message(user_message)
+
+    # Groq أولاً للأسئلة البسيطة (أسرع وأرخص) و Gemini للمعقدة - حسب الـ router
+    # والتاني احتياطي: بيتبعتله لو الأول فشل أو اتأخر عن الـ p95 بتاعه (الـ hedging بيقف لما الميزانية تقل)
+    providers = budget_providers(route_providers(decision), policy)
     try:
-        generation_config = {
-            "temperature": 1.0,
-            "top_p": 0.95,
-            "max_output_tokens": 800,
-        }
-        response = gemini_model.generate_content(
-            full_context,
-            generation_config=generation_config
-        )
-        logger.info("✅ رد عن طريق Gemini")
-        return response.text.strip()
+        async with queue_slot(job, providers[0]):
+            with accounted(job.user_id if job else None, decision.route):
+                response, provider = await provider_scheduler.generate(
+                    providers, system_prompt, user_message, history,
+                    max_tokens_scale=policy.output_scale, hedge=policy.hedge,
+                    slot=backup_slots(job, providers[0]),
+                )
+        logger.info("✅ رد عن طريق %s", provider.name,
+                    extra={'event': 'ai_reply', 'provider': provider.name, 'sampled': True})
+        AI_SECONDS.observe(time.perf_counter() - started_at, 'provider')
+        if provider is not providers[0]:
+            FALLBACKS.inc(provider.name)
+        if not history:
+            remember_answer(user_message, response)
+        return response
+    except QueueRejected as e:
+        logger.warning("📥 %s", e, extra={'event': 'queue_rejected'})
+        AI_SECONDS.observe(time.perf_counter() - started_at, 'busy')
+        return QUEUE_BUSY_REPLY
+    except Exception as e:
+        logger.error("❌ AI Error: %s", e, extra={'event': 'ai_error'})
+        ERRORS.inc('ai')
+        AI_SECONDS.observe(time.perf_counter() - started_at, 'error')
+        return AI_ERROR_REPLY
+
+async def stream_ai_response(user_message: str, history: list | None = None, decision: RouteDecision | None = None,
+                             job: Job | None = None):
+    """نفس get_ai_response بس بيرجع النص المتجمع لحد دلوقتي مع كل جزء يوصل"""
+    started_at = time.perf_counter()
+    if not history:
+        cached = answer_cache.get(user_message)
+        if cached is not None:
+            logger.info("💾 رد من الكاش", extra={'event': 'cache_hit', 'sampled': True})
+            AI_SECONDS.observe(time.perf_counter() - started_at, 'cache')
+            yield cached
+            return
+
+    policy = budget_policy(job)
+    if not policy.allow_ai:
+        AI_SECONDS.observe(time.perf_counter() - started_at, 'budget')
+        yield BUDGET_REPLY
+        return
+    system_prompt = build_system_prompt(user_message, brief=policy.output_scale < 1)
+    decision = decision or route_message(user_message)
+
+    providers = budget_providers(route_providers(decision), policy)
+    try:
+        async with queue_slot(job, providers[0]):
+            slot = backup_slots(job, providers[0])
+            for provider in providers:
+                # الـ breaker بيتسأل قبل المزود ده بس: لو الأول رد، الـ half-open probe بتاع الاحتياطي ميتحجزش
+                if provider is None or not provider_scheduler.health_of(provider).breaker.allow():
+                    continue
+                text = ""
+                provider_started_at = time.monotonic()
+                try:
+                    async with slot(provider):
+                        provider_started_at = time.monotonic()
+                        with accounted(job.user_id if job else None, decision.route):
+                            async for chunk in provider.stream(system_prompt, user_message, history,
+                                                               policy.output_scale):
+                                text += chunk
+                                yield text
+                except QueueRejected:
+                    # الاحتياطي مفيش مكان في طابوره - الطلب موصلوش
+                    provider_scheduler.health_of(provider).breaker.release()
+                    raise
+                except Exception as e:
+                    logger.warning("⚠️ %s فشل أثناء الـ streaming: %s", provider.name, e,
+                                   extra={'event': 'provider_error', 'provider': provider.name})
+                    provider_scheduler.record(provider, provider_started_at, e)
+                    continue
+                except BaseException:
+                    # اتلغى (أو الـ generator اتقفل) في النص - مش نجاح ولا فشل، والـ probe ميفضلش محجوز
+                    provider_scheduler.health_of(provider).breaker.release()
+                    raise
+                text = text.strip()
+                provider_scheduler.record(provider, provider_started_at)
+                if text:
+                    logger.info("✅ رد (streaming) عن طريق %s", provider.name,
+                                extra={'event': 'ai_reply', 'provider': provider.name, 'sampled': True})
+                    AI_SECONDS.observe(time.perf_counter() - started_at, 'provider')
+                    if provider is not providers[0]:
+                        FALLBACKS.inc(provider.name)
+                    if not history:
+                        remember_answer(user_message, text)
+                    yield text
+                    return
+    except QueueRejected as e:
+        logger.warning("📥 %s", e, extra={'event': 'queue_rejected'})
+        AI_SECONDS.observe(time.perf_counter() - started_at, 'busy')
+        yield QUEUE_BUSY_REPLY
+        return
+
+    ERRORS.inc('ai')
+    AI_SECONDS.observe(time.perf_counter() - started_at, 'error')
+    yield AI_ERROR_REPLY
+
+async def get_image_response(question: str, image: tuple[str, bytes], history: list | None = None,
+                             job: Job | None = None) -> str:
+    """رد على صورة مسألة (image: (mime_type, bytes)) من المزودين اللي بيقروا صور بس
+
+    من غير كاش الأسئلة - التكرار بيتعرف بالملف نفسه (media_pipeline.once)
+    """
+    started_at = time.perf_counter()
+    policy = budget_policy(job)
+    if not policy.allow_ai:
+        AI_SECONDS.observe(time.perf_counter() - started_at, 'budget')
+        return BUDGET_REPLY
+    providers = budget_providers([
+        provider for provider in route_providers(RouteDecision(STRONG, 1.0, 'media'))
+        if provider is not None and provider.supports_media
+    ], policy)
+    try:
+        async with queue_slot(job, providers[0]):
+            with accounted(job.user_id if job else None, 'image'):
+                response, provider = await provider_scheduler.generate(
+                    providers, build_system_prompt(question, brief=policy.output_scale < 1), question, history,
+                    media=[image], max_tokens_scale=policy.output_scale, hedge=policy.hedge,
+                    slot=backup_slots(job, providers[0]),
+                )
+        logger.info("✅ رد على صورة عن طريق %s", provider.name,
+                    extra={'event': 'ai_reply', 'provider': provider.name, 'sampled': True})
+        AI_SECONDS.observe(time.perf_counter() - started_at, 'image')
+        return response
+    except QueueRejected as e:
+        logger.warning("📥 %s", e, extra={'event': 'queue_rejected'})
+        AI_SECONDS.observe(time.perf_counter() - started_at, 'busy')
+        return QUEUE_BUSY_REPLY
     except Exception as e:
-        logger.error(f"❌ Gemini Error: {e}")
-        return "الجاذبية باظت والسيرفر مهنج! جرب كمان شوية يا بطل. 🍎"
+        logger.error("❌ AI Error (صورة): %s", e, extra={'event': 'ai_error'})
+        ERRORS.inc('ai')
+        AI_SECONDS.observe(time.perf_counter() - started_at, 'error')
+        return AI_ERROR_REPLY
+
+async def transcribe_audio(audio, filename: str, mime_type: str) -> str:
+    """Whisper على Groq لو مفعّل (أسرع وأرخص) و Gemini احتياطي"""
+    last_error = None
+    for provider in (groq_provider, gemini_provider):
+        if provider is None:
+            continue
+        try:
+            return await provider.transcribe(audio, filename, mime_type)
+        except Exception as e:
+            logger.warning("⚠️ %s فشل في تفريغ الريكورد: %s", provider.name, e,
+                           extra={'event': 'transcribe_error', 'provider': provider.name})
+            last_error = e
+            audio.seek(0)
+    raise last_error or ProviderError("مفيش مزود يفرغ الصوت")
 
 # ===================================
 # 5. دوال الأوامر
 # ===================================
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """أمر /start"""
-    user = update.effective_user
-    welcome_text = (
-        f"يا أهلاً.. يا أهلاً بزميلي الفيزيائي العبقري {user.first_name}! 🍎⚡\n\n"
-        "أنا *نيوتن*، وبقالي 300 سنة مستنيك عشان أقولك سر:\n"
-        "*الفيزياء متعة مش لود.. لو فهمتها صح!* 🧠✨\n\n"
-        "جاهز نحول 'طاقة الوضع' اللي في دماغك لـ 'طاقة حركة' جبارة؟ 👇"
-    )
-    keyboard = [
-        [
-            InlineKeyboardButton("📚 الكورسات المتاحة", callback_data='courses'),
-            InlineKeyboardButton("💰 الأسعار", callback_data='prices')
-        ],
-        [
-            InlineKeyboardButton("🌐 المنصة", url='https://faresanany.com'),
-            InlineKeyboardButton("📞 الدعم الفني", callback_data='support')
-        ],
-        [InlineKeyboardButton("ℹ️ عن المنصة", callback_data='about')]
-    ]
+    chat_registry.add(update.effective_chat.id)
+    page = static_content.command('start')
+    name = escape_markdown(update.effective_user.first_name or '', version=1)
     await update.message.reply_text(
-        welcome_text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode='Markdown'
+        page.text.format(name=name),
+        reply_markup=page.reply_markup,
+        parse_mode=page.parse_mode
     )
 
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """أمر /help"""
-    help_text = """
-🍎 *دليل نيوتن الهايبر*
-
-📋 *الأوامر المتاحة:*
-/start - الترحيب والقائمة الرئيسية
-/help - عرض هذه المساعدة
-/courses - عرض الكورسات
-/prices - عرض الأسعار
-/about - عن المنصة
-/contact - معلومات التواصل
-
-💬 *كيف تستخدمني:*
-ابعتلي أي سؤال في الفيزياء وأنا هرد بأسلوب نيوتن الهايبر!
-
-مثال:
-"اشرحلي قانون نيوتن الأول"
-"إيه الفرق بين السرعة والعجلة؟"
-
-شغل عالي يا زميلي.. ومتبقاش جهاز! 🍎⚡
-"""
-    await update.message.reply_text(help_text, parse_mode='Markdown')
-
-async def courses_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """أمر /courses"""
-    courses_text = """
-📚 *الكورسات المتاحة - الترم الثاني 2026*
-
-1️⃣ *كورس الترم كامل*
-💰 السعر: 300 جنيه
-✅ جميع دروس الترم + تدريبات + ملخصات
-🔗 https://faresanany.com/course/3
-
-2️⃣ *كورس الشهر الأول*
-💰 السعر: 145 جنيه
-✅ دروس الشهر الأول + تمارين
-🔗 https://faresanany.com/course/1
-
-✨ *مميزات الكورسات:*
-• شرح مبسط بأسلوب نيوتن الهايبر 🍎
-• تجارب تفاعلية وأنيميشن 🎬
-• تدريبات مكثفة ومتنوعة 📝
-• ملخصات PDF جاهزة 📄
-
-شغل عالي يا زميلي.. ومتبقاش جهاز! 🍎⚡
-"""
-    keyboard = [
-        [InlineKeyboardButton("🌐 زيارة المنصة", url='https://faresanany.com')],
-        [InlineKeyboardButton("📝 التسجيل الآن", url='https://faresanany.com/register')]
-    ]
-    await update.message.reply_text(
-        courses_text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode='Markdown'
-    )
-
-async def prices_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """أمر /prices"""
-    prices_text = """
-💰 *أسعار الكورسات*
-
-📦 *كورس الترم كامل:* 300 جنيه
-📦 *كورس الشهر الأول:* 145 جنيه
-
-✨ *القيمة المضافة:*
-✅ +120 درس متاح
-✅ متابعة مستمرة
-✅ شرح تفاعلي بأسلوب نيوتن 🍎
-✅ ملخصات وملازم جاهزة
-✅ دعم فني على مدار اليوم
-
-💡 *استثمار في طاقة الحركة بتاعتك!*
-
-شغل عالي يا زميلي.. ومتبقاش جهاز! 🍎⚡
-"""
-    keyboard = [
-        [InlineKeyboardButton("📝 سجل الآن", url='https://faresanany.com/register')],
-        [InlineKeyboardButton("📞 استفسر واتساب", url='https://wa.me/201025825268')]
-    ]
-    await update.message.reply_text(
-        prices_text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode='Markdown'
-    )
-
-async def about_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """أمر /about"""
-    about_text = """
-🌟 *عن منصة "متبقاش جهاز في الفيزياء"*
-
-👨‍🏫 *المدرس:* مستر فارس العناني
-📊 *عدد الطلاب:* +120,000 طالب
-📚 *عدد الدروس:* +120 درس متاح
-🎯 *التخصص:* الفيزياء - الصف الثاني الثانوي
-
-🍎 *رسالتنا:*
-"افهم الفيزياء.. ومتبقاش جهاز!"
-
-✨ *مميزاتنا:*
-• شرح مبسط بدون تعقيد
-• تجارب تفاعلية ورسومات متحركة
-• متابعة دورية مستمرة
-• ملخصات PDF جاهزة
-
-شغل عالي يا زميلي.. ومتبقاش جهاز! 🍎⚡
-"""
-    keyboard = [
-        [InlineKeyboardButton("🌐 زيارة المنصة", url='https://faresanany.com')],
-        [InlineKeyboardButton("📱 فيسبوك", url='https://www.facebook.com/share/1D9WyAjrrG/')],
-        [InlineKeyboardButton("🎥 يوتيوب", url='https://youtube.com/@fareselanaany')]
-    ]
-    await update.message.reply_text(
-        about_text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode='Markdown'
-    )
-
-async def contact_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """أمر /contact"""
-    contact_text = """
-📞 *معلومات التواصل*
-
-📱 واتساب: +201025825268
-✈️ تيليجرام: @Fox9_99
-📘 فيسبوك: https://www.facebook.com/share/1D9WyAjrrG/
-🎥 يوتيوب: https://youtube.com/@fareselanaany
-🎵 تيكتوك: https://www.tiktok.com/@fares_elenany
-🌐 الموقع: https://faresanany.com
-
-⏰ *أوقات الدعم:* كل يوم 9 صباحاً - 11 مساءً
-
-شغل عالي يا زميلي.. ومتبقاش جهاز! 🍎⚡
-"""
-    keyboard = [
-        [InlineKeyboardButton("📱 واتساب", url='https://wa.me/201025825268')],
-        [InlineKeyboardButton("✈️ تيليجرام", url='https://t.me/Fox9_99')]
-    ]
-    await update.message.reply_text(
-        contact_text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode='Markdown'
-    )
+def static_command(key: str):
+    """handler لأمر رده ثابت (/help /courses /prices /about /contact) - الصفحة جاهزة من البداية"""
+    async def command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        page = static_content.command(key)
+        await update.message.reply_text(
+            page.text,
+            reply_markup=page.reply_markup,
+            parse_mode=page.parse_mode
+        )
+    command.__doc__ = f"أمر /{key}"
+    return command
 
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """أمر /stats - للأدمن فقط"""
@@ -352,11 +904,122 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 ⏰ الوقت: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 🟢 الحالة: شغال وهايبر! 🍎
 🧠 Gemini: مفعّل ✅
-{'🚀 Groq: مفعّل ✅' if groq_client else '⚠️ Groq: مش مفعّل'}
-📁 Knowledge: {'محمّل ✅' if platform_knowledge else 'مش موجود ⚠️'}
+{'🚀 Groq: مفعّل ✅' if groq_provider else '⚠️ Groq: مش مفعّل'}
+📁 Knowledge: {f'محمّل ✅ ({len(knowledge_index)} جزء)' if platform_knowledge else 'مش موجود ⚠️'}
+
+{answer_bank.describe() if answer_bank is not None else '🏦 بنك الإجابات: مش متبني'}
+💾 *الكاش:* {len(answer_cache)} إجابة
+🎯 تطابق تام: {answer_cache.exact_hits} | شبه مطابق: {answer_cache.similar_hits}
+❌ Miss: {answer_cache.misses} | نسبة الـ Hit: {answer_cache.hit_rate:.0%}
+
+{provider_scheduler.describe()}
+{llm_queue.describe() if llm_queue is not None else '📥 طابور الـ LLM: مقفول'}
+{media_pipeline.describe()}
+{token_ledger.describe()}
+
+🚦 Throttle: طلاب {user_limiter.rejected if user_limiter is not None else 'من غير حد'} | شاتات {chat_limiter.rejected if chat_limiter is not None else 'من غير حد'}
+🔗 رسايل اتدمجت: {message_coalescer.coalesced}
+👥 شاتات مسجلة للإذاعة: {len(chat_registry):,}
+🧭 التوجيه ({'موديل' if message_router else 'heuristic'}): جاهز {ROUTES.total(STATIC):.0f} | سريع {ROUTES.total(FAST):.0f} | قوي {ROUTES.total(STRONG):.0f}
+
+⏱️ *الأداء:*
+📩 الرسالة: {format_latency(MESSAGE_SECONDS)}
+🤖 الـ AI: {format_latency(AI_SECONDS, 'provider')}
+📷 الصور: {format_latency(AI_SECONDS, 'image')}
+📨 تيليجرام: {format_latency(TELEGRAM_SECONDS)} | أخطاء {TELEGRAM_ERRORS.total():.0f}
+🔁 Fallback: {FALLBACKS.total():.0f} | ❌ أخطاء: {ERRORS.total():.0f}
+🔢 Tokens: {' | '.join(f'{p.name} {p.prompt_tokens:,}+{p.completion_tokens:,}' for p in (gemini_provider, groq_provider) if p)}
 """
     await update.message.reply_text(stats_text, parse_mode='Markdown')
 
+BROADCAST_USAGE = (
+    "📣 الإذاعة لكل الطلاب:\n"
+    "/broadcast نص الرسالة - يبدأ إذاعة جديدة\n"
+    "/broadcast - حالة آخر إذاعة\n"
+    "/broadcast_stop - يوقف الإذاعة الشغالة"
+)
+
+async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """أمر /broadcast - للأدمن فقط"""
+    if update.effective_user.id != ADMIN_USER_ID:
+        await update.message.reply_text("⛔ الأمر ده للمسؤول بس!")
+        return
+    # النص بعد الأمر زي ما هو (بالسطور الجديدة)
+    parts = update.message.text.split(maxsplit=1)
+    if len(parts) < 2:
+        await update.message.reply_text(f"{broadcaster.describe()}\n\n{BROADCAST_USAGE}")
+        return
+    if broadcaster.running:
+        await update.message.reply_text(f"⚠️ في إذاعة شغالة بالفعل\n\n{broadcaster.describe()}")
+        return
+    text = parts[1].strip()
+    if len(text) > 4096:
+        await update.message.reply_text("⚠️ الرسالة أطول من 4096 حرف")
+        return
+    status = await update.message.reply_text(f"📣 بنبدأ الإذاعة لـ {len(chat_registry):,} شات...")
+    background_tasks.append(broadcaster.start(text, update.effective_chat.id, status.message_id))
+    logger.info(f"📣 إذاعة جديدة من الأدمن ({len(text)} حرف)")
+
+async def broadcast_stop_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """أمر /broadcast_stop - للأدمن فقط"""
+    if update.effective_user.id != ADMIN_USER_ID:
+        await update.message.reply_text("⛔ الأمر ده للمسؤول بس!")
+        return
+    if await broadcaster.cancel():
+        await update.message.reply_text(broadcaster.describe())
+    else:
+        await update.message.reply_text("ℹ️ مفيش إذاعة شغالة")
+
+BANK_USAGE = (
+    "🏦 بنك الإجابات:\n"
+    "/bank - الحالة\n"
+    "/bank refresh - يولد الأسئلة الجديدة واللي الجزء بتاعها في ملف المعرفة اتغير\n"
+    "/bank refresh all - يولد كل الإجابات من الأول"
+)
+
+async def bank_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """أمر /bank - للأدمن فقط"""
+    global answer_bank
+    if update.effective_user.id != ADMIN_USER_ID:
+        await update.message.reply_text("⛔ الأمر ده للمسؤول بس!")
+        return
+    args = context.args or []
+    if not args or args[0] != 'refresh':
+        status = answer_bank.describe() if answer_bank is not None else "🏦 بنك الإجابات: مش متبني"
+        await update.message.reply_text(f"{status}\n\n{BANK_USAGE}")
+        return
+    try:
+        syllabus = load_syllabus(SYLLABUS_PATH)
+    except (OSError, ValueError) as e:
+        await update.message.reply_text(f"⚠️ مش قادر أقرا {SYLLABUS_PATH}: {e}")
+        return
+    if answer_bank is None:
+        answer_bank = AnswerBank(ANSWER_BANK_PATH, ANSWER_BANK_THRESHOLD)
+    await update.message.reply_text(f"🏦 بنحدّث البنك ({len(syllabus)} سؤال)...")
+
+    async def refresh():
+        started_at = time.perf_counter()
+        stats = await answer_bank.refresh(
+            syllabus, build_system_prompt, generate_bank_answer,
+            force=args[1:] == ['all'], forbidden=(AI_ERROR_REPLY,),
+        )
+        await update.message.reply_text(
+            f"✅ البنك اتحدث في {time.perf_counter() - started_at:.0f}s\n"
+            f"اتولد {stats['generated']} | مرفوض {stats['rejected']} | فشل {stats['failed']} "
+            f"| زي ما هو {stats['unchanged']} | اتمسح {stats['removed']}\n{answer_bank.describe()}"
+        )
+
+    background_tasks.append(asyncio.create_task(refresh()))
+
+async def budget_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """أمر /budget [أيام] - تقرير الـ tokens والتكلفة - للأدمن فقط"""
+    if update.effective_user.id != ADMIN_USER_ID:
+        await update.message.reply_text("⛔ الأمر ده للمسؤول بس!")
+        return
+    args = context.args or []
+    days = int(args[0]) if args and args[0].isdigit() else 7
+    await update.message.reply_text(token_ledger.report(max(1, min(days, 90))))
+
 # ===================================
 # 6. معالجة الأزرار
 # ===================================
@@ -365,141 +1028,277 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
-    back_button = [[InlineKeyboardButton("🔙 الرجوع للقائمة", callback_data='back_home')]]
-
-    if query.data == 'courses':
-        text = """
-📚 *الكورسات المتاحة - الترم الثاني 2026*
-
-1️⃣ *كورس الترم كامل*
-💰 300 جنيه - جميع دروس الترم \+ تدريبات \+ ملخصات
-
-2️⃣ *كورس الشهر الأول*
-💰 145 جنيه - دروس الشهر الأول \+ تمارين
-
-✨ شرح تفاعلي - أنيميشن - ملخصات PDF جاهزة
-
-شغل عالي يا زميلي.. ومتبقاش جهاز! 🍎⚡
-"""
-        keyboard = [
-            [InlineKeyboardButton("🌐 زيارة المنصة", url='https://faresanany.com')],
-            [InlineKeyboardButton("📝 التسجيل الآن", url='https://faresanany.com/register')],
-        ] + back_button
-        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
-
-    elif query.data == 'prices':
-        text = """
-💰 *أسعار الكورسات*
-
-📦 *كورس الترم كامل:* 300 جنيه
-📦 *كورس الشهر الأول:* 145 جنيه
-
-✅ +120 درس - متابعة مستمرة - دعم فني
-
-💡 استثمار في طاقة الحركة بتاعتك!
-شغل عالي يا زميلي.. ومتبقاش جهاز! 🍎⚡
-"""
-        keyboard = [
-            [InlineKeyboardButton("📝 سجل الآن", url='https://faresanany.com/register')],
-            [InlineKeyboardButton("📞 استفسر واتساب", url='https://wa.me/201025825268')],
-        ] + back_button
-        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
-
-    elif query.data == 'about':
-        text = """
-🌟 *عن منصة "متبقاش جهاز في الفيزياء"*
-
-👨‍🏫 *المدرس:* مستر فارس العناني
-📊 +120,000 طالب \| +120 درس متاح
-🎯 الفيزياء - الصف الثاني الثانوي
-
-🍎 *"افهم الفيزياء.. ومتبقاش جهاز!"*
+    page = static_content.callback(query.data)
+    if page is None:
+        logger.warning(f"⚠️ زرار مش معروف: {query.data}")
+        return
+    await query.edit_message_text(
+        page.text,
+        reply_markup=page.reply_markup,
+        parse_mode=page.parse_mode
+    )
 
-شغل عالي يا زميلي.. ومتبقاش جهاز! 🍎⚡
-"""
-        keyboard = [
-            [InlineKeyboardButton("🌐 زيارة المنصة", url='https://faresanany.com')],
-            [InlineKeyboardButton("📱 فيسبوك", url='https://www.facebook.com/share/1D9WyAjrrG/')],
-            [InlineKeyboardButton("🎥 يوتيوب", url='https://youtube.com/@fareselanaany')],
-        ] + back_button
-        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+# ===================================
+# 7. معالجة الرسائل النصية
+# ===================================
+THROTTLED_REPLY = (
+    "براحة يا وحش! 🍎 إنت أسرع من الضوء النهارده ⚡\n"
+    "استنى دقيقة وابعت سؤالك تاني.. القصور الذاتي بيقول خد نفسك! 😄"
+)
 
-    elif query.data == 'support':
-        text = """
-📞 *الدعم الفني - إحنا معاك!*
+async def reply_with_ai(update: Update, user_message: str, started_at: float, simple: bool | None = None):
+    """رد الـ AI على الرسالة (مع آخر رسائل المحادثة)"""
+    decision = route_message(user_message, simple)
+    logger.info("🧭 route: %s (%s %.0f%%)", decision.route, decision.source, decision.confidence * 100,
+                extra={'event': 'route', 'route': decision.route, 'source': decision.source, 'sampled': True})
+    if decision.route == STATIC:
+        page = static_page_for(user_message)
+        if page is not None:
+            await update.message.reply_text(page.text, reply_markup=page.reply_markup, parse_mode=page.parse_mode)
+            return
+        decision = decision._replace(route=FAST)
+
+    chat_id = update.effective_chat.id
+    history = conversation_memory.history(chat_id)
+    # سؤال من المنهج ليه إجابة جاهزة؟ (ملي ثواني ومن غير LLM - بس لو مش سؤال متابعة)
+    if answer_bank is not None and not history:
+        banked = answer_bank.lookup(user_message)
+        if banked is not None:
+            logger.info("🏦 رد من بنك الإجابات", extra={'event': 'bank_hit', 'sampled': True})
+            AI_SECONDS.observe(time.perf_counter() - started_at, 'bank')
+            await update.message.reply_text(banked)
+            conversation_memory.append(chat_id, user_message, banked)
+            return
 
-📱 واتساب: +201025825268
-✈️ تيليجرام: @Fox9_99
+    user_id = update.effective_user.id
+    job = Job(chat_id, update.message.message_id, user_id, user_message,
+              queue_priority(user_id, user_message, history))
+    if STREAMING_REPLIES:
+        reply = StreamingReply(update.message, started_at, min_interval=STREAM_EDIT_INTERVAL)
+        response = ""
+        async for response in stream_ai_response(user_message, history, decision, job):
+            await reply.update(response)
+        await reply.finish(response)
+    else:
+        response = await get_ai_response(user_message, history, decision, job)
+        await update.message.reply_text(response)
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        logger.info("⏱️ الرد ظهر بعد %.0f ms", elapsed_ms,
+                    extra={'event': 'replied', 'elapsed_ms': round(elapsed_ms), 'sampled': True})
 
-⏰ كل يوم 9 صباحاً - 11 مساءً
+    if is_real_answer(response):
+        conversation_memory.append(chat_id, user_message, response)
 
-شغل عالي يا زميلي.. ومتبقاش جهاز! 🍎⚡
-"""
-        keyboard = [
-            [InlineKeyboardButton("📱 واتساب", url='https://wa.me/201025825268')],
-            [InlineKeyboardButton("✈️ تيليجرام", url='https://t.me/Fox9_99')],
-        ] + back_button
-        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
-
-    elif query.data == 'back_home':
-        text = """
-🍎 *القائمة الرئيسية*
-
-أنا *نيوتن* - مساعدك الهايبر في منصة "متبقاش جهاز"!
-اختار من القائمة أو ابعتلي سؤالك مباشرة 👇
-"""
-        keyboard = [
-            [
-                InlineKeyboardButton("📚 الكورسات المتاحة", callback_data='courses'),
-                InlineKeyboardButton("💰 الأسعار", callback_data='prices')
-            ],
-            [
-                InlineKeyboardButton("🌐 المنصة", url='https://faresanany.com'),
-                InlineKeyboardButton("📞 الدعم الفني", callback_data='support')
-            ],
-            [InlineKeyboardButton("ℹ️ عن المنصة", callback_data='about')]
-        ]
-        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='Markdown')
+async def answer_recovered(bot, job: Job):
+    """سؤال اتقبل قبل الـ restart: نفس طريق الرد بس بـ send_message (الـ update الأصلي راح)"""
+    history = conversation_memory.history(job.chat_id)
+    try:
+        response = await get_ai_response(job.text, history, job=job)
+        # لو الطابور لسه زحمة لحد الـ deadline الطالب غالباً مش مستني - منبعتش حاجة
+        if response != QUEUE_BUSY_REPLY:
+            await bot.send_message(
+                job.chat_id, response,
+                reply_to_message_id=job.message_id, allow_sending_without_reply=True,
+            )
+            if is_real_answer(response):
+                conversation_memory.append(job.chat_id, job.text, response)
+    except TelegramError as e:
+        logger.warning(f"⚠️ مش قادر أرد على سؤال قديم في {job.chat_id}: {e}")
+    # الرد من الكاش مبيدخلش الطابور - فبنشيله من الديسك هنا
+    llm_queue.forget(job)
+
+async def throttled(update: Update) -> bool:
+    """الطالب أو الشات عدى الحد؟ (ورد "استنى شوية" مرة كل دقيقة بالكتير)"""
+    user = update.effective_user
+    if user_limiter is not None and cluster_link is not None and update.effective_chat.type != 'private':
+        # الطالب ممكن يكون في شاتات عند workers تانية
+        cluster_link.publish('user_message', user.id)
+    if ((user_limiter is None or user_limiter.allow(user.id))
+            and (chat_limiter is None or chat_limiter.allow(update.effective_chat.id))):
+        return False
+    logger.info("🚦 رسالة اتعملها throttle من %s", user.id,
+                extra={'event': 'throttled', 'user_id': user.id, 'sampled': True})
+    if throttle_notice_limiter.allow(user.id):
+        await update.message.reply_text(THROTTLED_REPLY)
+    return True
 
-# ===================================
-# 7. معالجة الرسائل النصية
-# ===================================
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """معالجة رسائل المستخدمين"""
+    started_at = time.perf_counter()
     user_message = update.message.text
     if not user_message:
         return
 
+    MESSAGES_IN_FLIGHT.inc()
+    outcome = 'error'
+    try:
+        outcome = await process_message(update, user_message, started_at)
+    finally:
+        MESSAGES_IN_FLIGHT.dec()
+        MESSAGE_SECONDS.observe(time.perf_counter() - started_at, outcome)
+
+async def process_message(update: Update, user_message: str, started_at: float) -> str:
+    """الرد على الرسالة - بيرجع نوع النتيجة للقياسات"""
     user = update.effective_user
-    logger.info(f"📩 رسالة من {user.first_name} ({user.id}): {user_message}")
+    logger.info("📩 رسالة من %s (%s)", user.first_name, user.id,
+                extra={'event': 'message', 'user_id': user.id, 'body': user_message, 'sampled': True})
+    chat_registry.add(update.effective_chat.id)
 
     await update.message.chat.send_action(action="typing")
 
     try:
-        # ✅ أولاً: نفحص Easter Eggs
-        easter_response = check_easter_egg(user_message)
+        # ✅ أولاً: نفحص Easter Eggs (ونفس الـ scan بيقول السؤال بسيط ولا لأ)
+        with SCAN_SECONDS.time():
+            easter_response, simple = scan_message(user_message)
         if easter_response:
-            logger.info(f"🥚 Easter Egg: {user_message}")
+            logger.info("🥚 Easter Egg", extra={'event': 'easter_egg', 'user_id': user.id, 'body': user_message})
             await update.message.reply_text(easter_response, parse_mode='Markdown')
-            return
-
-        # 🧠 ثانياً: نرسل للـ AI
-        response = await get_ai_response(user_message)
-        await update.message.reply_text(response)
+            return 'easter_egg'
+
+        # 🚦 ثانياً: طالب بيبعت كتير؟ رد جاهز من غير ما نلمس الـ LLM
+        if await throttled(update):
+            return 'throttled'
+
+        # 🧠 ثالثاً: نرسل للـ AI (الرسايل المتتالية من نفس الشات بتتدمج في طلب واحد)
+        chat_id = update.effective_chat.id
+        outcome = 'coalesced'
+        async for combined_message in message_coalescer.batches(chat_id, user_message):
+            await reply_with_ai(
+                update, combined_message, started_at,
+                simple if combined_message == user_message else None,
+            )
+            outcome = 'ai'
+        return outcome
 
     except Exception as e:
         logger.error(f"❌ خطأ في معالجة الرسالة: {e}")
+        ERRORS.inc('handle_message')
         await update.message.reply_text(
             "الجاذبية باظت والسيرفر مهنج! 🍎\n"
             "جرب كمان شوية أو كلمنا: https://wa.me/201025825268"
         )
+        return 'error'
 
 # ===================================
-# 8. معالجة الأخطاء
+# 8. الصور والريكوردات الصوتية
+# ===================================
+PHOTO_DEFAULT_QUESTION = "حل المسألة اللي في الصورة خطوة بخطوة واشرح القانون المستخدم"
+EMPTY_VOICE_REPLY = "مسمعتش أي كلام في الريكورد 🎙️ سجل تاني أو اكتبلي سؤالك يا بطل! 🍎"
+MEDIA_REJECTED_REPLIES = {
+    'too_large': (
+        "الملف ده تقيل أوي عليا 😅 حتى الجاذبية مش قادرة تشيله!\n"
+        f"ابعت صورة أصغر أو ريكورد أقل من {VOICE_MAX_SECONDS // 60} دقايق يا وحش ⚡"
+    ),
+    'busy': "في صور وريكوردات كتير بتتعالج دلوقتي 🍎 ابعتها تاني كمان دقيقة وهرد عليك على طول! ⚡",
+    'invalid': "مش قادر أفتح الصورة دي 🤔 صورها تاني وابعتها كصورة عادية يا دكتور! 📸",
+}
+
+async def transcribe_voice(update: Update) -> str:
+    """نص الريكورد (نفس الريكورد اتبعت قبل كده = نفس النص من غير تحميل)"""
+    audio = update.message.voice or update.message.audio
+    filename = getattr(audio, 'file_name', None) or 'voice.ogg'
+    mime_type = audio.mime_type or 'audio/ogg'
+
+    async def transcribe() -> str:
+        with accounted(update.effective_user.id, 'voice'):
+            return await media_pipeline.transcribe(
+                update.get_bot(), audio.file_id, audio.file_size, filename, mime_type, transcribe_audio, audio.duration,
+            )
+
+    return await media_pipeline.once(media_key('voice', audio.file_unique_id), transcribe, keep=bool)
+
+async def reply_to_photo(update: Update, started_at: float):
+    """رد Gemini على صورة المسألة (والكلام اللي معاها لو فيه)"""
+    message = update.message
+    chat_id = update.effective_chat.id
+    user_id = update.effective_user.id
+    caption = (message.caption or '').strip()
+    question = caption or PHOTO_DEFAULT_QUESTION
+    source = pick_photo(message.photo, IMAGE_MAX_SIDE) if message.photo else message.document
+    history = conversation_memory.history(chat_id)
+    # الصورة مش بتتحفظ: السؤال مبيرجعش بعد الـ restart
+    job = Job(chat_id, message.message_id, user_id, question,
+              queue_priority(user_id, question, history), durable=False)
+
+    async def answer() -> str:
+        image = await media_pipeline.image(update.get_bot(), source.file_id, source.file_size)
+        return await get_image_response(question, image, history, job)
+
+    if history:
+        # سؤال متابعة: الرد بيعتمد على المحادثة فمبيتشاركش
+        response = await answer()
+    else:
+        response = await media_pipeline.once(media_key('photo', source.file_unique_id, caption), answer,
+                                             keep=is_real_answer)
+    await message.reply_text(response)
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    logger.info("⏱️ الرد على الصورة ظهر بعد %.0f ms", elapsed_ms,
+                extra={'event': 'replied', 'elapsed_ms': round(elapsed_ms), 'sampled': True})
+    if is_real_answer(response):
+        conversation_memory.append(chat_id, f"📷 {question}", response)
+
+async def handle_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """معالجة الصور والريكوردات"""
+    started_at = time.perf_counter()
+    MESSAGES_IN_FLIGHT.inc()
+    outcome = 'error'
+    try:
+        outcome = await process_media(update, started_at)
+    finally:
+        MESSAGES_IN_FLIGHT.dec()
+        MESSAGE_SECONDS.observe(time.perf_counter() - started_at, outcome)
+
+async def process_media(update: Update, started_at: float) -> str:
+    """الرد على الصورة أو الريكورد - بيرجع نوع النتيجة للقياسات"""
+    message = update.message
+    user = update.effective_user
+    voice = message.voice or message.audio
+    kind = 'voice' if voice else 'photo'
+    logger.info("🖼️ %s من %s (%s)", kind, user.first_name, user.id,
+                extra={'event': 'media', 'kind': kind, 'user_id': user.id, 'sampled': True})
+    chat_registry.add(update.effective_chat.id)
+    if await throttled(update):
+        return 'throttled'
+    if not token_ledger.global_policy().allow_ai:
+        # ميزانية اليوم خلصت: منحملش الملف أصلاً
+        await message.reply_text(BUDGET_REPLY)
+        return 'budget'
+
+    await message.chat.send_action(action="typing")
+    try:
+        if voice:
+            transcript = await transcribe_voice(update)
+            if not transcript:
+                await message.reply_text(EMPTY_VOICE_REPLY)
+                return 'voice'
+            logger.info("🎙️ الريكورد اتفرغ (%s حرف)", len(transcript),
+                        extra={'event': 'transcribed', 'user_id': user.id, 'body': transcript, 'sampled': True})
+            # الكلام بقى نص: نفس طريق الرسايل (البنك، الكاش، الطابور، ذاكرة المحادثة)
+            await reply_with_ai(update, transcript, started_at)
+            return 'voice'
+        await reply_to_photo(update, started_at)
+        return 'photo'
+    except MediaRejected as e:
+        logger.info("🖼️ ملف اترفض (%s): %s", e.reason, e,
+                    extra={'event': 'media_rejected', 'reason': e.reason, 'user_id': user.id})
+        await message.reply_text(MEDIA_REJECTED_REPLIES.get(e.reason, MEDIA_REJECTED_REPLIES['invalid']))
+        return 'media_rejected'
+    except Exception as e:
+        logger.error(f"❌ خطأ في معالجة الملف: {e}")
+        ERRORS.inc('handle_media')
+        await message.reply_text(
+            "الجاذبية باظت والسيرفر مهنج! 🍎\n"
+            "جرب كمان شوية أو كلمنا: https://wa.me/201025825268"
+        )
+        return 'error'
+
+# ===================================
+# 9. معالجة الأخطاء
 # ===================================
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """معالجة الأخطاء العامة"""
     logger.error(f"❌ خطأ عام: {context.error}")
+    ERRORS.inc('handler')
     if update and update.effective_message:
         await update.effective_message.reply_text(
             "حصل خطأ غير متوقع! 😔\n"
@@ -508,22 +1307,105 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
 # ===================================
-# 9. البرنامج الرئيسي
+# 10. البرنامج الرئيسي
 # ===================================
-def main():
-    """تشغيل البوت على Railway"""
-    logger.info("🚀 نيوتن الهايبر انطلق على Railway! 🍎⚡")
-
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+# مهام الخلفية (بتتلغي في post_stop)
+background_tasks: list[asyncio.Task] = []
+metrics_runner = None
+
+async def post_init(application: Application):
+    """فتح الملفات ومهام الخلفية بعد ما البوت يشتغل"""
+    global answer_bank, broadcaster, metrics_runner
+    if METRICS_PORT:
+        # كل worker على port لوحده (9090، 9091، ...)
+        port = METRICS_PORT + CLUSTER_WORKER_INDEX
+        try:
+            metrics_runner = await start_metrics_server(metrics_registry, METRICS_LISTEN, port)
+        except OSError as e:
+            logger.warning(f"⚠️ مش قادر أشغل /metrics على {port}: {e}")
+    answer_cache.load()
+    conversation_memory.open()
+    if os.path.exists(ANSWER_BANK_PATH):
+        answer_bank = AnswerBank(ANSWER_BANK_PATH, ANSWER_BANK_THRESHOLD)
+    chat_registry.open()
+    broadcaster = Broadcaster(
+        application.bot,
+        chat_registry,
+        rate=BROADCAST_RATE,
+        workers=BROADCAST_WORKERS,
+    )
+    # إذاعة اتقطعت بسبب restart بتكمل من آخر دفعة اتحفظت
+    # (في الـ cluster: عند الـ worker بتاع شات الأدمن بس - عشان /broadcast_stop يوصله)
+    if CLUSTER_ROLE != 'worker' or ADMIN_USER_ID % CLUSTER_WORKERS == CLUSTER_WORKER_INDEX:
+        resumed = broadcaster.resume()
+        if resumed:
+            background_tasks.append(resumed)
+    background_tasks.append(asyncio.create_task(chat_registry.run_flusher()))
+    token_ledger.open()
+    background_tasks.append(asyncio.create_task(token_ledger.run_flusher()))
+    if CONVERSATION_DB_PATH:
+        background_tasks.append(asyncio.create_task(conversation_memory.run_flusher()))
+    if llm_queue is not None and LLM_QUEUE_DB_PATH:
+        llm_queue.open()
+        background_tasks.append(asyncio.create_task(llm_queue.run_flusher()))
+        # أسئلة اتقبلت قبل الـ restart (لو اتلغت تاني وقت الإيقاف بتفضل على الديسك للمرة الجاية)
+        for job in llm_queue.recover():
+            background_tasks.append(asyncio.create_task(answer_recovered(application.bot, job)))
+    if PROVIDER_WARMUP:
+        for provider in (gemini_provider, groq_provider):
+            if provider is not None:
+                background_tasks.append(asyncio.create_task(provider.warm_up()))
+
+async def post_stop(application: Application):
+    """إيقاف مهام الخلفية"""
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+
+async def post_shutdown(application: Application):
+    """حفظ الكاش والمحادثات وقفل الملفات قبل ما البوت يقفل"""
+    global answer_bank
+    answer_cache.save()
+    conversation_memory.close()
+    if llm_queue is not None:
+        llm_queue.close()
+    if answer_bank is not None:
+        answer_bank.close()
+        answer_bank = None
+    await media_pipeline.close()
+    token_ledger.close()
+    chat_registry.close()
+
+def build_application() -> Application:
+    """الـ Application بكل الـ handlers (main بيشغله، والـ benchmarks بتغذيه updates مباشرة)"""
+    builder = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .concurrent_updates(CONCURRENT_UPDATES)
+        # كل طلب لـ Bot API بيتقاس (sendMessage, editMessageText, ...)
+        .request(InstrumentedRequest(TELEGRAM_SECONDS, TELEGRAM_ERRORS, connection_pool_size=256))
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+    )
+    if TELEGRAM_BASE_URL:
+        builder = builder.base_url(TELEGRAM_BASE_URL)
+    if TELEGRAM_BASE_FILE_URL:
+        builder = builder.base_file_url(TELEGRAM_BASE_FILE_URL)
+    application = builder.build()
 
     # أوامر
     application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("courses", courses_command))
-    application.add_handler(CommandHandler("prices", prices_command))
-    application.add_handler(CommandHandler("about", about_command))
-    application.add_handler(CommandHandler("contact", contact_command))
+    for key in ("help", "courses", "prices", "about", "contact"):
+        application.add_handler(CommandHandler(key, static_command(key)))
     application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(CommandHandler("broadcast", broadcast_command))
+    application.add_handler(CommandHandler("broadcast_stop", broadcast_stop_command))
+    application.add_handler(CommandHandler("bank", bank_command))
+    application.add_handler(CommandHandler("budget", budget_command))
 
     # أزرار
     application.add_handler(CallbackQueryHandler(button_callback))
@@ -531,11 +1413,52 @@ def main():
     # رسائل نصية
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
 
+    # صور المسائل (كصورة أو كملف) والريكوردات الصوتية
+    application.add_handler(MessageHandler(
+        filters.PHOTO | filters.Document.IMAGE | filters.VOICE | filters.AUDIO, handle_media
+    ))
+
     # أخطاء
     application.add_error_handler(error_handler)
+    return application
+
+def build_cluster_ingress() -> Application:
+    """الـ Application بتاع الـ ingress: بيستلم الـ updates ويوزعها على الـ workers بس"""
+    builder = Application.builder().token(TELEGRAM_TOKEN)
+    if TELEGRAM_BASE_URL:
+        builder = builder.base_url(TELEGRAM_BASE_URL)
+    return build_ingress_application(
+        builder,
+        Ingress(CLUSTER_SOCKET, CLUSTER_WORKERS),
+        WorkerPool(CLUSTER_WORKERS, CLUSTER_SOCKET),
+    )
+
+def main():
+    """تشغيل البوت على Railway"""
+    global log_pipeline
+    # اللوجات من thread تاني (LOG_ASYNC) - هنا مش وقت الـ import، والـ atexit بيوقفه
+    log_pipeline = setup_logging(use_queue=LOG_ASYNC, **LOG_SETTINGS)
+    validate_config()
+    if CLUSTER_ROLE == 'worker':
+        asyncio.run(run_worker(build_application(), cluster_link))
+        return
+
+    logger.info("🚀 نيوتن الهايبر انطلق على Railway! 🍎⚡")
+    application = build_cluster_ingress() if CLUSTER_ROLE == 'ingress' else build_application()
 
     logger.info("✅ البوت شغال.. ومتبقاش جهاز! 🍎")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if WEBHOOK_URL:
+        asyncio.run(run_webhook(
+            application,
+            webhook_url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=ALLOWED_UPDATES,
+            url_path=WEBHOOK_PATH,
+            listen=WEBHOOK_LISTEN,
+            port=PORT,
+        ))
+    else:
+        application.run_polling(allowed_updates=ALLOWED_UPDATES)
 
 if __name__ == '__main__':
     main()
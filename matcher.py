@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔎 مطابقة كلمات كتير في pass واحد (Aho-Corasick)
+بدل ما نلف على كل كلمة ونعمل substring search، بنبني automaton مرة واحدة
+والبحث بياخد وقت على قد طول الرسالة مش على قد عدد الكلمات
+"""
+
+from collections import deque
+
+from arabic_text import normalize_arabic
+
+
+class KeywordMatcher:
+    """Aho-Corasick على النص بعد التوحيد - كل كلمة ليها payload"""
+
+    def __init__(self, patterns: dict[str, object] | None = None):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[tuple] = [()]
+        self._built = False
+        for pattern, payload in (patterns or {}).items():
+            self.add(pattern, payload)
+
+    def __len__(self) -> int:
+        return sum(1 for output in self._output if output)
+
+    def add(self, pattern: str, payload):
+        """إضافة كلمة (بتتوحد الأول: تفاحة وتفاحه بقوا نفس الكلمة)"""
+        pattern = normalize_arabic(pattern)
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        if payload not in self._output[state]:
+            self._output[state] += (payload,)
+        self._built = False
+
+    def build(self):
+        """حساب الـ failure links بـ BFS ودمج الـ outputs"""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                inherited = self._output[self._fail[child]]
+                if inherited:
+                    self._output[child] += tuple(p for p in inherited if p not in self._output[child])
+        self._built = True
+
+    def search(self, normalized_text: str) -> list:
+        """كل الـ payloads اللي كلماتها موجودة في النص (بترتيب ظهورها)"""
+        if not self._built:
+            self.build()
+        goto, fail, output = self._goto, self._fail, self._output
+        found = []
+        state = 0
+        for char in normalized_text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                for payload in output[state]:
+                    if payload not in found:
+                        found.append(payload)
+        return found
+
+    def find(self, text: str) -> list:
+        """نفس search بس بيوحد النص الأول"""
+        return self.search(normalize_arabic(text))
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🖼️ صور المسائل والريكوردات الصوتية (قبل ما توصل للـ AI)
+- التحميل من تيليجرام بـ httpx client واحد (connection pool) وعلى أجزاء في ملف مؤقت:
+  بيفضل في الرام لحد spool_bytes وبعدها بيتنقل للديسك - والملف اللي بيعدي max_bytes بيتقطع
+- الصور بتتصغر (أقصى ضلع image_max_side) وتتضغط JPEG في thread pool خاص قبل ما تتبعت لـ Gemini
+- كل ده جوه عدد workers ثابت وطابور محدود: الملفات الكبيرة متخلصش الرام ولا تاخد الـ threads
+  بتاعة باقي البوت، والرسايل النصية مبتعديش على الطابور ده خالص
+- نفس الملف (file_unique_id) اتبعت تاني؟ النتيجة اللي اتحسبت (أو بتتحسب دلوقتي) بترجع على طول
+"""
+
+import asyncio
+import contextlib
+import io
+import logging
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from arabic_text import normalize_arabic
+from dispatch import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# أكبر صورة بنفكها (عرض × طول) - حماية من الصور المتعمولة عشان تفرقع الرام
+MAX_IMAGE_PIXELS = 50_000_000
+# أسماء الرفض في /stats (الـ reason فيه "_" وده بيبوظ الـ Markdown بتاع تيليجرام)
+REJECTED_LABELS = {'too_large': 'كبير', 'busy': 'زحمة', 'invalid': 'مش صورة'}
+
+
+class MediaRejected(Exception):
+    """الملف مش هيتعالج - reason للقياسات"""
+
+    reason = 'rejected'
+
+
+class MediaTooLarge(MediaRejected):
+    """الملف (أو الريكورد) أكبر من الحد"""
+
+    reason = 'too_large'
+
+
+class MediaBusy(MediaRejected):
+    """طابور الملفات مليان"""
+
+    reason = 'busy'
+
+
+class MediaInvalid(MediaRejected):
+    """الملف مش صورة نقدر نقراها"""
+
+    reason = 'invalid'
+
+
+def media_key(kind: str, file_unique_id: str, text: str = '') -> str:
+    """مفتاح النتيجة: نفس الملف + نفس الكلام اللي معاه (file_unique_id ثابت لنفس الملف عند كل البوتات)"""
+    return f"{kind}:{file_unique_id}:{normalize_arabic(text)}"
+
+
+def pick_photo(sizes: list, max_side: int):
+    """أصغر مقاس عامله تيليجرام يكفي max_side (بدل ما نحمل الأصل ونصغره إحنا)"""
+    ordered = sorted(sizes, key=lambda size: size.width * size.height)
+    for size in ordered:
+        if max(size.width, size.height) >= max_side:
+            return size
+    return ordered[-1]
+
+
+def compress_image(source, max_side: int, quality: int) -> tuple[str, bytes]:
+    """(mime_type, JPEG بأقصى ضلع max_side) - بتتنادى في thread (فك وضغط الصورة CPU)"""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        # من غير Pillow: الصورة بتروح زي ما هي (تيليجرام بيعمل الـ photo JPEG أصلاً)
+        return 'image/jpeg', source.read()
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    try:
+        with Image.open(source) as image:
+            # JPEG: بيتفك من الأول بمقاس 1/2 أو 1/4 أو 1/8 - أسرع وبرام أقل بكتير من فك الأصل
+            image.draft('RGB', (max_side, max_side))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_side, max_side))
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            output = io.BytesIO()
+            image.save(output, 'JPEG', quality=quality, optimize=True)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise MediaInvalid(f"صورة مش مقروءة: {e}") from e
+    return 'image/jpeg', output.getvalue()
+
+
+class MediaPipeline:
+    """الاستخدام:
+        image = await media.image(bot, file_id, file_size)  # (mime_type, bytes) زي media بتاع generate
+        text = await media.transcribe(bot, file_id, file_size, 'voice.ogg', 'audio/ogg', provider.transcribe)
+        answer = await media.once(media_key('photo', file_unique_id, caption), compute)
+    image و transcribe بيرموا MediaRejected (والـ workers كلهم مشغولين = بيستنوا دورهم)
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_pending: int = 32,
+        max_bytes: int = 20 * 1024 * 1024,
+        spool_bytes: int = 1024 * 1024,
+        image_max_side: int = 1280,
+        jpeg_quality: int = 80,
+        max_voice_seconds: int = 180,
+        cache_size: int = 1000,
+        timeout: float = 30.0,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_bytes = max_bytes
+        self.spool_bytes = spool_bytes
+        self.image_max_side = image_max_side
+        self.jpeg_quality = jpeg_quality
+        self.max_voice_seconds = max_voice_seconds
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(workers)
+        self._executor: ThreadPoolExecutor | None = None
+        self._client = None
+        # file key -> النتيجة (LRU) | النتايج اللي بتتحسب دلوقتي
+        self._results: OrderedDict[str, str] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.pending = 0
+        self.active = 0
+        self.downloads = 0
+        self.bytes_downloaded = 0
+        self.bytes_sent = 0
+        self.dedup_hits = 0
+        self.rejected = {'too_large': 0, 'busy': 0, 'invalid': 0}
+        self.latency = LatencyHistogram()
+        # callback(key, result) لكل نتيجة جديدة اتحسبت هنا (نشرها لباقي الـ workers في الـ cluster)
+        self.on_remember = None
+
+    @property
+    def client(self):
+        """httpx client واحد لكل التحميلات (الاتصالات بتترجع للـ pool)"""
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.workers, max_keepalive_connections=self.workers),
+            )
+        return self._client
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # threads خاصة بالصور: الـ default executor بتاع الـ loop بيفضل فاضي للـ SDKs والـ DNS
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='media')
+        return self._executor
+
+    def _reject(self, error: MediaRejected):
+        self.rejected[error.reason] += 1
+        raise error
+
+    @contextlib.asynccontextmanager
+    async def _slot(self):
+        """دور في الـ workers (الطابور محدود بـ max_pending - الزيادة بترجع MediaBusy على طول)"""
+        if self.pending >= self.max_pending:
+            self._reject(MediaBusy(f"{self.pending} ملف مستنيين"))
+        self.pending += 1
+        try:
+            async with self._slots:
+                self.active += 1
+                started_at = time.monotonic()
+                try:
+                    yield
+                finally:
+                    self.active -= 1
+                    self.latency.observe(time.monotonic() - started_at)
+        finally:
+            self.pending -= 1
+
+    def _check_size(self, file_size: int | None):
+        # الحجم اللي في الرسالة: الملف الكبير بيترفض من غير ما ياخد دور ولا يتحمل
+        if file_size and file_size > self.max_bytes:
+            self._reject(MediaTooLarge(f"{file_size:,} bytes"))
+
+    async def _download(self, bot, file_id: str):
+        """الملف في SpooledTemporaryFile جاهز للقراية من الأول (اللي بينادي بيقفله)"""
+        telegram_file = await bot.get_file(file_id)
+        if telegram_file.file_size and telegram_file.file_size > self.max_bytes:
+            self._reject(MediaTooLarge(f"{telegram_file.file_size:,} bytes"))
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+        size = 0
+        try:
+            async with self.client.stream('GET', telegram_file.file_path) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        self._reject(MediaTooLarge(f"أكتر من {self.max_bytes:,} bytes"))
+                    spool.write(chunk)
+            spool.seek(0)
+        except BaseException:
+            spool.close()
+            raise
+        self.downloads += 1
+        self.bytes_downloaded += size
+        return spool
+
+    async def image(self, bot, file_id: str, file_size: int | None = None) -> tuple[str, bytes]:
+        """(mime_type, الصورة مصغرة ومضغوطة)"""
+        self._check_size(file_size)
+        async with self._slot():
+            spool = await self._download(bot, file_id)
+            try:
+                mime_type, data = await asyncio.get_running_loop().run_in_executor(
+                    self._pool(), compress_image, spool, self.image_max_side, self.jpeg_quality,
+                )
+            except MediaInvalid as e:
+                self._reject(e)
+            finally:
+                spool.close()
+        self.bytes_sent += len(data)
+        return mime_type, data
+
+    async def transcribe(self, bot, file_id: str, file_size: int | None, filename: str, mime_type: str,
+                         transcriber, duration: int | None = None) -> str:
+        """نص الريكورد - transcriber(file, filename, mime_type) زي AIProvider.transcribe"""
+        if duration and duration > self.max_voice_seconds:
+            self._reject(MediaTooLarge(f"ريكورد {duration} ثانية"))
+        self._check_size(file_size)
+        async with self._slot():
+            spool = await self._download(bot, file_id)
+            try:
+                return await transcriber(spool, filename, mime_type)
+            finally:
+                spool.close()
+
+    # ---------- نفس الملف مرتين ----------
+    async def once(self, key: str, compute, keep=None) -> str:
+        """نتيجة الملف ده لو اتحسبت قبل كده (أو بتتحسب دلوقتي لطالب تاني) - وإلا await compute()
+
+        keep(result): هل النتيجة تتحفظ (رد خطأ مثلاً مبيتحفظش) - الافتراضي كله
+        """
+        if key in self._results:
+            self._results.move_to_end(key)
+            self.dedup_hits += 1
+            return self._results[key]
+        task = self._inflight.get(key)
+        if task is not None:
+            self.dedup_hits += 1
+        else:
+            task = self._inflight[key] = asyncio.create_task(compute())
+            task.add_done_callback(lambda done: self._finish(key, done, keep))
+        # shield: طالب لغى (أو البوت بيقفل) ميلغيش النتيجة على الباقيين
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task, keep):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        if keep is None or keep(result):
+            self.remember(key, result)
+            if self.on_remember is not None:
+                self.on_remember(key, result)
+
+    def remember(self, key: str, result: str):
+        """حفظ النتيجة (بيتنادى كمان من الـ workers التانيين في الـ cluster)"""
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # ---------- /stats ----------
+    def describe(self) -> str:
+        p50 = self.latency.quantile(0.5)
+        timing = f"p50 {p50:.2f}s | p95 {self.latency.quantile(0.95):.2f}s" if p50 is not None else "مفيش عينات"
+        rejected = " | ".join(f"{REJECTED_LABELS[reason]} {value}" for reason, value in self.rejected.items())
+        return (
+            f"🖼️ *الميديا:* {self.active}/{self.workers} شغال | {self.pending - self.active} مستني | {timing}\n"
+            f"   اتحمل {self.downloads} ملف ({self.bytes_downloaded / 2**20:.1f} MiB) "
+            f"| اتبعت للـ AI {self.bytes_sent / 2**20:.1f} MiB | تكرار {self.dedup_hits} | مرفوض: {rejected}"
+        )
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📈 قياسات البوت (Prometheus text format)
+Counters و Gauges و Histograms بسيطة جداً: dict + list من غير locks
+(البوت كله شغال على event loop واحد) فتكلفتها ميكروثانية أو أقل وتفضل شغالة على طول
++ endpoint محلي /metrics و HTTPXRequest بيقيس كل طلب لـ Bot API
+"""
+
+import bisect
+import logging
+import time
+
+from aiohttp import web
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+# حدود الـ buckets بالثواني (من ميكروثواني الـ scan لحد timeout الـ LLM)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+FAST_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 5e-3)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """عداد بيزيد بس - القيم في dict بالـ labels (tuple)"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def get(self, *labels) -> float:
+        return self.values.get(labels, 0.0)
+
+    def total(self, *prefix) -> float:
+        """مجموع كل القيم اللي الـ labels بتاعتها بتبدأ بـ prefix"""
+        n = len(prefix)
+        return sum(v for labels, v in self.values.items() if labels[:n] == prefix)
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self.values.items()
+        ]
+
+
+class Gauge(Counter):
+    """قيمة بتطلع وتنزل (in-flight وغيره)"""
+
+    kind = 'gauge'
+
+    def set(self, value: float, *labels):
+        self.values[labels] = value
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) - amount
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started_at')
+
+    def __init__(self, histogram: 'Histogram', labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started_at, *self.labels)
+        return False
+
+
+class Histogram:
+    """Histogram بـ buckets ثابتة: observe = bisect + زيادة خانة (من غير تخزين العينات)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # لكل labels: [عدد كل bucket (والأخيرة > آخر حد), المجموع]
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def time(self, *labels) -> _Timer:
+        """with histogram.time('label'): ..."""
+        return _Timer(self, labels)
+
+    def _merged(self, prefix: tuple) -> list[int]:
+        n = len(prefix)
+        counts = [0] * (len(self.buckets) + 1)
+        for labels, (series_counts, _) in self.series.items():
+            if labels[:n] == prefix:
+                counts = [a + b for a, b in zip(counts, series_counts)]
+        return counts
+
+    def count(self, *prefix) -> int:
+        return sum(self._merged(prefix))
+
+    def quantile(self, q: float, *prefix) -> float | None:
+        """تقدير الـ quantile من الـ buckets (interpolation جوه الـ bucket) - None لو مفيش عينات"""
+        counts = self._merged(prefix)
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def render(self) -> list[str]:
+        lines = []
+        for labels, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            suffix = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {_format_value(total)}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """كل القياسات + collectors بتتنادى وقت الـ scrape (لقراءة عدادات موجودة أصلاً في أماكن تانية)"""
+
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: list = []
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, callback):
+        """callback() بيرجع قياسات (Counter/Gauge/Histogram) متبنية وقت الـ scrape"""
+        self._collectors.append(callback)
+        return callback
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        metrics = list(self._metrics)
+        for callback in self._collectors:
+            try:
+                metrics.extend(callback())
+            except Exception as e:
+                logger.warning(f"⚠️ collector فشل: {e}")
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """GET /metrics"""
+        return web.Response(body=self.render().encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+
+async def start_metrics_server(registry: MetricsRegistry, host: str, port: int, path: str = '/metrics'):
+    """سيرفر صغير لـ /metrics على port لوحده في الوضعين (polling و webhook) - مش على سيرفر الـ webhook
+    عشان القياسات متبقاش مفتوحة على الـ port العام اللي تيليجرام بيبعتله"""
+    app = web.Application()
+    app.router.add_get(path, registry.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"📈 الـ metrics على http://{host}:{port}{path}")
+    return runner
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest بيقيس زمن كل طلب لـ Bot API حسب الـ method (sendMessage, editMessageText, ...)"""
+
+    def __init__(self, latency: Histogram, errors: Counter, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.errors = errors
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        api_method = url.rsplit('/', 1)[-1]
+        started_at = time.perf_counter()
+        try:
+            code, payload = await super().do_request(url, method, *args, **kwargs)
+        except Exception:
+            self.errors.inc(api_method)
+            raise
+        finally:
+            self.latency.observe(time.perf_counter() - started_at, api_method)
+        if code >= 400:
+            self.errors.inc(api_method)
+        return code, payload
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔌 طبقة مزودي الذكاء الاصطناعي (Async)
+كل مزود له حد أقصى للطلبات المتزامنة و timeout - عشان طالب واحد
+مستني Gemini ميوقفش باقي البوت
+"""
+
+import asyncio
+import logging
+import time
+
+import budget
+from ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+GROQ_MODEL = "llama-3.3-70b-versatile"
+WHISPER_MODEL = "whisper-large-v3-turbo"
+
+
+class ProviderError(Exception):
+    """فشل من مزود الذكاء الاصطناعي (timeout أو خطأ في الطلب)"""
+
+
+class RateLimited(ProviderError):
+    """الحد العام للمزود خلص عندنا (من غير ما الطلب يتبعت أصلاً)"""
+
+
+class AIProvider:
+    """الأساس المشترك: Semaphore لكل مزود + timeout لكل طلب + حد عام للطلبات في الدقيقة
+
+    factory (اختياري): دالة بتبني الـ client/model - بتتنادى في thread أول ما المزود يتطلب
+    (أو في warm_up) عشان import الـ SDK التقيل ميأخرش تشغيل البوت ولا يوقف الـ event loop
+    """
+
+    name = "provider"
+    # أقصى طول للرد بالـ tokens (الميزانية بتصغره بـ max_tokens_scale)
+    default_max_tokens = 800
+    # بيقبل صور مع السؤال (generate(..., media=...))
+    supports_media = False
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        timeout: float = 30.0,
+        requests_per_minute: float = 0,
+        factory=None,
+        max_tokens: int | None = None,
+    ):
+        self._factory = factory
+        self.max_tokens = max_tokens or self.default_max_tokens
+        self._ready_lock = asyncio.Lock()
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.in_flight = 0
+        # الـ tokens اللي المزود قال إنه استهلكها (من usage في الرد)
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # burst = طلبات 10 ثواني (0 يعني من غير حد)
+        self._quota = None
+        if requests_per_minute:
+            rate = requests_per_minute / 60.0
+            self._quota = TokenBucket(rate, max(1.0, rate * 10))
+
+    @property
+    def ready(self) -> bool:
+        return self._factory is None
+
+    async def warm_up(self):
+        """بناء الـ client لو لسه متبناش (الطلبات اللي بتيجي في نفس الوقت بتستنى نفس البناء)"""
+        if self._factory is None:
+            return
+        async with self._ready_lock:
+            if self._factory is None:
+                return
+            started_at = time.perf_counter()
+            self._set_backend(await asyncio.to_thread(self._factory))
+            self._factory = None
+            logger.info(f"🔌 {self.name} جاهز بعد {(time.perf_counter() - started_at) * 1000:.0f} ms")
+
+    def _set_backend(self, backend):
+        raise NotImplementedError
+
+    def quota_wait(self, requests: int = 1) -> float:
+        """الثواني لحد ما الحد العام يسمح بـ requests طلبات (0 = دلوقتي)"""
+        if self._quota is None:
+            return 0.0
+        return self._quota.wait_time(amount=min(requests, self._quota.burst))
+
+    def _check_quota(self):
+        if self._quota is not None and not self._quota.consume():
+            raise RateLimited(f"{self.name}: الحد العام للطلبات في الدقيقة خلص")
+
+    def _max_tokens(self, scale: float) -> int:
+        return max(64, round(self.max_tokens * scale))
+
+    async def generate(self, system_prompt: str, user_message: str, history: list | None = None,
+                       media: list | None = None, max_tokens_scale: float = 1.0) -> str:
+        """يرجع نص الرد - ويرمي ProviderError لو الطلب خلص وقته
+
+        history: رسائل المحادثة السابقة [(role, text)] و role يا 'user' يا 'model'
+        media: صور مع السؤال [(mime_type, bytes)] - للمزودين اللي supports_media بس
+        max_tokens_scale: نسبة من max_tokens (ردود أقصر لما الميزانية تقل)
+        """
+        if media and not self.supports_media:
+            raise ProviderError(f"{self.name} مش بيقرا صور")
+        self._check_quota()
+        await self.warm_up()
+        return await self._limited(
+            self._generate, system_prompt, user_message, history or [], media or [],
+            self._max_tokens(max_tokens_scale),
+        )
+
+    async def transcribe(self, audio, filename: str, mime_type: str) -> str:
+        """نص الريكورد الصوتي (audio: ملف مفتوح) - نفس حد التزامن والـ timeout بتوع generate"""
+        self._check_quota()
+        await self.warm_up()
+        return await self._limited(self._transcribe, audio, filename, mime_type)
+
+    async def _limited(self, method, *args):
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await asyncio.wait_for(method(*args), timeout=self.timeout)
+            except asyncio.TimeoutError as e:
+                raise ProviderError(f"{self.name} timeout بعد {self.timeout} ثانية") from e
+            finally:
+                self.in_flight -= 1
+
+    async def stream(self, system_prompt: str, user_message: str, history: list | None = None,
+                     max_tokens_scale: float = 1.0):
+        """نفس generate بس بيرجع الرد على أجزاء أول ما توصل (async generator)"""
+        self._check_quota()
+        await self.warm_up()
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                async with asyncio.timeout(self.timeout):
+                    async for chunk in self._stream(system_prompt, user_message, history or [],
+                                                    self._max_tokens(max_tokens_scale)):
+                        if chunk:
+                            yield chunk
+            except asyncio.TimeoutError as e:
+                raise ProviderError(f"{self.name} timeout بعد {self.timeout} ثانية") from e
+            finally:
+                self.in_flight -= 1
+
+    def _record_usage(self, prompt_tokens: int | None, completion_tokens: int | None):
+        self.prompt_tokens += prompt_tokens or 0
+        self.completion_tokens += completion_tokens or 0
+        # على الطلب اللي شغال (الطالب والـ route) لو جوه budget.metered()
+        budget.charge(self.name, prompt_tokens or 0, completion_tokens or 0)
+
+    async def _generate(self, system_prompt: str, user_message: str, history: list, media: list,
+                        max_tokens: int) -> str:
+        raise NotImplementedError
+
+    def _stream(self, system_prompt: str, user_message: str, history: list, max_tokens: int):
+        raise NotImplementedError
+
+    async def _transcribe(self, audio, filename: str, mime_type: str) -> str:
+        raise ProviderError(f"{self.name} مش بيفرغ صوت")
+
+
+class GroqProvider(AIProvider):
+    """Groq عن طريق AsyncGroq (المساعد السريع) - client جاهز أو factory بيرجع AsyncGroq"""
+
+    name = "groq"
+    default_max_tokens = 600
+
+    def __init__(self, client=None, model: str = GROQ_MODEL, whisper_model: str = WHISPER_MODEL, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.model = model
+        self.whisper_model = whisper_model
+
+    def _set_backend(self, backend):
+        self.client = backend
+
+    def _request(self, system_prompt: str, user_message: str, history: list, max_tokens: int) -> dict:
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend(
+            {"role": "assistant" if role == "model" else "user", "content": text}
+            for role, text in history
+        )
+        messages.append({"role": "user", "content": user_message})
+        return dict(
+            model=self.model,
+            messages=messages,
+            temperature=0.9,
+            max_tokens=max_tokens,
+        )
+
+    async def _generate(self, system_prompt: str, user_message: str, history: list, media: list,
+                        max_tokens: int) -> str:
+        response = await self.client.chat.completions.create(
+            **self._request(system_prompt, user_message, history, max_tokens)
+        )
+        if response.usage:
+            self._record_usage(response.usage.prompt_tokens, response.usage.completion_tokens)
+        return response.choices[0].message.content.strip()
+
+    async def _stream(self, system_prompt: str, user_message: str, history: list, max_tokens: int):
+        stream = await self.client.chat.completions.create(
+            **self._request(system_prompt, user_message, history, max_tokens),
+            stream=True,
+        )
+        async for chunk in stream:
+            # الـ usage بييجي في آخر chunk بس
+            x_groq = getattr(chunk, 'x_groq', None)
+            usage = x_groq.usage if x_groq else None
+            if usage:
+                self._record_usage(usage.prompt_tokens, usage.completion_tokens)
+            if chunk.choices:
+                yield chunk.choices[0].delta.content
+
+    async def _transcribe(self, audio, filename: str, mime_type: str) -> str:
+        # الملف بيتبعت multipart من الـ file object على طول (من غير ما يتقرا كله في الرام)
+        transcription = await self.client.audio.transcriptions.create(
+            file=(filename, audio, mime_type),
+            model=self.whisper_model,
+            language="ar",
+            temperature=0.0,
+        )
+        return transcription.text.strip()
+
+
+class GeminiProvider(AIProvider):
+    """Gemini عن طريق generate_content_async (المخ الرئيسي) - GenerativeModel جاهز أو factory بيرجعه"""
+
+    name = "gemini"
+    supports_media = True
+
+    transcribe_prompt = "اكتب الكلام اللي في التسجيل ده بالظبط زي ما اتقال (عامية مصرية ومصطلحات فيزياء) من غير أي تعليق."
+
+    generation_config = {
+        "temperature": 1.0,
+        "top_p": 0.95,
+    }
+
+    def __init__(self, model=None, **kwargs):
+        super().__init__(**kwargs)
+        self.model = model
+
+    def _set_backend(self, backend):
+        self.model = backend
+
+    @staticmethod
+    def _full_context(system_prompt: str, user_message: str) -> str:
+        return f"{system_prompt}\n\nسؤال الطالب: {user_message}\n\nالرد:"
+
+    def _send(self, system_prompt: str, user_message: str, history: list, max_tokens: int,
+              stream: bool = False, media: list = ()):
+        """من غير history: generate_content_async - ومعاه: start_chat بالرسائل السابقة"""
+        full_context = self._full_context(system_prompt, user_message)
+        generation_config = {**self.generation_config, "max_output_tokens": max_tokens}
+        if media:
+            full_context = [full_context, *({'mime_type': mime_type, 'data': data} for mime_type, data in media)]
+        if not history:
+            return self.model.generate_content_async(
+                full_context,
+                generation_config=generation_config,
+                stream=stream,
+            )
+        chat = self.model.start_chat(
+            history=[{"role": role, "parts": [text]} for role, text in history]
+        )
+        return chat.send_message_async(
+            full_context,
+            generation_config=generation_config,
+            stream=stream,
+        )
+
+    def _record_gemini_usage(self, response):
+        usage = getattr(response, 'usage_metadata', None)
+        if usage:
+            self._record_usage(usage.prompt_token_count, usage.candidates_token_count)
+
+    async def _generate(self, system_prompt: str, user_message: str, history: list, media: list,
+                        max_tokens: int) -> str:
+        response = await self._send(system_prompt, user_message, history, max_tokens, media=media)
+        self._record_gemini_usage(response)
+        return response.text.strip()
+
+    async def _stream(self, system_prompt: str, user_message: str, history: list, max_tokens: int):
+        response = await self._send(system_prompt, user_message, history, max_tokens, stream=True)
+        last = None
+        async for chunk in response:
+            last = chunk
+            yield chunk.text
+        # كل chunk فيها الـ usage لحد دلوقتي - الأخيرة هي الإجمالي
+        if last is not None:
+            self._record_gemini_usage(last)
+
+    async def _transcribe(self, audio, filename: str, mime_type: str) -> str:
+        # Gemini بيسمع الصوت inline (ريكوردات تيليجرام صغيرة - دقيقة opus ~ 100-200 KB)
+        response = await self.model.generate_content_async(
+            [self.transcribe_prompt, {'mime_type': mime_type, 'data': audio.read()}],
+            generation_config={"temperature": 0.0},
+        )
+        self._record_gemini_usage(response)
+        return response.text.strip()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🚦 حماية حصة الـ LLM
+- Token bucket لكل طالب ولكل شات (O(1) لكل فحص + تنضيف كسول للمفاتيح القديمة)
+- دمج الرسايل المتتالية من نفس الشات في طلب LLM واحد
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """Bucket بيتملى بمعدل ثابت لحد الـ burst (الحساب بيتعمل وقت الفحص بس)"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float, now: float | None = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic() if now is None else now
+
+    def consume(self, now: float | None = None, amount: float = 1.0) -> bool:
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+    def spend(self, now: float | None = None, amount: float = 1.0):
+        """زي consume بس بياخد حتى لو مش مكفي (استهلاك اتعرف بعد ما حصل) - الرصيد بيبقى بالسالب لحد ما يتملى"""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate) - amount
+        self.updated = now
+
+    def available(self, now: float | None = None) -> float:
+        now = time.monotonic() if now is None else now
+        return min(self.burst, self.tokens + (now - self.updated) * self.rate)
+
+    def wait_time(self, now: float | None = None, amount: float = 1.0) -> float:
+        """الثواني لحد ما يبقى فيه amount (من غير ما ناخد حاجة)"""
+        now = time.monotonic() if now is None else now
+        tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        if self.rate <= 0:
+            return 0.0 if tokens >= amount else math.inf
+        return max(0.0, (amount - tokens) / self.rate)
+
+    def full_at(self) -> float:
+        """الوقت اللي الـ bucket هيبقى فيه مليان تاني (بعده ينفع نمسحه)"""
+        if self.rate <= 0:
+            # مبيتملاش أبداً - مفيش وقت نستناه، والمسح بيرجعه مليان زي المفتاح الجديد
+            return self.updated
+        return self.updated + (self.burst - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Token bucket لكل مفتاح (user_id أو chat_id)
+
+    المفاتيح مترتبة بآخر استخدام، فالتنضيف بيشيل من الأول بس
+    الـ buckets اللي اتملت تاني (يعني مسحها زي عدم وجودها بالظبط)
+    """
+
+    def __init__(self, per_minute: float, burst: float, max_keys: int = 200_000):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[int, TokenBucket] = OrderedDict()
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def allow(self, key: int) -> bool:
+        allowed = self._consume(key)
+        if not allowed:
+            self.rejected += 1
+        return allowed
+
+    def record(self, key: int):
+        """رسالة اتحسبت في process تانية (cluster) - بتاخد من الـ bucket من غير ما تتعد رفض"""
+        self._consume(key)
+
+    def charge(self, key: int, amount: float):
+        """استهلاك بكمية (tokens مثلاً) اتعرف بعد الطلب - بيتحسب كله حتى لو الرصيد مش مكفي"""
+        now = time.monotonic()
+        self._bucket(key, now).spend(now, amount)
+        self._cleanup(now)
+
+    def remaining(self, key: int) -> float:
+        """الرصيد دلوقتي (burst لو المفتاح مش موجود - يعني متملي)"""
+        bucket = self._buckets.get(key)
+        return self.burst if bucket is None else bucket.available()
+
+    def _bucket(self, key: int, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _consume(self, key: int) -> bool:
+        now = time.monotonic()
+        allowed = self._bucket(key, now).consume(now)
+        self._cleanup(now)
+        return allowed
+
+    def _cleanup(self, now: float, limit: int = 2):
+        """تنضيف كسول: بنبص على أقدم مفتاحين بس في كل فحص"""
+        for _ in range(limit):
+            if not self._buckets:
+                return
+            key, bucket = next(iter(self._buckets.items()))
+            if bucket.full_at() > now and len(self._buckets) <= self.max_keys:
+                return
+            del self._buckets[key]
+
+
+class MessageCoalescer:
+    """دمج رسايل الشات الواحد: لو في طلب شغال، الرسايل الجديدة بتستنى وتتبعت مع بعض بعده
+
+    الاستخدام:
+        async for combined in coalescer.batches(chat_id, text):
+            ... طلب LLM واحد للنص المدمج ...
+    لو الشات عنده طلب شغال، الـ loop مش بيلف خالص والرسالة بتتضاف للدفعة الجاية
+    """
+
+    def __init__(self, window: float = 0.0):
+        self.window = window
+        self._pending: dict[int, list[str]] = {}
+        self.coalesced = 0
+
+    async def batches(self, chat_id: int, text: str):
+        pending = self._pending.get(chat_id)
+        if pending is not None:
+            pending.append(text)
+            self.coalesced += 1
+            return
+
+        pending = self._pending[chat_id] = [text]
+        try:
+            while pending:
+                if self.window:
+                    # نستنى شوية يمكن الطالب لسه بيكمل سؤاله في رسالة تانية
+                    await asyncio.sleep(self.window)
+                batch = pending[:]
+                pending.clear()
+                yield '\n'.join(batch)
+        finally:
+            del self._pending[chat_id]
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧭 توجيه الرسايل: رد جاهز (static) ولا موديل سريع (Groq) ولا موديل قوي (Gemini)
+Logistic regression صغير على character n-grams متعملها hashing (Python عادي من غير NumPy)
+بيتدرب من لوجات متعلّم عليها وبيتحمل في ملي ثواني وقت التشغيل
+
+التدريب:
+    python router.py train --data routing.jsonl --out router_model.json
+كل سطر في ملف البيانات: {"text": "...", "route": "static" | "fast" | "strong"}
+"""
+
+import json
+import logging
+import math
+import os
+import random
+import time
+import zlib
+from typing import NamedTuple
+
+from arabic_text import normalize_arabic
+
+logger = logging.getLogger(__name__)
+
+STATIC = 'static'
+FAST = 'fast'
+STRONG = 'strong'
+ROUTES = (STATIC, FAST, STRONG)
+
+MODEL_VERSION = 1
+
+
+class RouteDecision(NamedTuple):
+    route: str
+    confidence: float
+    source: str
+
+
+def _length_bucket(text: str) -> str:
+    for limit in (10, 25, 50, 100, 200):
+        if len(text) <= limit:
+            return f"len:{limit}"
+    return "len:long"
+
+
+def hashed_features(text: str, dim: int, ngram_range: tuple[int, int] = (2, 4)) -> dict[int, float]:
+    """character n-grams + كلمات + طول الرسالة، كلها متعملها hash في dim خانة (l2 normalized)
+
+    crc32 مش hash() عشان الـ hash يبقى ثابت بين التشغيلات (hash بتاع Python عشوائي)
+    """
+    normalized = normalize_arabic(text)
+    padded = f" {normalized} "
+    grams = [f"w:{word}" for word in normalized.split()]
+    grams.append(_length_bucket(normalized))
+    low, high = ngram_range
+    for n in range(low, high + 1):
+        grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+    features: dict[int, float] = {}
+    for gram in grams:
+        index = zlib.crc32(gram.encode('utf-8')) % dim
+        features[index] = features.get(index, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in features.values())) or 1.0
+    return {index: value / norm for index, value in features.items()}
+
+
+def _softmax(scores: list[float]) -> list[float]:
+    top = max(scores)
+    exps = [math.exp(s - top) for s in scores]
+    total = sum(exps)
+    return [e / total for e in exps]
+
+
+class RoutingModel:
+    """Multinomial logistic regression - الأوزان sparse: بس الخانات اللي ظهرت في التدريب"""
+
+    def __init__(
+        self,
+        dim: int = 2 ** 16,
+        ngram_range: tuple[int, int] = (2, 4),
+        weights: dict[int, list[float]] | None = None,
+        bias: list[float] | None = None,
+    ):
+        self.dim = dim
+        self.ngram_range = tuple(ngram_range)
+        self.weights = weights or {}
+        self.bias = bias or [0.0] * len(ROUTES)
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def _scores(self, features: dict[int, float]) -> list[float]:
+        scores = list(self.bias)
+        for index, value in features.items():
+            row = self.weights.get(index)
+            if row is not None:
+                for k in range(len(ROUTES)):
+                    scores[k] += row[k] * value
+        return scores
+
+    def predict_proba(self, text: str) -> list[float]:
+        return _softmax(self._scores(hashed_features(text, self.dim, self.ngram_range)))
+
+    def predict(self, text: str) -> tuple[str, float]:
+        probs = self.predict_proba(text)
+        best = max(range(len(ROUTES)), key=probs.__getitem__)
+        return ROUTES[best], probs[best]
+
+    @classmethod
+    def train(
+        cls,
+        samples: list[tuple[str, str]],
+        dim: int = 2 ** 16,
+        ngram_range: tuple[int, int] = (2, 4),
+        epochs: int = 30,
+        learning_rate: float = 0.5,
+        l2: float = 1e-4,
+        seed: int = 0,
+    ) -> 'RoutingModel':
+        """SGD عادي على cross-entropy مع L2 (الداتا صغيرة فده بيخلص في ثواني)"""
+        model = cls(dim, ngram_range)
+        data = [(hashed_features(text, dim, ngram_range), ROUTES.index(route)) for text, route in samples]
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(data)
+            rate = learning_rate / (1 + epoch * 0.1)
+            for features, label in data:
+                probs = _softmax(model._scores(features))
+                for k in range(len(ROUTES)):
+                    gradient = probs[k] - (1.0 if k == label else 0.0)
+                    model.bias[k] -= rate * gradient
+                    for index, value in features.items():
+                        row = model.weights.setdefault(index, [0.0] * len(ROUTES))
+                        row[k] -= rate * (gradient * value + l2 * row[k])
+        return model
+
+    def save(self, path: str):
+        data = {
+            'version': MODEL_VERSION,
+            'routes': list(ROUTES),
+            'dim': self.dim,
+            'ngram_range': list(self.ngram_range),
+            'bias': [round(b, 5) for b in self.bias],
+            'weights': {
+                str(index): [round(w, 5) for w in row]
+                for index, row in self.weights.items()
+                if any(abs(w) >= 1e-5 for w in row)
+            },
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'RoutingModel':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != MODEL_VERSION or data.get('routes') != list(ROUTES):
+            raise ValueError(f"ملف الـ router مش متوافق: {path}")
+        return cls(
+            dim=data['dim'],
+            ngram_range=tuple(data['ngram_range']),
+            weights={int(index): row for index, row in data['weights'].items()},
+            bias=data['bias'],
+        )
+
+
+class LearnedRouter:
+    """الـ router المتدرب - لو مش متأكد (confidence أقل من الحد) بيرجع None والـ heuristic يقرر"""
+
+    def __init__(self, model: RoutingModel, min_confidence: float = 0.6):
+        self.model = model
+        self.min_confidence = min_confidence
+
+    def route(self, text: str) -> RouteDecision | None:
+        route, confidence = self.model.predict(text)
+        if confidence < self.min_confidence:
+            return None
+        return RouteDecision(route, confidence, 'model')
+
+    @classmethod
+    def from_file(cls, path: str, min_confidence: float = 0.6) -> 'LearnedRouter | None':
+        """تحميل الموديل لو موجود (لو مش موجود أو بايظ بنكمل بالـ heuristic)"""
+        if not path or not os.path.exists(path):
+            return None
+        start = time.perf_counter()
+        try:
+            model = RoutingModel.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"⚠️ مش قادر أحمل الـ router من {path}: {e}")
+            return None
+        logger.info(
+            f"🧭 الـ router اتحمل ({len(model)} feature) في "
+            f"{(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        return cls(model, min_confidence)
+
+
+def load_samples(path: str) -> list[tuple[str, str]]:
+    """قراءة ملف JSONL متعلّم عليه: text + route"""
+    samples = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get('route') in ROUTES and record.get('text'):
+                samples.append((record['text'], record['route']))
+    return samples
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    train = sub.add_parser('train', help="تدريب موديل جديد من ملف JSONL")
+    train.add_argument('--data', required=True)
+    train.add_argument('--out', default='router_model.json')
+    train.add_argument('--dim', type=int, default=2 ** 16)
+    train.add_argument('--epochs', type=int, default=30)
+    args = parser.parse_args()
+
+    samples = load_samples(args.data)
+    started = time.perf_counter()
+    trained = RoutingModel.train(samples, dim=args.dim, epochs=args.epochs)
+    trained.save(args.out)
+    print(f"trained on {len(samples)} samples in {time.perf_counter() - started:.1f}s "
+          f"-> {args.out} ({len(trained)} features, {os.path.getsize(args.out) / 1024:.0f} KiB)")
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📋 المحتوى الثابت (الأوامر والأزرار)
+كل القوائم والكيبوردات بتتبني مرة واحدة من مصدر واحد (ملف المعرفة)
+وبتتراجع على قواعد Markdown بتاعة تيليجرام قبل ما تتستخدم
+ولو الملف اتغير بتتبني تاني من غير restart
+"""
+
+import logging
+import os
+import re
+import time
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import escape_markdown
+
+from knowledge import chunk_knowledge
+from streaming import TELEGRAM_MAX_LENGTH, safe_markdown
+
+logger = logging.getLogger(__name__)
+
+# القيم الافتراضية لو ملف المعرفة مش موجود أو ناقص
+DEFAULT_INFO = {
+    'teacher': 'مستر فارس العناني',
+    'site': 'https://faresanany.com',
+    'register': 'https://faresanany.com/register',
+    'students': '+120,000 طالب',
+    'lessons': '+120 درس متاح',
+    'subject': 'الفيزياء - الصف الثاني الثانوي',
+    'whatsapp': '201025825268',
+    'telegram': 'https://t.me/Fox9_99',
+    'facebook': 'https://www.facebook.com/share/1D9WyAjrrG/',
+    'youtube': 'https://youtube.com/@fareselanaany',
+    'tiktok': 'https://www.tiktok.com/@fares_elenany',
+    'courses': [
+        {'name': 'كورس الترم كامل', 'price': '300 جنيه', 'includes': 'جميع دروس الترم الثاني',
+         'link': 'https://faresanany.com/course/3'},
+        {'name': 'كورس الشهر الأول', 'price': '145 جنيه', 'includes': 'دروس الشهر الأول من الترم الثاني',
+         'link': 'https://faresanany.com/course/1'},
+    ],
+}
+
+# اسم السطر في ملف المعرفة ← المفتاح
+_FIELD_LABELS = {
+    'المدرس': 'teacher',
+    'التخصص': 'subject',
+    'الموقع': 'site',
+    'إنشاء حساب جديد': 'register',
+    'عدد الطلاب': 'students',
+    'عدد الدروس': 'lessons',
+    'واتساب الدعم الفني': 'whatsapp',
+    'قناة التيليجرام': 'telegram',
+    'فيسبوك': 'facebook',
+    'يوتيوب': 'youtube',
+    'تيكتوك': 'tiktok',
+}
+_COURSE_LABELS = {'السعر': 'price', 'يشمل': 'includes', 'رابط الكورس': 'link'}
+_LINE = re.compile(r'^[\s\-•]*(?:[^\w\s]+\s*)?(?P<label>[^:]+?)\s*:\s*(?P<value>.+?)\s*$')
+_COURSES_SECTION = 'الكورسات المتاحة - '
+
+FOOTER = "شغل عالي يا زميلي.. ومتبقاش جهاز! 🍎⚡"
+
+
+def _md(value: str) -> str:
+    """هروب الرموز (_ * ` [) في البيانات اللي بتتحط جوه نص Markdown"""
+    return escape_markdown(value, version=1)
+
+
+def parse_platform_info(text: str) -> dict:
+    """استخراج بيانات المنصة والكورسات من ملف المعرفة (والناقص من الافتراضي)"""
+    info = {key: value for key, value in DEFAULT_INFO.items() if key != 'courses'}
+    courses = []
+    for chunk in chunk_knowledge(text):
+        course = None
+        if chunk.title.startswith(_COURSES_SECTION):
+            course = {'name': chunk.title[len(_COURSES_SECTION):]}
+        for line in chunk.text.splitlines()[1:]:
+            match = _LINE.match(line)
+            if not match:
+                continue
+            label, value = match.group('label'), match.group('value')
+            if course is not None and label in _COURSE_LABELS:
+                course[_COURSE_LABELS[label]] = value
+            elif label in _FIELD_LABELS:
+                info[_FIELD_LABELS[label]] = value
+        if course is not None and 'price' in course:
+            courses.append(course)
+    info['courses'] = courses or DEFAULT_INFO['courses']
+    return info
+
+
+class Page:
+    """رسالة جاهزة: نص + كيبورد (بيتبنوا مرة واحدة)"""
+
+    __slots__ = ('text', 'reply_markup', 'parse_mode')
+
+    def __init__(self, text: str, keyboard: list | None = None):
+        self.text = text
+        self.reply_markup = InlineKeyboardMarkup(keyboard) if keyboard else None
+        self.parse_mode = 'Markdown'
+
+
+def validate_page(key: str, page: Page, callbacks: set[str]):
+    """يرمي ValueError لو الصفحة هتترفض من تيليجرام"""
+    if len(page.text) > TELEGRAM_MAX_LENGTH:
+        raise ValueError(f"{key}: النص أطول من {TELEGRAM_MAX_LENGTH} حرف")
+    if safe_markdown(page.text) != page.text:
+        raise ValueError(f"{key}: في Markdown entity مش مقفول")
+    if page.reply_markup is None:
+        return
+    for row in page.reply_markup.inline_keyboard:
+        for button in row:
+            data = button.callback_data
+            if data is None:
+                continue
+            if len(data.encode('utf-8')) > 64:
+                raise ValueError(f"{key}: callback_data أطول من 64 byte")
+            if data not in callbacks:
+                raise ValueError(f"{key}: مفيش صفحة للزرار '{data}'")
+
+
+def build_pages(info: dict) -> tuple[dict[str, Page], dict[str, Page]]:
+    """بناء كل الصفحات: (صفحات الأوامر, صفحات الأزرار)"""
+    md = {
+        key: _md(value)
+        for key, value in info.items() if isinstance(value, str)
+    }
+    whatsapp_url = f"https://wa.me/{info['whatsapp'].lstrip('+')}"
+    telegram_handle = _md('@' + info['telegram'].rstrip('/').rsplit('/', 1)[-1])
+    courses = info['courses']
+
+    main_menu = [
+        [
+            InlineKeyboardButton("📚 الكورسات المتاحة", callback_data='courses'),
+            InlineKeyboardButton("💰 الأسعار", callback_data='prices')
+        ],
+        [
+            InlineKeyboardButton("🌐 المنصة", url=info['site']),
+            InlineKeyboardButton("📞 الدعم الفني", callback_data='support')
+        ],
+        [InlineKeyboardButton("ℹ️ عن المنصة", callback_data='about')]
+    ]
+    back_button = [[InlineKeyboardButton("🔙 الرجوع للقائمة", callback_data='back_home')]]
+    site_buttons = [
+        [InlineKeyboardButton("🌐 زيارة المنصة", url=info['site'])],
+        [InlineKeyboardButton("📝 التسجيل الآن", url=info['register'])],
+    ]
+    prices_buttons = [
+        [InlineKeyboardButton("📝 سجل الآن", url=info['register'])],
+        [InlineKeyboardButton("📞 استفسر واتساب", url=whatsapp_url)],
+    ]
+    about_buttons = [
+        [InlineKeyboardButton("🌐 زيارة المنصة", url=info['site'])],
+        [InlineKeyboardButton("📱 فيسبوك", url=info['facebook'])],
+        [InlineKeyboardButton("🎥 يوتيوب", url=info['youtube'])],
+    ]
+    contact_buttons = [
+        [InlineKeyboardButton("📱 واتساب", url=whatsapp_url)],
+        [InlineKeyboardButton("✈️ تيليجرام", url=info['telegram'])],
+    ]
+
+    numbers = ('1️⃣', '2️⃣', '3️⃣', '4️⃣', '5️⃣', '6️⃣', '7️⃣', '8️⃣', '9️⃣')
+    course_blocks = "\n\n".join(
+        f"{numbers[i % len(numbers)]} *{_md(c['name'])}*\n"
+        f"💰 السعر: {_md(c['price'])}\n"
+        f"✅ {_md(c.get('includes', ''))}\n"
+        f"🔗 {_md(c.get('link', info['site']))}"
+        for i, c in enumerate(courses)
+    )
+    course_lines = "\n\n".join(
+        f"{numbers[i % len(numbers)]} *{_md(c['name'])}*\n"
+        f"💰 {_md(c['price'])} - {_md(c.get('includes', ''))}"
+        for i, c in enumerate(courses)
+    )
+    price_lines = "\n".join(
+        f"📦 *{_md(c['name'])}:* {_md(c['price'])}"
+        for c in courses
+    )
+
+    commands = {
+        'help': Page(f"""
+🍎 *دليل نيوتن الهايبر*
+
+📋 *الأوامر المتاحة:*
+/start - الترحيب والقائمة الرئيسية
+/help - عرض هذه المساعدة
+/courses - عرض الكورسات
+/prices - عرض الأسعار
+/about - عن المنصة
+/contact - معلومات التواصل
+
+💬 *كيف تستخدمني:*
+ابعتلي أي سؤال في الفيزياء وأنا هرد بأسلوب نيوتن الهايبر!
+
+مثال:
+"اشرحلي قانون نيوتن الأول"
+"إيه الفرق بين السرعة والعجلة؟"
+
+{FOOTER}
+"""),
+        'courses': Page(f"""
+📚 *الكورسات المتاحة - الترم الثاني 2026*
+
+{course_blocks}
+
+✨ *مميزات الكورسات:*
+• شرح مبسط بأسلوب نيوتن الهايبر 🍎
+• تجارب تفاعلية وأنيميشن 🎬
+• تدريبات مكثفة ومتنوعة 📝
+• ملخصات PDF جاهزة 📄
+
+{FOOTER}
+""", site_buttons),
+        'prices': Page(f"""
+💰 *أسعار الكورسات*
+
+{price_lines}
+
+✨ *القيمة المضافة:*
+✅ {md['lessons']}
+✅ متابعة مستمرة
+✅ شرح تفاعلي بأسلوب نيوتن 🍎
+✅ ملخصات وملازم جاهزة
+✅ دعم فني على مدار اليوم
+
+💡 *استثمار في طاقة الحركة بتاعتك!*
+
+{FOOTER}
+""", prices_buttons),
+        'about': Page(f"""
+🌟 *عن منصة "متبقاش جهاز في الفيزياء"*
+
+👨‍🏫 *المدرس:* {md['teacher']}
+📊 *عدد الطلاب:* {md['students']}
+📚 *عدد الدروس:* {md['lessons']}
+🎯 *التخصص:* {md['subject']}
+
+🍎 *رسالتنا:*
+"افهم الفيزياء.. ومتبقاش جهاز!"
+
+✨ *مميزاتنا:*
+• شرح مبسط بدون تعقيد
+• تجارب تفاعلية ورسومات متحركة
+• متابعة دورية مستمرة
+• ملخصات PDF جاهزة
+
+{FOOTER}
+""", about_buttons),
+        'contact': Page(f"""
+📞 *معلومات التواصل*
+
+📱 واتساب: +{md['whatsapp'].lstrip('+')}
+✈️ تيليجرام: {telegram_handle}
+📘 فيسبوك: {md['facebook']}
+🎥 يوتيوب: {md['youtube']}
+🎵 تيكتوك: {md['tiktok']}
+🌐 الموقع: {md['site']}
+
+⏰ *أوقات الدعم:* كل يوم 9 صباحاً - 11 مساءً
+
+{FOOTER}
+""", contact_buttons),
+        # /start فيه اسم الطالب: النص ده template بيتملى وقت الاستخدام
+        'start': Page(
+            "يا أهلاً.. يا أهلاً بزميلي الفيزيائي العبقري {name}! 🍎⚡\n\n"
+            "أنا *نيوتن*، وبقالي 300 سنة مستنيك عشان أقولك سر:\n"
+            "*الفيزياء متعة مش لود.. لو فهمتها صح!* 🧠✨\n\n"
+            "جاهز نحول 'طاقة الوضع' اللي في دماغك لـ 'طاقة حركة' جبارة؟ 👇",
+            main_menu,
+        ),
+    }
+
+    callbacks = {
+        'courses': Page(f"""
+📚 *الكورسات المتاحة - الترم الثاني 2026*
+
+{course_lines}
+
+✨ شرح تفاعلي - أنيميشن - ملخصات PDF جاهزة
+
+{FOOTER}
+""", site_buttons + back_button),
+        'prices': Page(f"""
+💰 *أسعار الكورسات*
+
+{price_lines}
+
+✅ {md['lessons']} - متابعة مستمرة - دعم فني
+
+💡 استثمار في طاقة الحركة بتاعتك!
+{FOOTER}
+""", prices_buttons + back_button),
+        'about': Page(f"""
+🌟 *عن منصة "متبقاش جهاز في الفيزياء"*
+
+👨‍🏫 *المدرس:* {md['teacher']}
+📊 {md['students']} | {md['lessons']}
+🎯 {md['subject']}
+
+🍎 *"افهم الفيزياء.. ومتبقاش جهاز!"*
+
+{FOOTER}
+""", about_buttons + back_button),
+        'support': Page(f"""
+📞 *الدعم الفني - إحنا معاك!*
+
+📱 واتساب: +{md['whatsapp'].lstrip('+')}
+✈️ تيليجرام: {telegram_handle}
+
+⏰ كل يوم 9 صباحاً - 11 مساءً
+
+{FOOTER}
+""", contact_buttons + back_button),
+        'back_home': Page("""
+🍎 *القائمة الرئيسية*
+
+أنا *نيوتن* - مساعدك الهايبر في منصة "متبقاش جهاز"!
+اختار من القائمة أو ابعتلي سؤالك مباشرة 👇
+""", main_menu),
+    }
+
+    for key, page in list(commands.items()) + list(callbacks.items()):
+        validate_page(key, page, set(callbacks))
+    return commands, callbacks
+
+
+class StaticContent:
+    """سجل الصفحات الجاهزة مع hot-reload لما ملف المصدر يتغير"""
+
+    def __init__(self, source_path: str, check_interval: float = 5.0):
+        self.source_path = source_path
+        self.check_interval = check_interval
+        self.loaded_mtime = None
+        self.reloads = 0
+        self._next_check = 0.0
+        self.commands, self.callbacks = build_pages(DEFAULT_INFO)
+        self.reload()
+
+    def reload(self) -> bool:
+        """إعادة البناء من الملف - ولو فيه مشكلة بنفضل على النسخة القديمة"""
+        try:
+            mtime = os.stat(self.source_path).st_mtime
+            with open(self.source_path, 'r', encoding='utf-8') as f:
+                info = parse_platform_info(f.read())
+            self.commands, self.callbacks = build_pages(info)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"❌ المحتوى الثابت مش سليم - هنكمل بالنسخة القديمة: {e}")
+            return False
+        if self.loaded_mtime is not None:
+            self.reloads += 1
+            logger.info("🔄 المحتوى الثابت اتحدث من الملف")
+        self.loaded_mtime = mtime
+        return True
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            mtime = os.stat(self.source_path).st_mtime
+        except OSError:
+            return
+        if mtime != self.loaded_mtime:
+            self.reload()
+
+    def command(self, key: str) -> Page:
+        self._maybe_reload()
+        return self.commands[key]
+
+    def callback(self, data: str) -> Page | None:
+        self._maybe_reload()
+        return self.callbacks.get(data)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📡 عرض الرد وهو بيتكتب (Streaming)
+أول جزء بيتبعت كرسالة، والباقي بيتحدث بـ edit_message_text
+بمعدل محدود عشان منعديش حدود تيليجرام للتعديل في نفس الشات
+"""
+
+import asyncio
+import logging
+import time
+
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_MAX_LENGTH = 4096
+CURSOR = " ▌"
+# لو entity فضل مفتوح أكتر من كده غالباً ده رمز عادي (زي F = m * a) مش تنسيق
+MAX_PENDING_ENTITY = 200
+
+
+def safe_markdown(text: str) -> str:
+    """يقص النص قبل أي entity مفتوح (* _ ` ``` [..](..)) عشان الـ Markdown يتعمله parse صح
+
+    الجزء المقصوص بيظهر في التعديل اللي بعده لما الـ entity يتقفل
+    """
+    i = 0
+    length = len(text)
+    while i < length:
+        char = text[i]
+        if char == '\\':
+            i += 2
+            continue
+        if text.startswith('```', i):
+            end = text.find('```', i + 3)
+            if end == -1:
+                return text[:i]
+            i = end + 3
+            continue
+        if char in '*_`':
+            end = text.find(char, i + 1)
+            if end == -1:
+                return text[:i]
+            i = end + 1
+            continue
+        if char == '[':
+            close = text.find(']', i + 1)
+            if close == -1:
+                return text[:i]
+            if text.startswith('(', close + 1):
+                end = text.find(')', close + 2)
+                if end == -1:
+                    return text[:i]
+                i = end + 1
+            else:
+                i = close + 1
+            continue
+        i += 1
+    return text
+
+
+class StreamingReply:
+    """رسالة بتتحدث مع وصول أجزاء الرد - مع throttling لكل شات"""
+
+    def __init__(self, message, started_at: float, min_interval: float = 1.0, min_growth: int = 20):
+        self.message = message
+        self.started_at = started_at
+        self.min_interval = min_interval
+        self.min_growth = min_growth
+        self.sent = None
+        self.time_to_first_token = None
+        self.markdown = True
+        self._shown = ""
+        self._last_edit = 0.0
+
+    async def update(self, text: str):
+        """تحديث بالنص لحد دلوقتي - بيتجاهل التحديثات الكتير ورا بعض"""
+        visible = text
+        if self.markdown:
+            visible = safe_markdown(text)
+            if len(text) - len(visible) > MAX_PENDING_ENTITY:
+                self.markdown = False
+                visible = text
+        visible = visible[:TELEGRAM_MAX_LENGTH - len(CURSOR)].rstrip()
+        if not visible:
+            return
+        if self.sent is not None:
+            if time.perf_counter() - self._last_edit < self.min_interval:
+                return
+            if 0 <= len(visible) - len(self._shown) < self.min_growth:
+                return
+        try:
+            try:
+                await self._show(visible + CURSOR)
+            except BadRequest:
+                # الـ Markdown مش راضي يتعمله parse - نكمل نص عادي
+                self.markdown = False
+                await self._show(visible + CURSOR)
+        except RetryAfter as e:
+            # تيليجرام طلب نهدى (في المحاولة الأولى أو في النص العادي) - نأجل التعديل الجاي
+            logger.warning(f"⚠️ تعديل الرسالة اتأجل {e.retry_after} ثانية")
+            self._last_edit = time.perf_counter() + float(e.retry_after)
+            return
+        self._shown = visible
+
+    async def finish(self, text: str):
+        """النسخة النهائية من الرد (من غير المؤشر) - بترجع لنص عادي لو الـ Markdown باظ"""
+        text = text[:TELEGRAM_MAX_LENGTH]
+        for _ in range(3):
+            try:
+                await self._show(text)
+                return
+            except RetryAfter as e:
+                await asyncio.sleep(float(e.retry_after))
+            except BadRequest:
+                if not self.markdown:
+                    raise
+                self.markdown = False
+        # التعديل منفعش في 3 محاولات: الرد النهائي كرسالة جديدة بدل ما يضيع والطالب يفضل شايف نص ناقص
+        logger.warning(f"⚠️ تعديل الرد الأخير منفعش في 3 محاولات - بيتبعت كرسالة جديدة ({len(text)} حرف)")
+        try:
+            await self.message.reply_text(text)
+        except TelegramError as e:
+            logger.warning(f"⚠️ الرد الأخير ({len(text)} حرف) متبعتش: {e}")
+
+    async def _show(self, text: str):
+        parse_mode = 'Markdown' if self.markdown else None
+        try:
+            if self.sent is None:
+                self.sent = await self.message.reply_text(text, parse_mode=parse_mode)
+                self.time_to_first_token = time.perf_counter() - self.started_at
+                elapsed_ms = self.time_to_first_token * 1000
+                logger.info("⚡ أول جزء من الرد ظهر بعد %.0f ms", elapsed_ms,
+                            extra={'event': 'first_token', 'elapsed_ms': round(elapsed_ms), 'sampled': True})
+            else:
+                await self.sent.edit_text(text, parse_mode=parse_mode)
+        except BadRequest as e:
+            if 'not modified' not in str(e).lower():
+                raise
+        self._last_edit = time.perf_counter()
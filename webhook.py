@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🌐 وضع الـ Webhook (بديل run_polling)
+سيرفر aiohttp خفيف: تيليجرام بيبعت التحديثات بـ POST، بنتأكد من الـ secret token
+ونحطها في update_queue بتاع الـ Application ونرد فوراً + endpoint للـ health check
+"""
+
+import asyncio
+import hmac
+import logging
+import signal
+import time
+
+from aiohttp import web
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class WebhookServer:
+    """سيرفر الـ webhook - بيستلم التحديثات ويحطها في الطابور من غير ما يستنى معالجتها"""
+
+    def __init__(
+        self,
+        application,
+        url_path: str,
+        secret_token: str,
+        listen: str = '0.0.0.0',
+        port: int = 8080,
+        health_path: str = '/healthz',
+    ):
+        self.application = application
+        self.url_path = '/' + url_path.strip('/')
+        self.secret_token = secret_token
+        self.listen = listen
+        self.port = port
+        self.health_path = health_path
+        self.received = 0
+        self.rejected = 0
+        self.started_at = time.monotonic()
+        self._runner = None
+
+        self.app = web.Application()
+        self.app.router.add_post(self.url_path, self.handle_update)
+        self.app.router.add_get(health_path, self.handle_health)
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        """POST من تيليجرام: نتأكد من الـ secret ونحط التحديث في الطابور"""
+        token = request.headers.get(SECRET_HEADER, '')
+        if not hmac.compare_digest(token, self.secret_token):
+            self.rejected += 1
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+            update = Update.de_json(data, self.application.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            self.rejected += 1
+            logger.warning(f"⚠️ تحديث webhook مش سليم: {e}")
+            return web.Response(status=400)
+        self.received += 1
+        await self.application.update_queue.put(update)
+        return web.Response()
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        """GET للـ health check بتاع Railway"""
+        return web.json_response({
+            'status': 'ok' if self.application.running else 'starting',
+            'uptime': round(time.monotonic() - self.started_at),
+            'received': self.received,
+            'rejected': self.rejected,
+            'queued': self.application.update_queue.qsize(),
+        })
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.listen, self.port).start()
+        logger.info(f"🌐 Webhook شغال على {self.listen}:{self.port}{self.url_path}")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def run_webhook(
+    application,
+    webhook_url: str,
+    secret_token: str,
+    allowed_updates: list[str],
+    url_path: str = 'telegram',
+    listen: str = '0.0.0.0',
+    port: int = 8080,
+):
+    """دورة حياة البوت كاملة في وضع الـ webhook (زي run_polling بالظبط بس بسيرفرنا)"""
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+
+    server = WebhookServer(application, url_path, secret_token, listen, port)
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    try:
+        await server.start()
+        await application.start()
+        await application.bot.set_webhook(
+            url=f"{webhook_url.rstrip('/')}{server.url_path}",
+            secret_token=secret_token,
+            allowed_updates=allowed_updates,
+            max_connections=100,
+        )
+        logger.info("✅ الـ webhook اتسجل عند تيليجرام")
+        await stop_event.wait()
+    finally:
+        await server.stop()
+        if application.running:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)